@@ -0,0 +1,235 @@
+# decoders.py - 可替换的二维码识别后端与自动选择
+"""
+识别后端：
+- pyzbar：zbar 库，只扫描 QR 码符号（不再逐一尝试条形码等其他格式）；
+- opencv：OpenCV 的 QRCodeDetector.detectAndDecodeMulti，一次定位并识别图中的多个二维码；
+  实测对 --grid 网格帧基本识别不出（多码定位失败），网格模式请用其他后端或 auto；
+- opencv-aruco：OpenCV 4.8 起的 QRCodeDetectorAruco，基于 ArUco 的定位图案检测，密集网格帧通常更稳；
+- zxing：zxing-cpp（pip install zxing-cpp），已安装时可用。
+pyzbar 与 zxing-cpp 都是可选依赖：未安装（或 zbar 动态库缺失）时对应后端不可用，OpenCV 总是可用。
+
+不同机器、不同帧布局（单码 / 网格 / 彩色通道）下各后端的速度差别很大。auto 模式在预热阶段用全部可用后端
+识别每一帧并取并集（不会因默认后端漏识别而丢帧），收集到 SAMPLE_FRAMES 幅含二维码的灰度图后做一次基准测试：
+只在识别出的二维码数与最多者相同的后端中选平均耗时最短的一个，之后改用它——
+漏识别的代价（等下一轮重发）远大于识别耗时的差别，因此识别数优先，耗时其次。
+"""
+import threading
+import time
+
+import cv2
+
+try:
+    from pyzbar import pyzbar
+except (ImportError, OSError):  # zbar 动态库缺失时导入即失败（Windows 上常见 libzbar-64.dll 找不到）
+    pyzbar = None
+try:
+    import zxingcpp
+except ImportError:
+    zxingcpp = None
+
+SAMPLE_FRAMES = 5     # auto 模式用于基准测试的样本帧数（含二维码的帧）
+
+
+class PyzbarDecoder:
+    name = 'pyzbar'
+
+    def decode(self, gray):
+        """
+        :param gray: 单通道灰度图
+        :return: [(内容 bytes, 顶点坐标列表), ...]
+        """
+        return [(barcode.data, list(barcode.polygon))
+                for barcode in pyzbar.decode(gray, symbols=[pyzbar.ZBarSymbol.QRCODE])]
+
+
+class OpenCVDecoder:
+    name = 'opencv'
+
+    def __init__(self):
+        # 检测器对象不是线程安全的，每个识别线程各用一个
+        self._local = threading.local()
+
+    def _create(self):
+        return cv2.QRCodeDetector()
+
+    def decode(self, gray):
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            detector = self._local.detector = self._create()
+        found, texts, points, _ = detector.detectAndDecodeMulti(gray)
+        if not found:
+            return []
+        # 定位到但未能识别的二维码内容为空字符串
+        return [(text.encode('utf-8'), [(int(x), int(y)) for x, y in quad])
+                for text, quad in zip(texts, points) if text]
+
+
+class OpenCVArucoDecoder(OpenCVDecoder):
+    name = 'opencv-aruco'
+
+    def _create(self):
+        return cv2.QRCodeDetectorAruco()
+
+
+class ZxingDecoder:
+    name = 'zxing'
+
+    def decode(self, gray):
+        results = []
+        for barcode in zxingcpp.read_barcodes(gray, formats=zxingcpp.BarcodeFormat.QRCode,
+                                              try_rotate=False, try_invert=False):
+            p = barcode.position
+            # 旧版 zxing-cpp 没有 bytes 属性，只能取文本
+            data = getattr(barcode, 'bytes', None) or barcode.text.encode('utf-8')
+            results.append((data, [(p.top_left.x, p.top_left.y), (p.top_right.x, p.top_right.y),
+                                   (p.bottom_right.x, p.bottom_right.y), (p.bottom_left.x, p.bottom_left.y)]))
+        return results
+
+
+BACKENDS = {
+    'pyzbar': PyzbarDecoder,
+    'opencv': OpenCVDecoder,
+    'opencv-aruco': OpenCVArucoDecoder,
+    'zxing': ZxingDecoder,
+}
+CHOICES = ('auto',) + tuple(BACKENDS)
+
+
+def available():
+    """当前环境可用的后端名，第一个为默认后端"""
+    names = []
+    if pyzbar is not None:
+        names.append('pyzbar')
+    names.append('opencv')
+    if hasattr(cv2, 'QRCodeDetectorAruco'):
+        names.append('opencv-aruco')
+    if zxingcpp is not None:
+        names.append('zxing')
+    return names
+
+
+def create_decoder(name='auto'):
+    """
+    :param name: 'auto' 或 BACKENDS 中的后端名
+    :raises ValueError: 后端不存在或未安装
+    """
+    if name == 'auto':
+        return AutoDecoder()
+    if name not in BACKENDS:
+        raise ValueError(f"未知的识别后端: {name}")
+    if name not in available():
+        raise ValueError(f"识别后端不可用: {name}（未安装或缺少动态库）")
+    return BACKENDS[name]()
+
+
+_default = None
+
+
+def default_decoder():
+    """未指定后端时使用的共享实例"""
+    global _default
+    if _default is None:
+        _default = create_decoder(available()[0])
+    return _default
+
+
+def benchmark(samples, names=None):
+    """
+    用样本灰度图测试各后端
+    :param samples: 单通道灰度图列表
+    :param names: 参与测试的后端名，默认全部可用后端
+    :return: [{'name', 'codes': 识别出的二维码数, 'rate': 占并集的比例, 'ms': 平均每幅耗时}, ...]
+    """
+    found = {}
+    elapsed = {}
+    for name in names or available():
+        decoder = BACKENDS[name]()
+        try:
+            decoder.decode(samples[0])  # 预热：首次调用会初始化检测器
+            start = time.perf_counter()
+            found[name] = [{data for data, _ in decoder.decode(gray)} for gray in samples]
+            elapsed[name] = time.perf_counter() - start
+        except Exception as e:
+            print(f"⚠️ 识别后端 {name} 测试失败: {e}")
+    union = [set().union(*(results[i] for results in found.values())) for i in range(len(samples))]
+    total = sum(len(codes) for codes in union)
+    report = []
+    for name, results in found.items():
+        codes = sum(len(r) for r in results)
+        report.append({
+            'name': name,
+            'codes': codes,
+            'rate': round(codes / total, 3) if total else 0.0,
+            'ms': round(elapsed[name] / len(samples) * 1000, 2),
+        })
+    return report
+
+
+def choose(report):
+    """识别数最多的后端中选最快的"""
+    best = max(r['codes'] for r in report)
+    return min((r for r in report if r['codes'] >= best), key=lambda r: r['ms'])['name']
+
+
+def select(samples, names=None):
+    """
+    对样本做基准测试并选出后端，打印各后端的结果
+    :return: 选中的后端名
+    """
+    report = benchmark(samples, names)
+    name = choose(report) if report else available()[0]
+    print(f"⚙️ 识别后端测试（{len(samples)} 幅样本）: "
+          + '，'.join(f"{r['name']} {r['ms']} ms/幅 识别率 {r['rate']:.0%}" for r in report)
+          + f" -> 使用 {name}")
+    return name
+
+
+class AutoDecoder:
+    """
+    预热阶段每幅图都用全部可用后端识别并返回结果的并集，同时收集样本；
+    凑满 samples 幅含二维码的灰度图后做一次基准测试，之后只用选中的后端
+    """
+    name = 'auto'
+
+    def __init__(self, samples=SAMPLE_FRAMES):
+        self.decoders = [create_decoder(name) for name in available()]
+        self.current = self.decoders[0] if len(self.decoders) == 1 else None  # 只有一个后端时无需测试
+        self.target = samples
+        self.samples = []  # 预热阶段收集的灰度图（不含二维码的帧最多保留 samples 幅）
+        self.found = 0     # 其中含二维码的幅数
+        self.selected = self.current is not None
+        self._lock = threading.Lock()
+
+    def _decode_all(self, gray):
+        """全部后端识别结果的并集（同一内容只保留第一个后端给出的位置）"""
+        union = {}
+        for decoder in self.decoders:
+            try:
+                results = decoder.decode(gray)
+            except Exception as e:
+                print(f"⚠️ 识别后端 {decoder.name} 出错: {e}")
+                continue
+            for data, polygon in results:
+                union.setdefault(data, polygon)
+        return list(union.items())
+
+    def decode(self, gray):
+        current = self.current
+        if current is not None:
+            return current.decode(gray)
+        results = self._decode_all(gray)
+        ready = None
+        with self._lock:
+            if not self.selected:
+                # 不论是否识别出内容都收集样本：默认后端漏掉的帧正是测试要发现的
+                if results:
+                    self.found += 1
+                if results or len(self.samples) - self.found < self.target:
+                    self.samples.append(gray.copy())
+                if self.found >= self.target:
+                    self.selected = True
+                    ready, self.samples = self.samples, []
+        # 测试在凑满样本的识别线程中进行，其他识别线程在此之前继续取并集
+        if ready:
+            self.current = create_decoder(select(ready))
+        return results
@@ -5,144 +5,277 @@ pip install pyzbar opencv-python pillow
 
 Q2:安装pyzbar问题，libzbar-64.dll找不到
 https://www.microsoft.com/zh-cn/download/details.aspx?id=40784
+pyzbar 不可用时会自动改用 OpenCV 识别；也可以 pip install zxing-cpp 增加一个识别后端（见 --decoder）
 
 """
 import os
-import mss
+import argparse
 import cv2
 import numpy as np
-from pyzbar import pyzbar
 import sys
 import time
 
+# 允许导入仓库根目录下的 common 包（发送端与接收端共用的协议代码）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.metrics import FORMATS as METRICS_FORMATS, NULL_METRICS, Metrics, MetricsExporter
+from common.profile import preload_profile
+from decoders import CHOICES as DECODER_CHOICES, available, create_decoder
+from offline import decode_recording
+from reassembly import Receiver
+from pipeline import ScanPipeline
+from scanner import reading_order
+
 # ------------------ 配置区域 ------------------
-MONITOR_REGION = {
-    'top': 100,
-    'left': 50,
-    'width': 800,
-    'height': 800,
-}
-
-SCAN_INTERVAL = 0.1
+# 查找二维码的屏幕区域，格式如 {'top': 100, 'left': 50, 'width': 800, 'height': 800}
+# None 表示在整个屏幕（所有显示器）上自动查找发送端的二维码
+MONITOR_REGION = None
+DECODE_SCALE = 1.0       # 识别前的缩放比例；发送端模块像素较大时可设为 0.5 等以加快识别
+REACQUIRE_INTERVAL = 10  # 锁定二维码区域后，每隔多少秒重新全屏查找一次
+MAX_MISSES = 20          # 锁定后连续多少帧未识别到二维码即重新全屏查找
+
+SCAN_INTERVAL = 0.1      # 截图间隔（秒），由独立的截图线程按此节拍截屏
+DECODE_WORKERS = 2       # 并行识别线程数
+QUEUE_SIZE = 4           # 待识别帧队列容量，识别跟不上时丢弃最旧的帧
+CHANGE_STRIDE = 4        # 画面变化检测的抽样步长（像素）；0 表示关闭检测，每帧都识别
+COLOR = False            # 彩色模式：发送端 R/G/B 通道各放一组二维码，按通道拆分后分别识别
+DECODER = 'auto'         # 识别后端 auto/pyzbar/opencv/opencv-aruco/zxing；auto 用最先识别到的几帧测试后在识别数最多的后端中选最快的
+PREVIEW = True           # 是否显示扫描预览窗口
+PREVIEW_FPS = 5          # 预览窗口最高刷新率，避免显示拖慢重组
 WINDOW_NAME = "🔍 二维码扫描监控"
-SAVE_TIMEOUT = 5  # 若在5秒内未接收到新二维码，则自动保存
+SAVE_TIMEOUT = 5  # 超过该秒数未接收到新二维码时，把日志落盘并报告缺失块，然后继续等待
+EXIT_ON_IDLE = False  # 空闲收尾后是否退出（默认作为常驻进程持续接收）
+RESUME_FILE = None    # 续传清单路径；设置后每次空闲收尾与退出时导出，发送端用 --resume 只补发缺少的部分
+METRICS_FILE = None   # 分阶段耗时与计数器的导出文件；None 表示不导出
+METRICS_FORMAT = 'jsonl'  # 导出格式：jsonl 每次追加一行 JSON，prom 为 Prometheus 文本格式（整个文件替换）
+METRICS_INTERVAL = 5  # 导出间隔（秒）
+OVERLAY = False       # 在预览窗口上叠加实时统计
+QUIET = False         # 生产模式：不打印逐帧、逐文件的日志，只保留警告、错误与汇总
+# 预览窗口叠加显示的计数器与阶段
+OVERLAY_STATS = ('frames_captured', 'frames_unchanged', 'frames_dropped', 'frames_decoded', 'qr_new',
+                 'qr_duplicate', 'payload_bytes', 'capture', 'convert', 'decode', 'handle', 'write')
 # ----------------------------------------------
 
-received_data = set()
-current_file_path = None
-last_save_time = time.time()
-received_files = {}
+def export_resume(receiver, path):
+    """导出续传清单，并打印出来以便抄写或拍照带回发送端"""
+    text = receiver.resume_report()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    print(f"📋 续传清单已写入 {path}（发送端使用 --resume 读取）:\n{text}")
 
-def ensure_directory_exists(file_path):
-    # 根据目标目录创建文件夹，如果中间级不存在则创建
-    directory = os.path.dirname(file_path)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
 
-def parse_qr_data(data):
-    try:
-        if data.startswith("PATH:"):
-            return 'PATH', data[5:]
-        elif data.startswith("FILE:"):
-            header, *content_lines = data.split('\n')
-            _, filename = header.split('FILE:', 1)
-            filename = filename.split('|')[0].strip()
-            content = '\n'.join(content_lines)
-            return 'CODE', filename, content
-        else:
-            return 'TEXT', None, data
-    except Exception as e:
-        return 'ERROR', None, str(e)
-
-def save_current_file(dst_folder):
-    global received_files, current_file_path
-    if current_file_path and current_file_path in received_files:
-        output_dir = dst_folder
-        os.makedirs(output_dir, exist_ok=True)
-        filepath = os.path.join(output_dir, str(current_file_path))
-        ensure_directory_exists(filepath)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(''.join(received_files[current_file_path]))
-        print(f"✅ 已保存: {filepath}")
-        del received_files[current_file_path]
-
-def main(dst_folder):
-    global received_data, current_file_path, last_save_time
+def create_metrics(metrics_file, metrics_format, overlay):
+    """
+    需要导出或叠加显示时才记录统计
+    :return: (Metrics 或 NULL_METRICS, MetricsExporter 或 None)
+    """
+    if not metrics_file and not overlay:
+        return NULL_METRICS, None
+    metrics = Metrics('receiver')
+    exporter = MetricsExporter(metrics, metrics_file, metrics_format, METRICS_INTERVAL) if metrics_file else None
+    return metrics, exporter
+
+
+def report_metrics(metrics, exporter):
+    """收尾时导出最后一次快照并打印汇总"""
+    if metrics is NULL_METRICS:
+        return
+    if exporter:
+        exporter.export()
+        print(f"📈 统计已导出到 {exporter.path}")
+    print(f"📈 {metrics.summary()}")
+
+
+def draw_overlay(frame, metrics):
+    """在预览画面左上角叠加实时统计（每行三项）"""
+    parts = metrics.summary(OVERLAY_STATS).split(' ')
+    for row, start in enumerate(range(0, len(parts), 3)):
+        cv2.putText(frame, '  '.join(parts[start:start + 3]), (10, 25 + row * 22),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.55, (0, 0, 255), 1, cv2.LINE_AA)
+
 
+def main(dst_folder, preview=PREVIEW, workers=DECODE_WORKERS, exit_on_idle=EXIT_ON_IDLE,
+         resume_file=RESUME_FILE, color=COLOR, decoder=DECODER, metrics_file=METRICS_FILE,
+         metrics_format=METRICS_FORMAT, overlay=OVERLAY, quiet=QUIET):
     print("🔍 屏幕二维码扫描器启动")
-    print(f"监听区域: {MONITOR_REGION}")
-    print(f"显示窗口: [{WINDOW_NAME}]")
-    print("按 Q 键关闭窗口并停止...\n")
+    print(f"监听区域: {MONITOR_REGION or '全屏自动查找'}")
+    print(f"识别后端: {decoder}（可用: {', '.join(available())}）")
+    if color:
+        print("彩色模式: 按 R/G/B 通道分别识别")
+    if preview:
+        print(f"显示窗口: [{WINDOW_NAME}]")
+        print("按 Q 键关闭窗口并停止...\n")
+        # 创建显示窗口
+        cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_GUI_NORMAL)
+        cv2.resizeWindow(WINDOW_NAME, 800, 800)
+    else:
+        print("按 Ctrl+C 停止...\n")
 
-    # 创建显示窗口
-    cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_GUI_NORMAL)
-    cv2.resizeWindow(WINDOW_NAME, MONITOR_REGION['width'], MONITOR_REGION['height'])
+    metrics, exporter = create_metrics(metrics_file, metrics_format, overlay and preview)
+    # 未完成文件的块保存在 dst_folder/.qr_partial 中，重启后从日志继续接收
+    receiver = Receiver(dst_folder, metrics=metrics, verbose=not quiet)
+    pipeline = ScanPipeline(MONITOR_REGION, scan_interval=SCAN_INTERVAL, decode_workers=workers,
+                            queue_size=QUEUE_SIZE, decode_scale=DECODE_SCALE, change_stride=CHANGE_STRIDE,
+                            color=color, decoder=create_decoder(decoder), metrics=metrics, max_misses=MAX_MISSES,
+                            reacquire_interval=REACQUIRE_INTERVAL)
+    pipeline.start()
+    try:
+        scan(receiver, pipeline, preview, exit_on_idle, resume_file, exporter, overlay)
+    finally:
+        pipeline.stop()
+        if preview:
+            cv2.destroyAllWindows()
+        receiver.flush()  # 确保在程序结束前保存所有数据，并报告缺失的块
+        if resume_file:
+            export_resume(receiver, resume_file)
+        receiver.close()
+        print(f"📊 共截图 {pipeline.captured} 帧，画面未变化跳过 {pipeline.unchanged} 帧，"
+              f"丢弃 {pipeline.dropped} 帧，截图超时 {pipeline.late} 次")
+        report_metrics(metrics, exporter)
+
+def main_offline(dst_folder, source, workers=None, resume_file=RESUME_FILE, color=COLOR, decoder=DECODER,
+                 metrics_file=METRICS_FILE, metrics_format=METRICS_FORMAT, quiet=QUIET):
+    """离线模式：识别录屏视频或截图目录，识别完即收尾退出"""
+    if not os.path.exists(source):
+        print(f"❌ 输入不存在: {source}")
+        return
+    metrics, exporter = create_metrics(metrics_file, metrics_format, False)
+    receiver = Receiver(dst_folder, metrics=metrics, verbose=not quiet)
+    try:
+        decode_recording(receiver, source, workers=workers, scale=DECODE_SCALE, color=color,
+                         change_stride=CHANGE_STRIDE, decoder=decoder)
+    finally:
+        receiver.flush()
+        if resume_file:
+            export_resume(receiver, resume_file)
+        receiver.close()
+        report_metrics(metrics, exporter)
 
-    with mss.mss() as sct:
-        while True:
-            # 1. 截图
-            screenshot = sct.grab(MONITOR_REGION)
-            frame = np.array(screenshot)
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
 
-            # 2. 识别二维码
-            barcodes = pyzbar.decode(frame)
+def scan(receiver, pipeline, preview, exit_on_idle=False, resume_file=None, exporter=None, overlay=False):
+    """
+    重组 / 写盘阶段：在主线程中消费识别结果；预览窗口按 PREVIEW_FPS 限速刷新
+    空闲超过 SAVE_TIMEOUT 时收尾一次（日志落盘、报告缺失块），之后继续等待新的二维码
+    """
+    metrics = receiver.metrics
+    last_save_time = time.time()
+    idle_flushed = False
+    last_preview = 0.0
+    last_index = -1
+    reported_dropped = 0
 
-            for barcode in barcodes:
-                data = barcode.data.decode('utf-8')
+    while True:
+        for result in sorted(pipeline.results(), key=lambda r: r.index):
+            # 同一区域内按阅读顺序处理（网格模式下一帧包含多个二维码）
+            for barcode in reading_order(result.barcodes):
+                # 误读的字节替换为 U+FFFD，交给 CRC 校验丢弃，不中断接收
+                data = barcode.data.decode('utf-8', 'replace')
 
-                if data in received_data:
+                # 按文件与序号重组；重复帧由位图过滤，不再保存每个帧的完整文本
+                try:
+                    with metrics.time('handle'):
+                        new = receiver.handle(data)
+                except Exception as e:
+                    # 单个二维码处理失败（如写盘出错）只记录，继续接收后续帧
+                    print(f"⚠️ 处理二维码出错，已跳过: {e}")
+                    metrics.inc('handle_errors')
                     continue
-                received_data.add(data)
-
-                dtype, *info = parse_qr_data(data)
-                if dtype == 'PATH':
-                    # 如果检测到新的 PATH 信息，则保存之前的文件并开始记录新文件
-                    save_current_file(dst_folder)
-                    print("current_file_path", current_file_path)
-                    current_file_path = info[0]
-                    received_files[current_file_path] = []
-                    print(f"📂 新建文件: {current_file_path}")
-                elif dtype == 'CODE' and current_file_path:
-                    filename, content = info
-                    received_files[current_file_path].append(content)
-                    print(f"📄 收到代码片段: {filename}")
+                metrics.inc('qr_codes')
+                if new:
+                    metrics.inc('qr_new')
+                    metrics.inc('payload_bytes', len(barcode.data))
+                    last_save_time = time.time()
+                    idle_flushed = False
                 else:
-                    print(f"💬 识别到: {data}")
+                    metrics.inc('qr_duplicate')
 
-                # 绘制二维码边框
-                points = barcode.polygon
-                pts = np.array(points, np.int32).reshape((-1, 1, 2))
-                cv2.polylines(frame, [pts], True, (0, 255, 0), 2)
+            # 截图序号不连续说明有帧在识别前被丢弃
+            if pipeline.dropped != reported_dropped:
+                print(f"⚠️ 识别跟不上截图，已丢弃 {pipeline.dropped} 帧（当前帧 #{result.index}，"
+                      f"截于 {time.time() - result.timestamp:.2f} 秒前，识别耗时 {result.decode_time * 1000:.0f} ms）")
+                reported_dropped = pipeline.dropped
 
-                last_save_time = time.time()
+            if preview and result.index > last_index and time.time() - last_preview >= 1 / PREVIEW_FPS:
+                last_index = result.index
+                last_preview = time.time()
+                # 绘制二维码边框后显示当前扫描画面
+                frame = result.image.copy()
+                for barcode in result.barcodes:
+                    pts = np.array(barcode.polygon, np.int32).reshape((-1, 1, 2))
+                    cv2.polylines(frame, [pts], True, (0, 255, 0), 2)
+                if overlay:
+                    draw_overlay(frame, metrics)
+                cv2.imshow(WINDOW_NAME, frame)
 
-            # 如果一段时间内没有新的二维码，则保存当前文件
-            if time.time() - last_save_time > SAVE_TIMEOUT:
-                save_current_file(dst_folder)
-                last_save_time = time.time()
-                break
+        if exporter:
+            exporter.maybe_export()
 
-            # ✅ 显示当前扫描画面
-            cv2.imshow(WINDOW_NAME, frame)
+        # 一段时间内没有新的二维码：收尾一次，常驻模式下继续等待发送端重发或下一批文件
+        if not idle_flushed and time.time() - last_save_time > SAVE_TIMEOUT:
+            if exit_on_idle:
+                break
+            receiver.flush()
+            if resume_file:
+                export_resume(receiver, resume_file)
+            idle_flushed = True
+            print("💤 空闲中，继续等待二维码...")
 
-            # 按 Q 退出
-            key = cv2.waitKey(int(SCAN_INTERVAL * 1000)) & 0xFF
+        # 按 Q 退出
+        if preview:
+            key = cv2.waitKey(1) & 0xFF
             if key == ord('q') or key == ord('Q'):
                 break
 
-    cv2.destroyAllWindows()
-    save_current_file(dst_folder)  # 确保在程序结束前保存所有数据
-
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("用法: python sender.py <source_folder_path>")
+    # 参数配置先于主解析器加载，配置中的常量同样作用于各参数的默认值
+    try:
+        profile, applied, unused = preload_profile(globals())
+    except (OSError, ValueError) as e:
+        print(f"❌ 无法读取参数配置: {e}")
         sys.exit(1)
+    if profile:
+        print(f"📐 已加载参数配置: {applied}")
+        if unused:
+            print(f"⚠️ 参数配置中以下键不属于接收端，已忽略（可能属于发送端或拼写有误）: {', '.join(unused)}")
+
+    parser = argparse.ArgumentParser(description="屏幕二维码接收器：识别发送端的二维码并还原文件")
+    parser.add_argument('dst_folder', help="接收文件的存储根路径")
+    parser.add_argument('--no-preview', action='store_true', help="不显示扫描预览窗口")
+    parser.add_argument('--color', action='store_true', help="彩色模式：按 R/G/B 通道分别识别发送端的三组二维码")
+    parser.add_argument('--decoder', choices=DECODER_CHOICES,
+                        help=f"识别后端（默认 {DECODER}）：auto 在本机测试各可用后端，在识别数最多的后端中选最快的；"
+                             "opencv 不支持发送端的 --grid 网格帧")
+    parser.add_argument('--workers', type=int,
+                        help=f"识别线程数（默认 {DECODE_WORKERS}）；离线模式下为识别进程数（默认 CPU 核数）")
+    parser.add_argument('--input', metavar='PATH',
+                        help="离线模式：识别录屏视频文件或截图目录（多进程并行），而不是实时截屏")
+    parser.add_argument('--exit-on-idle', action='store_true',
+                        help=f"空闲 {SAVE_TIMEOUT} 秒后收尾并退出，而不是持续等待")
+    parser.add_argument('--resume-file', metavar='FILE',
+                        help="空闲收尾与退出时导出续传清单，发送端用 --resume 只补发缺少的文件与块")
+    parser.add_argument('--metrics', metavar='FILE', help="定期导出分阶段耗时直方图与计数器")
+    parser.add_argument('--metrics-format', choices=METRICS_FORMATS, default=METRICS_FORMAT,
+                        help="统计导出格式：jsonl 追加 JSON 行，prom 为 Prometheus 文本格式（默认 %(default)s）")
+    parser.add_argument('--overlay', action='store_true', help="在预览窗口上叠加实时统计")
+    parser.add_argument('--quiet', action='store_true', help="不打印逐帧、逐文件的日志，只保留警告、错误与汇总")
+    parser.add_argument('--profile', help="加载 tool/calibrate.py 生成的参数配置文件")
+    args = parser.parse_args()
+    decoder = args.decoder or DECODER
+    if decoder != 'auto' and decoder not in available():
+        parser.error(f"识别后端 {decoder} 不可用（未安装或缺少动态库），可用: {', '.join(available())}")
 
     try:
-        main(sys.argv[1])
+        if args.input:
+            main_offline(args.dst_folder, args.input, workers=args.workers,
+                         resume_file=args.resume_file or RESUME_FILE, color=args.color or COLOR,
+                         decoder=decoder, metrics_file=args.metrics or METRICS_FILE,
+                         metrics_format=args.metrics_format, quiet=args.quiet or QUIET)
+        else:
+            main(args.dst_folder, preview=PREVIEW and not args.no_preview, workers=args.workers or DECODE_WORKERS,
+                 exit_on_idle=args.exit_on_idle or EXIT_ON_IDLE, resume_file=args.resume_file or RESUME_FILE,
+                 color=args.color or COLOR, decoder=decoder, metrics_file=args.metrics or METRICS_FILE,
+                 metrics_format=args.metrics_format, overlay=args.overlay or OVERLAY, quiet=args.quiet or QUIET)
     except KeyboardInterrupt:
-        print("\n\n👋 扫描被中断，正在保存文件...")
+        print("\n\n👋 扫描已停止，未完成的文件可在重启后继续接收")
 
     print("🎉 所有文件保存完成！")
-    
\ No newline at end of file
@@ -0,0 +1,181 @@
+# offline.py - 离线解码录屏视频或截图目录
+"""
+实时扫描时发送端的帧间隔受限于接收端单核的识别速度。离线模式先把发送端画面录下来
+（录屏视频，或按顺序命名的截图目录），之后把帧区间切成若干段交给进程池并行识别，
+识别结果按帧序号依次交给与实时扫描相同的 Receiver 重组、写盘与校验。
+
+每段内与上一帧相同的画面只识别一次；一段的识别结果按帧顺序返回，主进程按段的顺序处理，
+因此整体仍按录制顺序重组（固实归档可边收边解压）。
+识别后端为 auto 时，先在主进程中从录制内容均匀抽取若干帧测试各后端，选定后再交给各进程使用。
+部分容器格式（如 webm）读不出总帧数，此时不分段，由一个进程从头读到结尾，识别后端在该进程中自动选择。
+单个二维码处理出错只记录并计数（handle_errors），不影响其余各段。
+"""
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from decoders import SAMPLE_FRAMES, available, create_decoder, select
+from scanner import FrameChangeDetector, decode_frame, gray_planes, reading_order
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+SHARDS_PER_WORKER = 4  # 每个进程分到的段数，段越多负载越均衡，但视频每段都要重新定位
+
+
+def list_images(folder):
+    """截图目录中的图像文件，按文件名排序即为录制顺序"""
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def count_frames(source):
+    """
+    :param source: 视频文件路径或截图目录
+    :return: 总帧数；视频容器中没有帧数信息时为 0 或负数
+    """
+    if os.path.isdir(source):
+        return len(list_images(source))
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise OSError(f"无法打开视频: {source}")
+    try:
+        return int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        capture.release()
+
+
+def _iter_frames(source, start, stop):
+    """
+    产出 (帧序号, BGR 图像)
+    :param stop: 结束帧序号（不含）；None 表示读到结尾
+    """
+    if os.path.isdir(source):
+        for index, path in enumerate(list_images(source)[start:stop], start):
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+            if image is not None:
+                yield index, image
+        return
+    capture = cv2.VideoCapture(source)
+    try:
+        if start:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+        for index in range(start, stop) if stop is not None else itertools.count(start):
+            ok, image = capture.read()
+            if not ok:
+                break
+            yield index, image
+    finally:
+        capture.release()
+
+
+def decode_shard(source, start, stop, scale=1.0, color=False, change_stride=4, decoder='auto'):
+    """
+    识别 [start, stop) 区间内的帧（在子进程中执行）
+    :param stop: None 表示读到结尾
+    :param decoder: 识别后端名
+    :return: ([(帧序号, [二维码文本, ...]), ...], 实际识别的帧数, 读取的帧数)
+    """
+    backend = create_decoder(decoder)
+    detector = FrameChangeDetector(change_stride) if change_stride else None
+    results = []
+    decoded = read = 0
+    for index, image in _iter_frames(source, start, stop):
+        read += 1
+        if detector and not detector.changed({}, image):
+            continue
+        decoded += 1
+        texts = [barcode.data.decode('utf-8', 'replace')
+                 for barcode in reading_order(decode_frame(image, scale, color, decoder=backend))]
+        if texts:
+            results.append((index, texts))
+    return results, decoded, read
+
+
+def sample_planes(source, total, scale=1.0, color=False, count=SAMPLE_FRAMES):
+    """从录制内容中均匀抽取 count 帧，转换为识别时使用的灰度图"""
+    planes = []
+    for i in range(count):
+        index = total * (2 * i + 1) // (2 * count)
+        for _, image in _iter_frames(source, index, index + 1):
+            for _, gray in gray_planes(image, color):
+                if scale != 1.0:
+                    gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                planes.append(gray)
+    return planes
+
+
+def shard_ranges(total, shards):
+    """把 [0, total) 均分为不超过 shards 段"""
+    shards = max(1, min(shards, total))
+    bounds = [total * i // shards for i in range(shards + 1)]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def decode_recording(receiver, source, workers=None, scale=1.0, color=False, change_stride=4, decoder='auto'):
+    """
+    并行识别录制内容并交给 receiver 重组
+    :param receiver: reassembly.Receiver
+    :param source: 视频文件路径或截图目录
+    :param workers: 识别进程数，None 表示使用 CPU 核数
+    :param decoder: 识别后端名，'auto' 表示抽样测试后选择
+    :return: 统计信息字典
+    """
+    total = count_frames(source)
+    workers = workers or os.cpu_count() or 1
+    if total > 0:
+        if decoder == 'auto':
+            samples = sample_planes(source, total, scale, color)
+            decoder = select(samples) if samples else available()[0]
+        ranges = shard_ranges(total, workers * SHARDS_PER_WORKER)
+        print(f"🎞️ 离线识别: {source}（{total} 帧，{len(ranges)} 段，{workers} 个进程，识别后端 {decoder}）")
+    else:
+        # 无法分段：一个进程读到结尾，auto 后端在该进程中边识别边选择
+        ranges = [(0, None)]
+        print(f"🎞️ 离线识别: {source}（总帧数未知，不分段，从头读到结尾，识别后端 {decoder}）")
+
+    metrics = receiver.metrics
+    start = time.perf_counter()
+    decoded = read = codes = useful = errors = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(decode_shard, source, a, b, scale, color, change_stride, decoder)
+                   for a, b in ranges]
+        # 按段的顺序取结果，保证按录制顺序重组
+        for (a, b), future in zip(ranges, futures):
+            results, shard_decoded, shard_read = future.result()
+            decoded += shard_decoded
+            read += shard_read
+            metrics.inc('frames_decoded', shard_decoded)
+            for index, texts in results:
+                for text in texts:
+                    codes += 1
+                    try:
+                        with metrics.time('handle'):
+                            new = receiver.handle(text)
+                    except Exception as e:
+                        # 单个二维码处理失败（如写盘出错）只记录，继续处理其余帧与各段
+                        print(f"⚠️ 处理第 {index} 帧的二维码出错，已跳过: {e}")
+                        errors += 1
+                        metrics.inc('handle_errors')
+                        continue
+                    useful += new
+                    metrics.inc('qr_new' if new else 'qr_duplicate')
+            print(f"   第 {a}-{(b if b is not None else a + shard_read) - 1} 帧: 识别 {shard_decoded} 帧，"
+                  f"{sum(len(t) for _, t in results)} 个二维码")
+    total = total if total > 0 else read
+    elapsed = time.perf_counter() - start
+    stats = {
+        'decoder': decoder,
+        'frames': total,
+        'decoded_frames': decoded,
+        'qr_codes': codes,
+        'new_codes': useful,
+        'handle_errors': errors,
+        'elapsed_s': round(elapsed, 2),
+        'frames_per_second': round(total / elapsed, 1) if elapsed else 0.0,
+    }
+    print(f"📊 共 {total} 帧（画面变化 {decoded} 帧），识别 {codes} 个二维码（新信息 {useful} 个）"
+          + (f"，处理出错 {errors} 个" if errors else "")
+          + f"，耗时 {stats['elapsed_s']} 秒，{stats['frames_per_second']} 帧/秒")
+    return stats
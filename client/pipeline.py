@@ -0,0 +1,164 @@
+# pipeline.py - 截图 / 识别 / 重组分离的多线程扫描流水线
+"""
+截图线程按固定节拍截屏，把带时间戳和序号的帧放入有界队列；
+多个识别线程并行取帧识别（各识别后端在 C/C++ 代码中会释放 GIL）；
+识别结果交给调用方所在的单一线程做重组与写盘。
+与上一帧内容相同的截图不进入队列；识别跟不上时，队列中最旧的帧被丢弃并计数，丢帧情况一目了然。
+"""
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import mss
+import numpy as np
+
+from common.metrics import NULL_METRICS
+from scanner import FrameChangeDetector, RegionTracker, decode_frame
+
+# index: 截图序号；timestamp: 截图时刻；region: 截取的屏幕区域
+CapturedFrame = namedtuple('CapturedFrame', ['index', 'timestamp', 'region', 'image'])
+DecodedFrame = namedtuple('DecodedFrame', ['index', 'timestamp', 'region', 'image', 'barcodes', 'decode_time'])
+
+
+class ScanPipeline:
+    """
+    截图 -> 识别 -> 结果 三段流水线
+    用法：start() 后循环调用 results() 取识别结果，结束时调用 stop()
+    """
+
+    def __init__(self, search_region=None, scan_interval=0.1, decode_workers=2, queue_size=4,
+                 decode_scale=1.0, change_stride=4, color=False, decoder=None, metrics=NULL_METRICS,
+                 **tracker_options):
+        """
+        :param search_region: 全屏查找区域，None 表示所有显示器
+        :param scan_interval: 截图间隔（秒）
+        :param decode_workers: 识别线程数
+        :param queue_size: 待识别帧队列容量，满时丢弃最旧的帧
+        :param decode_scale: 识别前的缩放比例
+        :param change_stride: 变化检测的抽样步长，0 表示不做检测、每帧都识别
+        :param color: 彩色模式，按 R、G、B 通道分别识别
+        :param decoder: 识别后端，None 表示默认后端；各识别线程共用
+        :param metrics: 记录截图（capture）、颜色转换与识别的耗时，以及截图、丢帧、未变化帧等计数
+        :param tracker_options: 传给 RegionTracker 的参数
+        """
+        self.search_region = search_region
+        self.scan_interval = scan_interval
+        self.decode_workers = decode_workers
+        self.decode_scale = decode_scale
+        self.color = color
+        self.decoder = decoder
+        self.metrics = metrics
+        self.tracker_options = tracker_options
+        self.change_detector = FrameChangeDetector(change_stride) if change_stride else None
+        self.tracker = None
+        self._tracker_lock = threading.Lock()
+        self._frames = queue.Queue(maxsize=queue_size)
+        self._results = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = []
+        self.captured = 0   # 截图总数
+        self.dropped = 0    # 因识别跟不上而丢弃的截图数
+        self.unchanged = 0  # 与上一帧相同而跳过识别的截图数
+        self.late = 0       # 截图时刻晚于预定节拍超过一个间隔的次数
+
+    def start(self):
+        ready = threading.Event()
+        capture = threading.Thread(target=self._capture_loop, args=(ready,), name='capture', daemon=True)
+        capture.start()
+        ready.wait()  # 等截图线程初始化好区域跟踪器
+        self._threads.append(capture)
+        for i in range(self.decode_workers):
+            worker = threading.Thread(target=self._decode_loop, name=f'decode-{i}', daemon=True)
+            worker.start()
+            self._threads.append(worker)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=1)
+
+    def _capture_loop(self, ready):
+        # mss 实例不能跨线程使用，在截图线程内创建
+        with mss.mss() as sct:
+            try:
+                self.tracker = RegionTracker(self.search_region or sct.monitors[0], **self.tracker_options)
+            finally:
+                ready.set()
+            deadline = time.perf_counter()
+            while not self._stop.is_set():
+                with self._tracker_lock:
+                    region = self.tracker.region()
+                timestamp = time.time()
+                try:
+                    with self.metrics.time('capture'):
+                        frame = CapturedFrame(self.captured, timestamp, region, np.array(sct.grab(region)))
+                    self.captured += 1
+                    self.metrics.inc('frames_captured')
+                    if self.change_detector and not self.change_detector.changed(region, frame.image):
+                        self.unchanged += 1
+                        self.metrics.inc('frames_unchanged')
+                    else:
+                        self._enqueue(frame)
+                except Exception as e:
+                    # 单次截图失败（如区域越出屏幕）只记录，下一个节拍继续截图，截图线程不退出
+                    print(f"⚠️ 截图出错: {e}")
+                    self.metrics.inc('capture_errors')
+
+                deadline += self.scan_interval
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif -delay > self.scan_interval:
+                    # 截图本身耗时超过一个间隔，重新对齐节拍
+                    self.late += 1
+                    self.metrics.inc('capture_late')
+                    deadline = time.perf_counter()
+
+    def _enqueue(self, frame):
+        try:
+            self._frames.put_nowait(frame)
+        except queue.Full:
+            # 丢弃最旧的帧，保证识别线程总是处理最新画面
+            try:
+                self._frames.get_nowait()
+                self.dropped += 1
+                self.metrics.inc('frames_dropped')
+            except queue.Empty:
+                pass
+            self._frames.put_nowait(frame)
+
+    def _decode_loop(self):
+        while not self._stop.is_set():
+            try:
+                frame = self._frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            start = time.perf_counter()
+            try:
+                barcodes = decode_frame(frame.image, self.decode_scale, self.color, self.metrics, self.decoder)
+                with self._tracker_lock:
+                    self.tracker.update(frame.region, barcodes)
+            except Exception as e:
+                # 单帧识别失败只记录并跳过该帧，识别线程不退出
+                print(f"⚠️ 识别出错，跳过帧 #{frame.index}: {e}")
+                self.metrics.inc('decode_errors')
+                continue
+            decode_time = time.perf_counter() - start
+            self.metrics.inc('frames_decoded')
+            self.metrics.set('decode_queue', self._frames.qsize())
+            self._results.put(DecodedFrame(*frame, barcodes, decode_time))
+
+    def results(self, timeout=0.1):
+        """
+        取出当前已识别完成的所有结果（可能乱序，按截图序号即可还原先后）
+        :param timeout: 没有结果时最多等待的秒数
+        """
+        items = []
+        try:
+            items.append(self._results.get(timeout=timeout))
+            while True:
+                items.append(self._results.get_nowait())
+        except queue.Empty:
+            pass
+        return items
@@ -0,0 +1,618 @@
+# reassembly.py - 接收端帧处理与按序号重组
+"""
+每个文件对应一个 FileAssembly：数据块按到达顺序追加到磁盘上的 .part 文件，
+内存中只保留每个序号的偏移、长度与按位存储的位图（每块 1 bit），不再保存完整的帧字符串或块内容。
+块乱序或重复到达都不会影响输出；文件收齐后按序号从 .part 读出、写入临时文件并原子重命名，
+因此大文件的内存占用保持平稳，进程崩溃也不会留下写了一半的文件。
+块的位置记录在追加式日志中（见 client/storage.py），重启后从日志恢复未完成的文件；
+收到的摘要与已写盘文件的摘要同样记入日志，崩溃前到达的摘要帧在重启后仍可用于比对。
+带 DELTA 字段的文件内容是增量流，收齐后基于接收目录中已有的旧文件重建。
+带 V 字段的文件版本与已有的重组状态不同时（文件被修改后重发），即使旧版本已保存也重新开始重组。
+带 CDC 字段的文件收齐后按内容分块登记到块仓库（总量超过 CHUNK_STORE_LIMIT 时先登记的块先淘汰）；REF 引用帧从块仓库取出对应的块，
+引用的块尚未到达时文件暂缓写盘，等被引用的文件收齐后再完成。
+带 ARC 字段的“文件”是固实归档：从第 0 块起连续收到的块立即送入解压器，每解出一个完整文件就写盘，
+归档本身不保存；重启后从 .part 中的块重新解压（已写出的文件被相同内容覆盖）。
+带 CRC 字段的帧先校验整帧（头部与内容），误读或截断的帧直接丢弃；文件写盘时同时计算 SHA-256，
+与 SUM 摘要帧一致即标记为已校验，不一致则删除该文件并等待发送端重发。
+"""
+import hashlib
+import os
+from array import array
+
+from common import protocol
+from common.archive import ArchiveExtractor
+from common.dedup import cdc_chunks, chunk_hash
+from common.delta import apply_delta
+from common.fountain import LTDecoder
+from common.metrics import NULL_METRICS
+from common.resume import file_token, format_ranges, format_resume, name_token
+from storage import PARTIAL_DIR, TMP_SUFFIX, Journal, append_part, live_records, read_part, write_atomic
+
+CHUNK_STORE_LIMIT = 64 << 20  # 去重块仓库在内存中保留的最大字节数
+
+
+class FileAssembly:
+    """
+    单个文件的重组状态
+    total 为 None 表示旧版发送端（无总块数），只能在收尾时按序号拼接
+    """
+
+    def __init__(self, name, total=None, delta_base=None, ident=None, part=None, version=None):
+        self.name = name
+        self.total = total
+        self.delta_base = delta_base  # 增量传输时旧文件 SHA-256 的前 16 位
+        self.version = version        # 发送端附带的内容版本（新文件 SHA-256 的前 8 位）
+        self.cdc = False              # 发送端启用了去重，收齐后需登记块
+        self.archive = None           # 固实归档的压缩方式，按序号边收边解压
+        self.extractor = None         # 固实归档的增量解压器
+        self.extracted = 0            # 固实归档已送入解压器的块数
+        self.ident = ident            # 日志中的编号
+        self.part = part              # 块内容暂存的 .part 文件路径
+        self.offsets = array('q')     # 第 seq 块在 .part 中的偏移
+        self.lengths = array('l')     # 第 seq 块的长度
+        self.refs = bytearray()       # 第 seq 块是否为引用帧（内容为块哈希列表）
+        self.bitmap = bytearray()     # 第 seq 位为 1 表示该块已收到
+        self.received = 0
+        self.saved = False
+
+    def has(self, seq):
+        byte = seq >> 3
+        return byte < len(self.bitmap) and bool(self.bitmap[byte] & (1 << (seq & 7)))
+
+    def restore(self, seq, offset, length, ref=False):
+        """登记一个已写入 .part 的块（新收到的块与从日志恢复的块共用）"""
+        if self.has(seq):
+            return
+        byte = seq >> 3
+        if byte >= len(self.bitmap):
+            self.bitmap.extend(bytes(byte + 1 - len(self.bitmap)))
+        self.bitmap[byte] |= 1 << (seq & 7)
+        if seq >= len(self.offsets):
+            grow = seq + 1 - len(self.offsets)
+            self.offsets.extend([0] * grow)
+            self.lengths.extend([0] * grow)
+            self.refs.extend(bytes(grow))
+        self.offsets[seq] = offset
+        self.lengths[seq] = length
+        self.refs[seq] = ref
+        self.received += 1
+
+    def add(self, seq, content, ref=False):
+        """
+        放入一个数据块（追加写入 .part 文件）
+        :param content: bytes；引用帧为逗号分隔的块哈希
+        :return: 是否为新块（重复块返回 False）
+        """
+        if self.saved or self.has(seq):
+            return False
+        self.restore(seq, append_part(self.part, content), len(content), ref)
+        return True
+
+    @property
+    def complete(self):
+        return self.total is not None and self.received >= self.total
+
+    def missing(self):
+        """尚未收到的块序号列表（总块数未知时无法判断，返回空列表）"""
+        if self.total is None:
+            return []
+        return [seq for seq in range(self.total) if not self.has(seq)]
+
+    def _read(self, seq):
+        return read_part(self.part, self.offsets[seq], self.lengths[seq])
+
+    def _hashes(self, seq):
+        return self._read(seq).decode('ascii').split(',')
+
+    def unresolved(self, store):
+        """引用帧中尚未到达的块哈希"""
+        return {digest for seq in range(len(self.refs)) if self.has(seq) and self.refs[seq]
+                for digest in self._hashes(seq) if digest not in store}
+
+    def iter_data(self, store=None):
+        """
+        按序号逐块读出全部已收到的内容（写盘时逐段写入，不必整体读入内存）
+        :param store: 块仓库，用于解析引用帧；调用前应确认 unresolved() 为空
+        """
+        for seq in range(len(self.offsets)):
+            if not self.has(seq):
+                continue
+            if self.refs[seq]:
+                for digest in self._hashes(seq):
+                    yield store[digest]
+            else:
+                yield self._read(seq)
+
+    def data(self, store=None):
+        """按序号拼接全部已收到的块"""
+        return b''.join(self.iter_data(store))
+
+    def release(self):
+        """写盘后释放块索引并删除 .part，只保留位图用于过滤后续重复帧"""
+        self.offsets = array('q')
+        self.lengths = array('l')
+        self.refs = bytearray()
+        if self.part and os.path.exists(self.part):
+            os.remove(self.part)
+        self.saved = True
+
+
+class Receiver:
+    """
+    接收端帧处理器：解析每个二维码文本，按文件与序号重组，收齐即保存
+    与截图、识别流程解耦，实时扫描、离线解码与基准测试共用同一套处理逻辑
+    """
+
+    def __init__(self, dst_folder, metrics=NULL_METRICS, verbose=True):
+        """
+        :param dst_folder: 接收目录
+        :param metrics: 记录解析（parse）与写盘（write）耗时、写盘文件数与 CRC 丢弃帧数
+        :param verbose: 是否打印逐帧、逐文件的日志（警告与错误总是打印）
+        """
+        self.dst_folder = dst_folder
+        self.metrics = metrics
+        self.verbose = verbose
+        self.files = {}              # 文件名 -> FileAssembly
+        self.fountain_decoders = {}  # 喷泉模式：(文件名, 块数, 字节数) -> LTDecoder
+        self.fountain_ids = {}       # 喷泉模式：(文件名, 块数, 字节数) -> 日志编号
+        self.fountain_done = set()   # 喷泉模式下已还原并保存的 (文件名, 块数, 字节数)
+        self.chunk_store = {}        # 去重模式：块哈希 -> 块内容（已收齐文件中的块，按登记顺序）
+        self.chunk_store_bytes = 0   # 块仓库中块内容的总字节数
+        self.evicted_chunks = 0      # 因超过 CHUNK_STORE_LIMIT 而淘汰的块数
+        self.waiting = []            # 数据帧已收齐、但引用的块尚未到达的文件
+        self._tokens = {}            # 续传清单：相对路径 -> (大小, 修改时间, 文件标记)
+        self.digests = {}            # 摘要帧：文件名 -> (字节数, SHA-256)
+        self.written = {}            # 本次写盘的文件：文件名 -> (字节数, SHA-256)
+        self.verified = set()        # 摘要比对一致的文件名
+        self.stale = set()           # 摘要与已写盘内容不符、已删除并等待发送端重发的文件名
+        self.bad_frames = 0          # CRC 校验失败而丢弃的帧数
+        self.journal = Journal(dst_folder)
+        self._resume()
+
+    def _resume(self):
+        """按日志恢复上次未完成的文件与喷泉译码，并压缩日志"""
+        records = self.journal.records
+        # 先找出已完成的编号，已完成文件的 .part 可能已被删除，不再重放
+        done = {r['id'] for r in records if r['op'] == 'done'}
+        assemblies = {}   # 日志编号 -> FileAssembly
+        fountains = {}    # 日志编号 -> (键, LTDecoder)
+        cdc_names = {}    # 已保存的去重文件（按出现顺序去重）
+        for record in records:
+            op = record['op']
+            if op == 'cdc':
+                cdc_names[record['name']] = True
+            elif op in ('sum', 'written'):
+                state = self.digests if op == 'sum' else self.written
+                if record['len'] is None:
+                    state.pop(record['name'], None)
+                else:
+                    state[record['name']] = (record['len'], record['hash'])
+            elif record['id'] in done:
+                continue
+            elif op == 'file':
+                assembly = assemblies.get(record['id'])
+                if assembly is None:
+                    assembly = assemblies[record['id']] = FileAssembly(
+                        record['name'], record['total'], record['delta'],
+                        record['id'], self.journal.part_path(record['id']), record.get('ver'))
+                assembly.total = record['total']
+                assembly.cdc = record['cdc']
+                assembly.archive = record.get('arc')
+            elif op == 'chunk':
+                assemblies[record['id']].restore(record['seq'], record['off'], record['len'], record['ref'])
+            elif op == 'fountain':
+                key = (record['name'], record['k'], record['l'])
+                fountains[record['id']] = (key, LTDecoder(record['k'], record['l']))
+            elif op == 'symbol':
+                payload = read_part(self.journal.part_path(record['id']), record['off'], record['len'])
+                fountains[record['id']][1].add(record['seed'], payload)
+
+        # 只保留未完成文件的记录；按文件名记录的状态只保留最后一条，已保存的去重文件重启后从目标文件重新登记块
+        live = set(assemblies) | set(fountains)
+        self.journal.compact(live_records(records))
+        for assembly in assemblies.values():
+            self._forget_other_versions(assembly.name, assembly.version)
+        for name in set(self.digests) & set(self.written):
+            if self.digests[name] == self.written[name]:
+                self.verified.add(name)  # 重启前已校验过的文件不再逐个打印
+            else:
+                self._verify(name)
+        for name in cdc_names:
+            try:
+                with open(os.path.join(self.dst_folder, name), 'rb') as f:
+                    self._register_chunks(f.read())
+            except OSError:
+                pass
+        if not live:
+            return
+
+        print(f"♻️ 从日志恢复 {len(assemblies)} 个未完成文件、{len(fountains)} 个喷泉译码任务")
+        for ident, (key, decoder) in fountains.items():
+            self.fountain_decoders[key] = decoder
+            self.fountain_ids[key] = ident
+        for assembly in assemblies.values():
+            self.files[assembly.name] = assembly
+            if assembly.total is not None:
+                print(f"   {assembly.name}: 已收 {assembly.received}/{assembly.total} 块")
+        for assembly in assemblies.values():
+            if assembly.archive:
+                self._extract(assembly)
+            self._finish_if_complete(assembly)  # 崩溃时可能已收齐但尚未写盘
+        for key in list(self.fountain_decoders):
+            if self.fountain_decoders[key].done:
+                self._finish_fountain(key)
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def write_file(self, name, data):
+        """
+        将接收到的完整内容原子写入目标目录下的相对路径，写入的同时计算 SHA-256 并与摘要帧比对
+        :param data: bytes 或可迭代的多段 bytes
+        """
+        filepath = os.path.join(self.dst_folder, str(name))
+        digest = hashlib.sha256()
+        length = 0
+
+        def hashed(parts):
+            nonlocal length
+            for part in [parts] if isinstance(parts, bytes) else parts:
+                digest.update(part)
+                length += len(part)
+                yield part
+
+        with self.metrics.time('write'):
+            write_atomic(filepath, hashed(data))
+        self.metrics.inc('files_written')
+        self._log(f"✅ 已保存: {filepath}")
+        self.written[name] = (length, digest.hexdigest())
+        self.journal.append({'op': 'written', 'name': name, 'len': length, 'hash': self.written[name][1]})
+        self.verified.discard(name)
+        self._verify(name)
+
+    def _set_digest(self, name, length, digest):
+        """记录摘要（同时写入日志，重启后仍可比对）并与写盘结果比对"""
+        self.digests[name] = (length, digest)
+        self.journal.append({'op': 'sum', 'name': name, 'len': length, 'hash': digest})
+        self._verify(name)
+
+    def _forget_other_versions(self, name, version, changed=False):
+        """
+        丢弃不属于内容版本 version 的摘要与写盘结果，并在日志中记为空：
+        版本是完整内容 SHA-256 的前 8 位，可直接与摘要比较，先于数据帧到达的新版本摘要得以保留，
+        重启后才到达的新版本也不会与日志中旧版本的摘要比对而被误删；
+        旧版发送端没有版本，changed 为 True（重组中途内容变化）时全部丢弃
+        """
+        for op, state in (('sum', self.digests), ('written', self.written)):
+            entry = state.get(name)
+            if entry is None:
+                continue
+            other = not entry[1].startswith(version) if version is not None else changed
+            if other:
+                del state[name]
+                self.verified.discard(name)
+                self.journal.append({'op': op, 'name': name, 'len': None, 'hash': None})
+
+    def _verify(self, name):
+        """
+        写盘结果与摘要帧都已到达时比对；每次写盘或收到新的摘要都重新比对，
+        与已校验文件矛盾的摘要同样使其失效
+        """
+        expected = self.digests.get(name)
+        actual = self.written.get(name)
+        if expected is None or actual is None:
+            return
+        if expected == actual:
+            self.stale.discard(name)
+            if name not in self.verified:
+                self.verified.add(name)
+                self._log(f"🔒 校验通过: {name}")
+            return
+        print(f"❌ 摘要不符，已删除: {name}（等待发送端重发）")
+        self.verified.discard(name)
+        self.stale.add(name)
+        path = os.path.join(self.dst_folder, str(name))
+        if os.path.exists(path):
+            os.remove(path)
+        del self.written[name]
+        self.journal.append({'op': 'written', 'name': name, 'len': None, 'hash': None})
+        # 丢弃重组状态，重发的帧重新开始收集
+        self.files.pop(name, None)
+        self.fountain_done = {key for key in self.fountain_done if key[0] != name}
+
+    def _assembly(self, name, fields):
+        # 总块数、增量基准或版本变化说明发送端的文件内容已更新，重新开始重组
+        total = int(fields['N']) if 'N' in fields else None
+        delta_base = fields.get('DELTA')
+        version = fields.get(protocol.VERSION_FIELD)
+        cdc = protocol.FLAG_CDC in fields
+        archive = fields.get(protocol.ARCHIVE_FIELD)
+        assembly = self.files.get(name)
+        if (assembly is None or (total is not None and assembly.total not in (None, total))
+                or assembly.delta_base != delta_base or (assembly.cdc != cdc and assembly.total is not None)
+                or assembly.version != version):
+            if assembly is not None and not assembly.saved:
+                self.journal.append({'op': 'done', 'id': assembly.ident})
+                assembly.release()
+            # 旧版本的摘要与写盘结果不再适用，等新版本写盘及其摘要帧到达后再比对
+            self._forget_other_versions(name, version, assembly is not None and assembly.version != version)
+            ident = self.journal.new_id()
+            assembly = self.files[name] = FileAssembly(name, total, delta_base, ident,
+                                                       self.journal.part_path(ident), version)
+            assembly.cdc = cdc
+            assembly.archive = archive
+            self.journal.append({'op': 'file', 'id': ident, 'name': name, 'total': total,
+                                 'delta': delta_base, 'cdc': cdc, 'arc': archive, 'ver': version})
+            self._log(f"📂 新建文件: {name}" + ("（增量）" if delta_base else "")
+                      + (f"（{archive} 固实归档）" if archive else ""))
+        elif assembly.total is None and total is not None:
+            # 旧版帧先到时补全总块数，并更新日志
+            assembly.total = total
+            assembly.cdc = cdc
+            assembly.archive = archive
+            self.journal.append({'op': 'file', 'id': assembly.ident, 'name': name, 'total': assembly.total,
+                                 'delta': delta_base, 'cdc': assembly.cdc, 'arc': archive,
+                                 'ver': assembly.version})
+        return assembly
+
+    def _finish_if_complete(self, assembly):
+        if not assembly.complete or assembly.saved:
+            return
+        unresolved = assembly.unresolved(self.chunk_store)
+        if unresolved:
+            if assembly not in self.waiting:
+                self.waiting.append(assembly)
+                print(f"⏳ 等待引用块: {assembly.name}（缺 {len(unresolved)} 块）")
+            return
+        self._save(assembly)
+
+    def _save(self, assembly):
+        if assembly.archive:
+            # 归档中的文件已在收块时逐个写出，归档本身不保存
+            if assembly.extractor is None or not assembly.extractor.done:
+                print(f"❌ 归档数据不完整: {assembly.name}（等待发送端重发）")
+                self._discard(assembly)
+                return
+            self._log(f"🗜️ 归档解压完成: {assembly.name}（{assembly.extractor.files} 个文件）")
+            self.journal.append({'op': 'done', 'id': assembly.ident})
+            assembly.release()
+            return
+        payload = None
+        if assembly.delta_base or assembly.cdc:
+            # 增量重建与登记块都需要完整内容
+            payload = assembly.data(self.chunk_store)
+            data = self._apply_delta(assembly, payload) if assembly.delta_base else payload
+            if data is not None:
+                self.write_file(assembly.name, data)
+        else:
+            self.write_file(assembly.name, assembly.iter_data())
+        self.journal.append({'op': 'done', 'id': assembly.ident})
+        if assembly.cdc:
+            self.journal.append({'op': 'cdc', 'name': assembly.name})
+        assembly.release()
+        if assembly.cdc and assembly.name in self.written:  # 摘要不符被删除的内容不登记
+            self._register_chunks(payload)
+
+    def _extract(self, assembly):
+        """固实归档：把从下一个待解压序号起连续收到的块送入解压器，写出已完整解出的文件"""
+        if assembly.extractor is None:
+            assembly.extractor = ArchiveExtractor(assembly.archive)
+        while not assembly.saved and assembly.has(assembly.extracted):
+            try:
+                files = assembly.extractor.feed(assembly._read(assembly.extracted))
+            except ValueError as e:
+                print(f"❌ 归档损坏: {assembly.name}: {e}（丢弃已收内容，等待发送端重发）")
+                self._discard(assembly)
+                return
+            assembly.extracted += 1
+            for name, data, digest in files:
+                # 归档记录自带 SHA-256，写盘后与摘要帧同样比对
+                self.digests[name] = (len(data), digest)
+                self.journal.append({'op': 'sum', 'name': name, 'len': len(data), 'hash': digest})
+                self.write_file(name, data)
+
+    def _discard(self, assembly):
+        """丢弃无法还原的文件的重组状态，重发的帧重新开始收集"""
+        self.journal.append({'op': 'done', 'id': assembly.ident})
+        assembly.release()
+        if self.files.get(assembly.name) is assembly:
+            del self.files[assembly.name]
+
+    def _register_chunks(self, payload):
+        """把收齐文件的内容分块登记到块仓库，并重试等待这些块的文件"""
+        for chunk in cdc_chunks(payload):
+            key = chunk_hash(chunk)
+            if key not in self.chunk_store:
+                self.chunk_store[key] = chunk
+                self.chunk_store_bytes += len(chunk)
+        while self.chunk_store_bytes > CHUNK_STORE_LIMIT:
+            # 先登记的块先淘汰；之后引用已淘汰块的文件会等待引用块，需发送端完整重发
+            oldest = next(iter(self.chunk_store))
+            self.chunk_store_bytes -= len(self.chunk_store.pop(oldest))
+            self.evicted_chunks += 1
+        waiting, self.waiting = self.waiting, []
+        for assembly in waiting:
+            # 等待期间该文件可能已被新版本替换
+            if self.files.get(assembly.name) is assembly:
+                self._finish_if_complete(assembly)
+
+    def _apply_delta(self, assembly, delta):
+        """基于接收目录中已有的旧文件重建新文件；旧文件缺失或不匹配时返回 None"""
+        filepath = os.path.join(self.dst_folder, str(assembly.name))
+        try:
+            with open(filepath, 'rb') as f:
+                base = f.read()
+        except OSError:
+            print(f"❌ 增量无法应用，本地没有旧文件: {assembly.name}（请让发送端完整重发）")
+            return None
+        if hashlib.sha256(base).hexdigest()[:16] != assembly.delta_base:
+            print(f"❌ 增量无法应用，本地旧文件与发送端记录不一致: {assembly.name}（请让发送端完整重发）")
+            return None
+        try:
+            return apply_delta(base, delta)
+        except ValueError as e:
+            print(f"❌ 增量重建失败: {assembly.name}: {e}")
+            return None
+
+    def handle(self, data):
+        """
+        处理一个二维码文本
+        :return: 是否带来了新信息（重复帧返回 False）
+        """
+        try:
+            with self.metrics.time('parse'):
+                frame = protocol.parse_frame(data)
+        except Exception as e:
+            print(f"⚠️ 无法解析二维码: {e}")
+            return False
+
+        if frame.kind != 'TEXT' and not protocol.check_crc(data):
+            self.bad_frames += 1
+            self.metrics.inc('crc_rejected')
+            print(f"⚠️ CRC 校验失败，丢弃: {frame.name}（累计 {self.bad_frames} 帧）")
+            return False
+        if frame.kind == 'PATH':
+            known = frame.name in self.files
+            assembly = self._assembly(frame.name, frame.fields)
+            self._finish_if_complete(assembly)  # 空文件只有 PATH 帧
+            return not known
+        if frame.kind == 'SUM':
+            digest = (int(frame.fields['L']), frame.fields['H'])
+            if self.digests.get(frame.name) == digest:
+                return False
+            self._set_digest(frame.name, *digest)
+            return True
+        if frame.kind == 'CODE':
+            # 旧版发送端以起始行号作为序号，同样保持有序且唯一
+            seq = int(frame.fields.get('SEQ', frame.fields.get('LINE', 0)))
+            assembly = self._assembly(frame.name, frame.fields)
+            if assembly.saved or assembly.has(seq):
+                return False
+            ref = protocol.FLAG_REF in frame.fields
+            assembly.add(seq, frame.body.encode('ascii') if ref else protocol.decode_body(frame), ref)
+            # 块内容已追加到 .part，再记录日志：日志中的每条记录都能找到对应内容
+            self.journal.append({'op': 'chunk', 'id': assembly.ident, 'seq': seq,
+                                 'off': assembly.offsets[seq], 'len': assembly.lengths[seq], 'ref': ref})
+            self._log(f"📄 收到代码片段: {frame.name} 第 {seq} 块"
+                      + (f"（{assembly.received}/{assembly.total}）" if assembly.total is not None else ""))
+            if assembly.archive:
+                self._extract(assembly)
+            self._finish_if_complete(assembly)
+            return True
+        if frame.kind == 'LT':
+            return self.handle_fountain_symbol(frame)
+        self._log(f"💬 识别到: {data}")
+        return False
+
+    def handle_fountain_symbol(self, frame):
+        """
+        喷泉模式：把编码符号交给对应文件的 LT 译码器，凑够符号后立即还原并保存
+        以 (文件名, 块数, 字节数) 区分同名文件的不同版本
+        """
+        key = (frame.name, int(frame.fields['K']), int(frame.fields['L']))
+        if key in self.fountain_done:
+            return False
+        decoder = self.fountain_decoders.get(key)
+        if decoder is None:
+            decoder = self.fountain_decoders[key] = LTDecoder(key[1], key[2])
+            ident = self.fountain_ids[key] = self.journal.new_id()
+            self.journal.append({'op': 'fountain', 'id': ident, 'name': key[0], 'k': key[1], 'l': key[2]})
+            self._log(f"🌊 开始喷泉接收: {frame.name}（{key[1]} 块）")
+        seed = int(frame.fields['S'])
+        payload = protocol.decode_body(frame)
+        received = decoder.symbols_received
+        decoder.add(seed, payload)
+        if decoder.symbols_received > received:
+            # 只记录新符号；重启后重放这些符号即可恢复译码器状态
+            ident = self.fountain_ids[key]
+            offset = append_part(self.journal.part_path(ident), payload)
+            self.journal.append({'op': 'symbol', 'id': ident, 'seed': seed, 'off': offset, 'len': len(payload)})
+        if decoder.done:
+            self._finish_fountain(key)
+        return True
+
+    def _finish_fountain(self, key):
+        decoder = self.fountain_decoders.pop(key)
+        ident = self.fountain_ids.pop(key)
+        self.write_file(key[0], decoder.data())
+        self._log(f"🌊 喷泉还原完成: {key[0]}（收到 {decoder.symbols_received} 个符号 / {key[1]} 块）")
+        self.fountain_done.add(key)
+        self.journal.append({'op': 'done', 'id': ident})
+        part = self.journal.part_path(ident)
+        if os.path.exists(part):
+            os.remove(part)
+
+    def missing_report(self):
+        """
+        未收齐的文件及缺失块
+        :return: [(文件名, 总块数, [缺失序号, ...]), ...]
+        """
+        return [(a.name, a.total, a.missing())
+                for a in self.files.values() if not a.saved and a.total is not None and not a.complete]
+
+    def resume_report(self):
+        """
+        生成续传清单（格式见 common/resume.py）：接收目录中的全部文件记为已收到，
+        未收齐的普通分块文件列出内容版本与缺失块；增量、去重文件与固实归档的帧组成取决于发送端当时的状态，
+        旧版发送端的文件没有内容版本，都不列出，由发送端完整重发
+        :return: 清单文本
+        """
+        completed = []
+        for root, dirs, names in os.walk(self.dst_folder):
+            dirs[:] = [d for d in dirs if d != PARTIAL_DIR]
+            for filename in names:
+                if filename.endswith(TMP_SUFFIX):
+                    continue
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.dst_folder)
+                stat = os.stat(path)
+                cached = self._tokens.get(name)
+                if cached is None or cached[:2] != (stat.st_size, stat.st_mtime_ns):
+                    with open(path, 'rb') as f:
+                        cached = self._tokens[name] = (stat.st_size, stat.st_mtime_ns,
+                                                       file_token(name, f.read()))
+                completed.append(cached[2])
+        partial = [(name_token(a.name), a.version, a.total, a.missing())
+                   for a in self.files.values()
+                   if not a.saved and a.total is not None and a.version
+                   and not a.delta_base and not a.cdc and not a.archive]
+        return format_resume(completed, partial)
+
+    def flush(self):
+        """
+        空闲收尾：保存旧版发送端（无总块数）的文件，把日志落盘，并打印未收齐文件的缺失块
+        未收齐的文件不写盘（块仍保存在 .part 中，之后收到的帧或重启后可继续重组），避免产生内容错乱的文件
+        """
+        for assembly in list(self.files.values()):
+            if assembly.total is None and not assembly.saved:
+                self._save(assembly)
+        self.journal.sync()
+        for name, total, missing in self.missing_report():
+            print(f"⚠️ 未收齐: {name} 缺少 {len(missing)}/{total} 块: {format_ranges(missing)}")
+        for assembly in self.waiting:
+            if self.files.get(assembly.name) is not assembly:
+                continue
+            print(f"⚠️ 引用块未到达: {assembly.name} 缺 {len(assembly.unresolved(self.chunk_store))} 块"
+                  f"（被引用的文件未收齐，请重发）")
+        for key, decoder in self.fountain_decoders.items():
+            print(f"⚠️ 喷泉未还原: {key[0]}（已收 {decoder.symbols_received} 个符号 / {key[1]} 块）")
+        if self.evicted_chunks:
+            print(f"⚠️ 块仓库超过 {CHUNK_STORE_LIMIT >> 20} MiB，已淘汰 {self.evicted_chunks} 个最早登记的块"
+                  f"（引用这些块的文件需完整重发）")
+        if self.stale:
+            print(f"⚠️ 摘要不符、需要重发: {', '.join(map(str, sorted(self.stale)))}")
+        unverified = [name for name in self.written if name not in self.verified]
+        if self.written:
+            print(f"🔒 已校验 {len(self.verified)}/{len(self.written)} 个文件"
+                  + (f"，未收到摘要或版本不符: {', '.join(map(str, unverified))}" if unverified else "")
+                  + (f"，CRC 丢弃 {self.bad_frames} 帧" if self.bad_frames else ""))
+
+    def close(self):
+        """
+        关闭日志；没有未完成的文件、需要在重启后重新登记的去重块，
+        也没有尚待比对的摘要或写盘结果时删除 .qr_partial
+        """
+        pending = any(not a.saved for a in self.files.values()) or self.fountain_decoders
+        unsettled = any(name not in self.verified for name in set(self.digests) | set(self.written))
+        self.journal.close(remove=not pending and not self.chunk_store and not unsettled)
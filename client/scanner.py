@@ -0,0 +1,190 @@
+# scanner.py - 屏幕截图中的二维码定位与识别
+"""
+首次在整个屏幕（或配置的监听区域）上查找发送端的二维码，找到后锁定其外接矩形
+加边距作为感兴趣区域（ROI），之后只截取并识别该区域的单通道灰度图；
+连续多帧识别失败或到达重新定位周期时，再回到全屏查找。
+画面未变化的截图在识别前即被跳过。
+
+发送端彩色模式下 R、G、B 三个通道各是一组独立的二维码，按通道拆成三幅灰度图分别识别。
+识别本身由可替换的后端完成（见 client/decoders.py），未指定时使用默认后端。
+"""
+import time
+import zlib
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from common.metrics import NULL_METRICS
+from decoders import default_decoder
+
+Rect = namedtuple('Rect', ['left', 'top', 'width', 'height'])
+# 识别结果：data 为 bytes，rect/polygon 为截图坐标系下的位置，channel 为彩色模式下的通道序号（R/G/B 依次为 0/1/2）
+Decoded = namedtuple('Decoded', ['data', 'rect', 'polygon', 'channel'], defaults=(0,))
+
+# BGR(A) 数组中 R、G、B 通道的下标
+COLOR_CHANNELS = (2, 1, 0)
+
+
+def _decode_gray(gray, scale, channel, metrics, decoder):
+    if scale != 1.0:
+        with metrics.time('convert'):
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    with metrics.time('decode'):
+        barcodes = decoder.decode(gray)
+    results = []
+    for data, polygon in barcodes:
+        polygon = [(int(x / scale), int(y / scale)) for x, y in polygon]
+        xs = [x for x, _ in polygon]
+        ys = [y for _, y in polygon]
+        results.append(Decoded(data, Rect(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)), polygon, channel))
+    return results
+
+
+def gray_planes(frame, color=False, metrics=NULL_METRICS):
+    """
+    把截图转换为待识别的灰度图
+    :return: [(通道序号, 单通道灰度图), ...]；非彩色模式下只有一幅
+    """
+    if frame.ndim == 2:
+        return [(0, frame)]
+    if color:
+        planes = []
+        for channel, index in enumerate(COLOR_CHANNELS):
+            # 通道切片不连续，复制一份再交给缩放与识别
+            with metrics.time('convert'):
+                planes.append((channel, np.ascontiguousarray(frame[:, :, index])))
+        return planes
+    with metrics.time('convert'):
+        code = cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        return [(0, cv2.cvtColor(frame, code))]
+
+
+def decode_frame(frame, scale=1.0, color=False, metrics=NULL_METRICS, decoder=None):
+    """
+    识别一帧截图中的所有二维码
+    :param frame: mss 截图转换得到的 BGRA 数组（或 BGR 数组，或已是单通道灰度图）
+    :param scale: 识别前的缩放比例，模块像素较大时可缩小以加快识别
+    :param color: 彩色模式，按 R、G、B 通道分别识别
+    :param metrics: 记录颜色转换（convert）与识别（decode）阶段的耗时
+    :param decoder: 识别后端（decoders.create_decoder 的返回值），None 表示默认后端
+    :return: [Decoded, ...]，坐标已换算回原始截图
+    """
+    decoder = decoder or default_decoder()
+    results = []
+    for channel, gray in gray_planes(frame, color, metrics):
+        results += _decode_gray(gray, scale, channel, metrics, decoder)
+    return results
+
+
+def reading_order(barcodes):
+    """
+    按阅读顺序（从上到下、从左到右）排列同一帧中识别到的多个二维码，
+    与发送端网格模式的平铺顺序一致；彩色模式下先按通道（R、G、B）排列
+    """
+    rows = []
+    for barcode in sorted(barcodes, key=lambda b: (b.channel, b.rect.top)):
+        # 顶边与当前行首个二维码相差不到半个码高，视为同一行
+        if (rows and barcode.channel == rows[-1][0].channel
+                and barcode.rect.top < rows[-1][0].rect.top + rows[-1][0].rect.height / 2):
+            rows[-1].append(barcode)
+        else:
+            rows.append([barcode])
+    return [b for row in rows for b in sorted(row, key=lambda b: b.rect.left)]
+
+
+class FrameChangeDetector:
+    """
+    截图变化检测：发送端每帧要显示一段时间，而接收端截图更频繁，大部分截图与上一帧逐像素相同。
+    对截图按固定步长抽样后计算 CRC32，与上一帧相同（且截取区域相同）时跳过识别。
+    """
+
+    def __init__(self, stride=4):
+        """
+        :param stride: 抽样步长（像素），应小于发送端单个模块的像素宽度
+        """
+        self.stride = stride
+        self._last = None
+
+    def changed(self, region, image):
+        """
+        :return: 本帧内容是否与上一帧不同
+        """
+        sample = image[::self.stride, ::self.stride]
+        signature = (tuple(region.values()), sample.shape, zlib.crc32(sample.tobytes()))
+        if signature == self._last:
+            return False
+        self._last = signature
+        return True
+
+
+class RegionTracker:
+    """
+    二维码区域跟踪
+    region() 返回下一次应截取的屏幕区域（mss 格式字典），update() 根据识别结果更新锁定状态
+    """
+
+    def __init__(self, search_region, margin=0.25, max_misses=20, reacquire_interval=10.0):
+        """
+        :param search_region: 全屏查找时的截取区域
+        :param margin: ROI 边距，占二维码外接矩形边长的比例
+        :param max_misses: 锁定后连续多少帧未识别到二维码即重新全屏查找
+        :param reacquire_interval: 锁定后每隔多少秒做一次全屏查找（发送端窗口可能移动或网格变大）
+        """
+        self.search_region = search_region
+        self.margin = margin
+        self.max_misses = max_misses
+        self.reacquire_interval = reacquire_interval
+        self.roi = None
+        self.misses = 0
+        self.locked_at = 0.0
+
+    @property
+    def locked(self):
+        return self.roi is not None
+
+    def region(self):
+        if self.roi is not None and time.time() - self.locked_at < self.reacquire_interval:
+            return self.roi
+        return self.search_region
+
+    def update(self, region, barcodes):
+        """
+        :param region: 本次截取的区域
+        :param barcodes: 本次识别结果（坐标相对于 region）
+        """
+        if region is self.roi:
+            # 锁定期间不随单帧结果收缩 ROI，避免网格模式下漏识别的码被裁掉
+            self.misses = 0 if barcodes else self.misses + 1
+            if self.misses >= self.max_misses:
+                print("🔎 连续未识别到二维码，重新全屏查找")
+                self.roi = None
+                self.misses = 0
+            return
+        if not barcodes:
+            # 全屏查找失败：保留原 ROI（若有），等待下一次
+            if self.roi is not None:
+                self.locked_at = time.time()
+            return
+
+        left = min(x for b in barcodes for x, _ in b.polygon)
+        top = min(y for b in barcodes for _, y in b.polygon)
+        right = max(x for b in barcodes for x, _ in b.polygon)
+        bottom = max(y for b in barcodes for _, y in b.polygon)
+        pad_x = int((right - left) * self.margin) + 10
+        pad_y = int((bottom - top) * self.margin) + 10
+        left = max(0, left - pad_x)
+        top = max(0, top - pad_y)
+        right = min(region['width'], right + pad_x)
+        bottom = min(region['height'], bottom + pad_y)
+        roi = {
+            'left': region['left'] + left,
+            'top': region['top'] + top,
+            'width': right - left,
+            'height': bottom - top,
+        }
+        if roi != self.roi:
+            print(f"🎯 锁定二维码区域: {roi}")
+        self.roi = roi
+        self.misses = 0
+        self.locked_at = time.time()
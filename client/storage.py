@@ -0,0 +1,151 @@
+# storage.py - 接收端落盘存储：临时分块文件 + 追加式日志
+"""
+每个正在接收的文件（或喷泉译码任务）对应 <接收目录>/.qr_partial/<编号>.part，
+收到的块按到达顺序追加到该文件，块的位置记录在同目录的追加式日志 journal.log 中（每行一条 JSON）：
+    {"op": "file", "id": 编号, "name": 文件名, "total": 总块数, "delta": 增量基准, "cdc": 是否去重,
+     "arc": 固实归档的压缩方式, "ver": 内容版本}
+    {"op": "chunk", "id": 编号, "seq": 序号, "off": 偏移, "len": 长度, "ref": 是否为引用帧}
+    {"op": "fountain", "id": 编号, "name": 文件名, "k": 块数, "l": 字节数}
+    {"op": "symbol", "id": 编号, "seed": 种子, "off": 偏移, "len": 长度}
+    {"op": "done", "id": 编号}
+    {"op": "cdc", "name": 文件名}    已保存的去重文件，重启后重新登记其中的块
+    {"op": "sum", "name": 文件名, "len": 字节数, "hash": SHA-256}        收到的摘要
+    {"op": "written", "name": 文件名, "len": 字节数, "hash": SHA-256}    已写盘文件的摘要
+    （sum / written 的 len 与 hash 为 null 表示该状态已作废）
+块内容先写入 .part 再追加日志，进程崩溃后日志中的每条记录都能在 .part 中找到对应内容；
+文件收齐后先写入目标目录下的临时文件并 fsync，再原子重命名为目标文件，不会留下写了一半的文件。
+重启时按日志恢复未完成的文件与摘要比对状态，随后把日志压缩为只包含仍然有效的记录；
+常驻运行时每完成 COMPACT_AFTER 个文件同样压缩一次，日志不会无限增长。
+"""
+import json
+import os
+
+PARTIAL_DIR = '.qr_partial'
+JOURNAL_NAME = 'journal.log'
+TMP_SUFFIX = '.qr-tmp'
+COMPACT_AFTER = 256  # 运行中累计这么多条 done 记录后压缩日志
+
+
+def append_part(path, data):
+    """
+    把一块内容追加到 .part 文件
+    :return: 该块在文件中的偏移
+    """
+    with open(path, 'ab') as f:
+        offset = f.tell()
+        f.write(data)
+    return offset
+
+
+def read_part(path, offset, length):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+def write_atomic(filepath, parts):
+    """
+    写入临时文件、fsync 后原子重命名为目标文件
+    :param parts: bytes 或可迭代的多段 bytes（逐段写入，不必整体读入内存）
+    """
+    if isinstance(parts, bytes):
+        parts = [parts]
+    os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+    tmp = filepath + TMP_SUFFIX
+    with open(tmp, 'wb') as f:
+        for part in parts:
+            f.write(part)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filepath)
+
+
+def live_records(records):
+    """
+    仍然有效的记录：未完成编号（文件或喷泉译码）的全部记录，
+    加上按文件名记录的状态（cdc / sum / written），每种状态每个文件名只保留最后一条
+    """
+    done = {r['id'] for r in records if r['op'] == 'done'}
+    latest = {}
+    for record in records:
+        if 'id' not in record:
+            latest[(record['op'], record['name'])] = record
+    return ([r for r in records if 'id' in r and r['id'] not in done]
+            + [r for r in latest.values() if r.get('len', 0) is not None])
+
+
+class Journal:
+    """
+    追加式日志：每条记录写入后立即 flush，进程崩溃不会丢失已确认的块；
+    fsync 只在空闲收尾时进行，避免每帧都等待磁盘
+    """
+
+    def __init__(self, dst_folder):
+        self.folder = os.path.join(dst_folder, PARTIAL_DIR)
+        self.path = os.path.join(self.folder, JOURNAL_NAME)
+        os.makedirs(self.folder, exist_ok=True)
+        self.records = self._load()
+        self.next_id = max((r['id'] for r in self.records if 'id' in r), default=0) + 1
+        self.finished = 0  # 上次压缩后追加的 done 记录数
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self):
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break  # 崩溃时最后一行可能只写了一半
+        return records
+
+    def new_id(self):
+        ident = self.next_id
+        self.next_id += 1
+        return ident
+
+    def part_path(self, ident):
+        return os.path.join(self.folder, f"{ident}.part")
+
+    def append(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self.records.append(record)
+        if record['op'] == 'done':
+            self.finished += 1
+            if self.finished >= COMPACT_AFTER:
+                self.compact(live_records(self.records))
+
+    def sync(self):
+        os.fsync(self._file.fileno())
+
+    def compact(self, records):
+        """用仍然有效的记录重写日志，并删除不再被引用的 .part 文件"""
+        self._file.close()
+        tmp = self.path + TMP_SUFFIX
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.records = records
+        self.finished = 0
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+        live = {f"{r['id']}.part" for r in records if r['op'] in ('file', 'fountain')}
+        for name in os.listdir(self.folder):
+            if name.endswith('.part') and name not in live:
+                os.remove(os.path.join(self.folder, name))
+
+    def close(self, remove=False):
+        """
+        :param remove: 没有未完成的文件时删除整个 .qr_partial 目录
+        """
+        self._file.close()
+        if remove:
+            for name in os.listdir(self.folder):
+                os.remove(os.path.join(self.folder, name))
+            os.rmdir(self.folder)
@@ -0,0 +1 @@
+# common - 发送端与接收端共用的协议代码
@@ -0,0 +1,128 @@
+# archive.py - 固实归档：整个目录树压缩为一条数据流
+"""
+逐个文件发送时每个文件单独编码，源代码中大量跨文件的重复内容（import、样板代码等）无法利用。
+固实归档把选中的全部文件依次写入一条记录流，整体用 lzma（xz）或 zlib 压缩，
+压缩器的字典跨越文件边界，Python 源码通常可压缩到原来的 1/4 ~ 1/6。
+
+记录流格式（压缩前）：
+    b'QRA1'
+    每个文件：路径长度（2 字节大端）+ 路径（UTF-8，以 / 分隔）+ 内容长度（8 字节大端）+ SHA-256（32 字节）+ 内容
+    结束标记：路径长度为 0
+
+接收端按序号拿到连续的压缩数据就送入解压器（ArchiveExtractor.feed），
+每解出一条完整记录即可写出对应文件，不必等整个归档收齐。
+"""
+import hashlib
+import lzma
+import struct
+import zlib
+
+from common.protocol import check_name
+
+MAGIC = b'QRA1'
+METHODS = ('xz', 'zlib')
+
+_NAME_LEN = struct.Struct('>H')
+_DATA_LEN = struct.Struct('>Q')
+_DIGEST_SIZE = 32
+
+
+def _compressor(method):
+    if method == 'xz':
+        return lzma.LZMACompressor(format=lzma.FORMAT_XZ)
+    if method == 'zlib':
+        return zlib.compressobj(9)
+    raise ValueError(f"未知的压缩方式: {method}")
+
+
+def _decompressor(method):
+    if method == 'xz':
+        return lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+    if method == 'zlib':
+        return zlib.decompressobj()
+    raise ValueError(f"未知的压缩方式: {method}")
+
+
+def build_archive(entries, method='xz'):
+    """
+    :param entries: 可迭代对象，产出 (相对路径, bytes 内容)
+    :param method: 'xz' / 'zlib'
+    :return: 压缩后的归档字节
+    """
+    compressor = _compressor(method)
+    out = [compressor.compress(MAGIC)]
+    for name, data in entries:
+        name = name.replace('\\', '/')
+        check_name(name)
+        encoded = name.encode('utf-8')
+        header = (_NAME_LEN.pack(len(encoded)) + encoded + _DATA_LEN.pack(len(data))
+                  + hashlib.sha256(data).digest())
+        out.append(compressor.compress(header))
+        out.append(compressor.compress(data))
+    out.append(compressor.compress(_NAME_LEN.pack(0)))
+    out.append(compressor.flush())
+    return b''.join(out)
+
+
+class ArchiveExtractor:
+    """
+    增量解压：按顺序喂入压缩数据，产出已完整解出的文件
+    """
+
+    def __init__(self, method):
+        self._decompressor = _decompressor(method)
+        self._buffer = bytearray()
+        self._magic = False
+        self.done = False      # 已读到结束标记
+        self.files = 0         # 已解出的文件数
+
+    def feed(self, data):
+        """
+        :param data: 紧接上一段的压缩数据
+        :return: [(相对路径, 内容, SHA-256 十六进制), ...]，本次新解出的完整文件
+        :raises ValueError: 数据损坏或格式不符
+        """
+        if self.done:
+            return []
+        try:
+            self._buffer += self._decompressor.decompress(data)
+        except (lzma.LZMAError, zlib.error) as e:
+            raise ValueError(f"归档解压失败: {e}") from e
+        if not self._magic:
+            if len(self._buffer) < len(MAGIC):
+                return []
+            if self._buffer[:len(MAGIC)] != MAGIC:
+                raise ValueError("不是固实归档数据")
+            del self._buffer[:len(MAGIC)]
+            self._magic = True
+
+        files = []
+        while True:
+            record = self._next_record()
+            if record is None:
+                break
+            files.append(record)
+        return files
+
+    def _next_record(self):
+        buffer = self._buffer
+        if len(buffer) < _NAME_LEN.size:
+            return None
+        name_len, = _NAME_LEN.unpack_from(buffer)
+        if name_len == 0:
+            self.done = True
+            del buffer[:]
+            return None
+        head = _NAME_LEN.size + name_len + _DATA_LEN.size + _DIGEST_SIZE
+        if len(buffer) < head:
+            return None
+        name = bytes(buffer[_NAME_LEN.size:_NAME_LEN.size + name_len]).decode('utf-8')
+        data_len, = _DATA_LEN.unpack_from(buffer, _NAME_LEN.size + name_len)
+        if len(buffer) < head + data_len:
+            return None
+        check_name(name)
+        digest = bytes(buffer[head - _DIGEST_SIZE:head]).hex()
+        data = bytes(buffer[head:head + data_len])
+        del buffer[:head + data_len]
+        self.files += 1
+        return name, data, digest
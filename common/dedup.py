@@ -0,0 +1,50 @@
+# dedup.py - 基于内容的分块与块哈希（跨文件去重）
+"""
+用 gear 滚动哈希按内容确定切点（FastCDC 思路）：切点只取决于附近几十个字节，
+相同的内容出现在不同文件、不同偏移处时会切出相同的块，插入或删除数据只影响附近的块。
+
+发送端对每个文件分块，本次会话已发送过的块只发送块哈希（引用帧）；
+接收端在文件收齐后用同一函数重新分块，登记到块仓库中，用于解析后续的引用帧。
+"""
+import hashlib
+
+MIN_SIZE = 128    # 最小块长（字节）
+AVG_SIZE = 512    # 平均块长（字节），需为 2 的幂
+MAX_SIZE = 4096   # 最大块长（字节）
+HASH_LEN = 16     # 块哈希长度（SHA-256 十六进制前 16 位）
+
+# gear 表：每个字节值对应一个固定的 32 位随机数（由 MD5 生成，保证发送端与接收端一致）
+_GEAR = [int.from_bytes(hashlib.md5(bytes([i])).digest()[:4], 'big') for i in range(256)]
+
+
+def chunk_hash(chunk):
+    return hashlib.sha256(chunk).hexdigest()[:HASH_LEN]
+
+
+def cdc_chunks(data, min_size=MIN_SIZE, avg_size=AVG_SIZE, max_size=MAX_SIZE):
+    """
+    按内容切分
+    :param data: bytes
+    :return: [bytes, ...]，拼接后等于 data
+    """
+    bits = avg_size.bit_length() - 1
+    # 判断哈希高位：高位受最近 32 个字节共同影响，低位只取决于最后几个字节
+    mask = ((1 << bits) - 1) << (32 - bits)
+    chunks = []
+    start = 0
+    n = len(data)
+    while start < n:
+        end = min(n, start + max_size)
+        cut = end
+        h = 0
+        for i in range(start + min_size, end):
+            h = ((h << 1) + _GEAR[data[i]]) & 0xFFFFFFFF
+            if not h & mask:
+                cut = i + 1
+                break
+        # 不在 UTF-8 多字节字符中间切分，文本文件的每段都能单独按 UTF-8 发送
+        while cut < n and (data[cut] & 0xC0) == 0x80:
+            cut += 1
+        chunks.append(data[start:cut])
+        start = cut
+    return chunks
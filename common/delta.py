@@ -0,0 +1,132 @@
+# delta.py - rsync 风格的块级增量编码
+"""
+发送端保存上次成功发送时每个文件的块签名（弱校验 + 强校验），
+再次发送时用滚动弱校验在新内容中查找与旧块相同的位置，
+输出“复制旧块 / 插入新数据”两种操作组成的增量流；接收端用自己已有的旧文件按增量流重建新文件。
+
+增量流格式：
+    b'QRD1' + u32 块大小 + 32 字节新文件 SHA-256 + 操作序列
+    操作 b'C' + u32 起始块号 + u32 连续块数：复制旧文件中的块
+    操作 b'D' + u32 长度 + 数据：插入新数据
+"""
+import hashlib
+import struct
+
+MAGIC = b'QRD1'
+_MOD = 1 << 16
+
+
+def weak_checksum(block):
+    """rsync 弱校验（可滚动）"""
+    a = sum(block) % _MOD
+    b = sum((len(block) - i) * x for i, x in enumerate(block)) % _MOD
+    return (b << 16) | a
+
+
+def strong_checksum(block):
+    return hashlib.md5(block).hexdigest()[:16]
+
+
+def signature(data, block_size):
+    """
+    计算文件的块签名
+    :return: [[弱校验, 强校验], ...]（可直接存入 JSON）
+    """
+    return [[weak_checksum(data[i:i + block_size]), strong_checksum(data[i:i + block_size])]
+            for i in range(0, len(data), block_size)]
+
+
+def compute_delta(data, old_signature, block_size):
+    """
+    以旧文件的块签名为基准，计算新内容的增量流
+    :param data: bytes，新文件内容
+    :param old_signature: signature() 的结果
+    :return: bytes，增量流
+    """
+    index = {}
+    for number, (weak, strong) in enumerate(old_signature):
+        index.setdefault(weak, []).append((strong, number))
+
+    ops = []            # ('C', 起始块号, 块数) / ('D', 起始偏移, 结束偏移)
+    literal_start = 0
+    pos = 0
+    n = len(data)
+    a = b = 0
+    rolling = False
+    while pos + block_size <= n:
+        if not rolling:
+            block = data[pos:pos + block_size]
+            a = sum(block) % _MOD
+            b = sum((block_size - i) * x for i, x in enumerate(block)) % _MOD
+            rolling = True
+        match = None
+        candidates = index.get((b << 16) | a)
+        if candidates:
+            strong = strong_checksum(data[pos:pos + block_size])
+            match = next((number for s, number in candidates if s == strong), None)
+        if match is not None:
+            if literal_start < pos:
+                ops.append(('D', literal_start, pos))
+            if ops and ops[-1][0] == 'C' and ops[-1][1] + ops[-1][2] == match:
+                ops[-1] = ('C', ops[-1][1], ops[-1][2] + 1)
+            else:
+                ops.append(('C', match, 1))
+            pos += block_size
+            literal_start = pos
+            rolling = False
+            continue
+        # 窗口右移一个字节：移出 data[pos]，移入 data[pos + block_size]
+        if pos + block_size < n:
+            out_byte, in_byte = data[pos], data[pos + block_size]
+            a = (a - out_byte + in_byte) % _MOD
+            b = (b - block_size * out_byte + a) % _MOD
+        pos += 1
+
+    # 末尾不足一块的旧块（文件最后一块）单独尝试匹配
+    tail = data[pos:]
+    if tail and old_signature and len(tail) < block_size:
+        weak, strong = old_signature[-1]
+        if weak_checksum(tail) == weak and strong_checksum(tail) == strong:
+            if literal_start < pos:
+                ops.append(('D', literal_start, pos))
+            ops.append(('C', len(old_signature) - 1, 1))
+            literal_start = n
+    if literal_start < n:
+        ops.append(('D', literal_start, n))
+
+    out = [MAGIC, struct.pack('>I', block_size), hashlib.sha256(data).digest()]
+    for op in ops:
+        if op[0] == 'C':
+            out.append(b'C' + struct.pack('>II', op[1], op[2]))
+        else:
+            out.append(b'D' + struct.pack('>I', op[2] - op[1]) + data[op[1]:op[2]])
+    return b''.join(out)
+
+
+def apply_delta(base, delta):
+    """
+    用旧文件内容与增量流重建新文件
+    :raises ValueError: 增量流格式错误或重建结果校验失败
+    """
+    if delta[:4] != MAGIC:
+        raise ValueError("不是有效的增量流")
+    block_size, = struct.unpack('>I', delta[4:8])
+    digest = delta[8:40]
+    pos = 40
+    out = []
+    while pos < len(delta):
+        op = delta[pos:pos + 1]
+        if op == b'C':
+            start, count = struct.unpack('>II', delta[pos + 1:pos + 9])
+            out.append(base[start * block_size:(start + count) * block_size])
+            pos += 9
+        elif op == b'D':
+            length, = struct.unpack('>I', delta[pos + 1:pos + 5])
+            out.append(delta[pos + 5:pos + 5 + length])
+            pos += 5 + length
+        else:
+            raise ValueError(f"未知的增量操作: {op!r}")
+    data = b''.join(out)
+    if hashlib.sha256(data).digest() != digest:
+        raise ValueError("增量重建结果与目标文件校验不符")
+    return data
@@ -0,0 +1,229 @@
+# fountain.py - LT 喷泉码（无码率纠删码）编解码
+"""
+发送端把文件切成 k 个等长数据块，持续发送编码符号：每个符号是若干数据块的异或，
+参与异或的块由符号种子（seed）确定性地选出。接收端收到略多于 k 个符号（顺序任意、
+允许丢失任意帧）后即可恢复全部数据块：先用剥离（peeling）译码，收到 k 个符号后仍未还原时
+改用高斯消元，避免 k 较小时剥离停滞而需要大量额外符号。
+
+度分布采用鲁棒孤波分布（Robust Soliton）。为保证两端选出的块完全一致，
+不依赖 random 模块的实现细节，而是使用固定的 xorshift32 伪随机数发生器。
+
+还原所需符号数 / k 的实测值（随机数据，每个 k 数百次；c=0.1、delta=0.5，c 取 0.03~0.2
+差别不大，c≥0.5 或 delta=0.05 在小 k 时明显变差）：
+
+    k      平均    99 分位
+    5      1.30    2.40
+    10     1.25    1.90
+    20     1.18    1.60
+    50     1.09    1.32
+    84     1.06    1.36
+    200    1.03    1.20
+
+小 k 的尾部主要来自线性相关（度 1、2 的符号重复覆盖同几块），固定的冗余系数不够，
+发送端每轮的符号数按 round_overhead 随 k 放大。
+"""
+import math
+from bisect import bisect_left
+
+
+class _XorShift32:
+    """xorshift32 伪随机数发生器，发送端与接收端必须完全一致"""
+
+    def __init__(self, seed):
+        # 先打散种子，避免相邻种子产生相关序列；状态不能为 0
+        self.state = ((seed * 2654435761) ^ 0x9E3779B9) & 0xFFFFFFFF or 1
+
+    def next(self):
+        x = self.state
+        x ^= (x << 13) & 0xFFFFFFFF
+        x ^= x >> 17
+        x ^= (x << 5) & 0xFFFFFFFF
+        self.state = x
+        return x
+
+    def below(self, n):
+        """返回 [0, n) 内的整数"""
+        return self.next() % n
+
+
+SMALL_K_OVERHEAD = 3.0  # round_overhead 中的 C：1 + C/sqrt(k) 约等于上表的 99 分位
+
+
+def round_overhead(k, base=1.5):
+    """
+    每轮发送的符号数 / k
+    :param base: 配置的冗余系数，k 较大时使用
+    :return: max(base, 1 + SMALL_K_OVERHEAD/sqrt(k))，保证单轮无丢帧时约 99% 能还原
+    """
+    return max(base, 1 + SMALL_K_OVERHEAD / math.sqrt(k))
+
+
+def robust_soliton_cdf(k, c=0.1, delta=0.5):
+    """
+    鲁棒孤波分布的累积分布（下标 d-1 对应度 d）
+    :param k: 数据块数
+    :param c, delta: 分布参数，delta 越小译码越可靠、冗余越高
+    """
+    if k == 1:
+        return [1.0]
+    rho = [1.0 / k] + [1.0 / (d * (d - 1)) for d in range(2, k + 1)]
+    r = c * math.log(k / delta) * math.sqrt(k)
+    spike = max(1, min(k, int(round(k / r)))) if r > 0 else k
+    tau = [0.0] * k
+    for d in range(1, spike):
+        tau[d - 1] = r / (d * k)
+    tau[spike - 1] = r * math.log(r / delta) / k if r > delta else 0.0
+    weights = [a + b for a, b in zip(rho, tau)]
+    total = sum(weights)
+    cdf = []
+    acc = 0.0
+    for w in weights:
+        acc += w / total
+        cdf.append(acc)
+    cdf[-1] = 1.0
+    return cdf
+
+
+def symbol_blocks(seed, k, cdf):
+    """由种子确定该符号参与异或的数据块下标集合"""
+    rng = _XorShift32(seed)
+    degree = bisect_left(cdf, rng.next() / 0x100000000) + 1
+    degree = min(degree, k)
+    blocks = set()
+    while len(blocks) < degree:
+        blocks.add(rng.below(k))
+    return blocks
+
+
+class LTEncoder:
+    """LT 编码器：对同一份数据可生成任意多个编码符号"""
+
+    def __init__(self, data, block_size):
+        """
+        :param data: bytes，文件完整内容
+        :param block_size: 数据块（即每个符号负载）字节数
+        """
+        self.length = len(data)
+        self.block_size = block_size
+        self.k = max(1, math.ceil(len(data) / block_size))
+        padded = data.ljust(self.k * block_size, b'\0')
+        self._blocks = [int.from_bytes(padded[i * block_size:(i + 1) * block_size], 'big')
+                        for i in range(self.k)]
+        self._cdf = robust_soliton_cdf(self.k)
+
+    def symbol(self, seed):
+        """生成种子为 seed 的编码符号负载（bytes）"""
+        value = 0
+        for index in symbol_blocks(seed, self.k, self._cdf):
+            value ^= self._blocks[index]
+        return value.to_bytes(self.block_size, 'big')
+
+
+class LTDecoder:
+    """LT 译码器：按任意顺序喂入符号，先剥离，停滞时转为高斯消元，凑够后还原数据"""
+
+    def __init__(self, k, length):
+        """
+        :param k: 数据块数
+        :param length: 原始数据长度（去除末块填充）
+        """
+        self.k = k
+        self.length = length
+        self.block_size = None
+        self._cdf = robust_soliton_cdf(k)
+        self._blocks = {}       # 已还原的块：下标 -> 整数值
+        self._waiting = {}      # 未知块下标 -> 依赖它的符号列表
+        self._seen = set()      # 已处理的种子，重复符号直接忽略
+        self._basis = None      # 剥离停滞后启用的消元基：主元块下标 -> [未知块掩码, 值]
+        self.symbols_received = 0
+
+    @property
+    def done(self):
+        return len(self._blocks) == self.k
+
+    def add(self, seed, payload):
+        """
+        喂入一个编码符号
+        :return: 是否已全部还原
+        """
+        if self.done or seed in self._seen:
+            return self.done
+        self._seen.add(seed)
+        self.symbols_received += 1
+        self.block_size = len(payload)
+
+        value = int.from_bytes(payload, 'big')
+        unknown = set()
+        for index in symbol_blocks(seed, self.k, self._cdf):
+            if index in self._blocks:
+                value ^= self._blocks[index]
+            else:
+                unknown.add(index)
+
+        if self._basis is not None:
+            self._insert(sum(1 << index for index in unknown), value)
+            return self.done
+        if len(unknown) == 1:
+            self._resolve(unknown.pop(), value)
+        elif unknown:
+            symbol = [unknown, value]
+            for index in unknown:
+                self._waiting.setdefault(index, []).append(symbol)
+        if not self.done and self.symbols_received >= self.k:
+            self._start_elimination()
+        return self.done
+
+    def _resolve(self, index, value):
+        # 剥离：每还原一个块，就从所有依赖它的符号中消去，度降为 1 的符号继续还原
+        stack = [(index, value)]
+        while stack:
+            index, value = stack.pop()
+            if index in self._blocks:
+                continue
+            self._blocks[index] = value
+            for symbol in self._waiting.pop(index, []):
+                unknown = symbol[0]
+                unknown.discard(index)
+                symbol[1] ^= value
+                if len(unknown) == 1:
+                    stack.append((next(iter(unknown)), symbol[1]))
+
+    def _start_elimination(self):
+        """
+        剥离停滞且已收到至少 k 个符号时，把尚未用完的符号转入高斯消元：
+        之后每个新符号只需与已有的 O(未知块数) 行异或一次即可入基，满秩时回代求出全部未知块
+        """
+        pending = {id(symbol): symbol for symbols in self._waiting.values() for symbol in symbols}
+        if len(pending) < self.k - len(self._blocks):
+            return  # 方程数少于未知块数，不可能满秩，继续剥离
+        self._basis = {}
+        self._waiting = {}
+        for unknown, value in pending.values():
+            self._insert(sum(1 << index for index in unknown), value)
+
+    def _insert(self, mask, value):
+        # 以最低位为主元逐行消去；线性相关的符号消为 0 后丢弃
+        while mask:
+            pivot = (mask & -mask).bit_length() - 1
+            row = self._basis.get(pivot)
+            if row is None:
+                self._basis[pivot] = [mask, value]
+                break
+            mask ^= row[0]
+            value ^= row[1]
+        if len(self._basis) == self.k - len(self._blocks):
+            # 满秩：每行除主元外只含更高位的块，从最高主元开始回代
+            for pivot in sorted(self._basis, reverse=True):
+                mask, value = self._basis[pivot]
+                mask ^= 1 << pivot
+                while mask:
+                    low = mask & -mask
+                    value ^= self._blocks[low.bit_length() - 1]
+                    mask ^= low
+                self._blocks[pivot] = value
+            self._basis = {}
+
+    def data(self):
+        """返回还原后的原始数据（仅在 done 为真时调用）"""
+        joined = b''.join(self._blocks[i].to_bytes(self.block_size, 'big') for i in range(self.k))
+        return joined[:self.length]
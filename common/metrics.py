@@ -0,0 +1,211 @@
+# metrics.py - 分阶段耗时直方图与计数器（发送端与接收端共用）
+"""
+Metrics 记录各处理阶段（截图、颜色转换、识别、解析、写盘、渲染等待、贴图……）的耗时直方图
+以及计数器（显示帧数、识别帧数、重复帧、未变化帧、负载字节数……），用于判断瓶颈所在。
+
+MetricsExporter 定期把快照导出到文件：
+- jsonl：每次追加一行 JSON，便于事后画图或与基准测试结果一起比较；
+- prom：Prometheus 文本格式，整个文件原子替换，可交给 node_exporter 的 textfile 收集器采集。
+
+识别线程与主线程会同时记录，所有更新都在锁内进行。
+未启用统计时使用 NULL_METRICS，接口相同但不做任何事。
+"""
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+
+# 直方图桶上界（秒），最后隐含一个 +Inf 桶
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+FORMATS = ('jsonl', 'prom')
+
+
+class Histogram:
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """按桶上界估算分位数（秒）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (self.max,), self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+class Metrics:
+
+    def __init__(self, role):
+        """
+        :param role: 'sender' / 'receiver'，导出时作为指标名前缀的一部分
+        """
+        self.role = role
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        """记录 with 块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        """
+        :return: 可 JSON 序列化的快照字典
+        """
+        with self._lock:
+            uptime = time.time() - self.started
+            stages = {
+                name: {
+                    'count': h.count,
+                    'mean_ms': round(h.sum / h.count * 1000, 3) if h.count else 0.0,
+                    'p50_ms': round(h.quantile(0.5) * 1000, 3),
+                    'p95_ms': round(h.quantile(0.95) * 1000, 3),
+                    'max_ms': round(h.max * 1000, 3),
+                    'sum_s': round(h.sum, 4),
+                    'buckets': list(h.buckets),
+                }
+                for name, h in self.stages.items()
+            }
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        # 计数器按运行时长折算的平均速率（帧/秒、字节/秒……）
+        rates = {f"{name}_per_s": round(value / uptime, 2) for name, value in counters.items() if uptime > 0}
+        return {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'role': self.role,
+            'uptime_s': round(uptime, 2),
+            'counters': counters,
+            'rates': rates,
+            'gauges': gauges,
+            'stages': stages,
+        }
+
+    def summary(self, names=None):
+        """
+        一行文字摘要，用于叠加显示与收尾日志
+        :param names: 只列出这些计数器（及其速率）与阶段，默认全部
+        """
+        snap = self.snapshot()
+        parts = []
+        for name, value in snap['counters'].items():
+            if names is None or name in names:
+                parts.append(f"{name}={value}({snap['rates'].get(name + '_per_s', 0)}/s)")
+        for name, stage in snap['stages'].items():
+            if names is None or name in names:
+                parts.append(f"{name}={stage['mean_ms']}ms(p95={stage['p95_ms']})")
+        return ' '.join(parts)
+
+    def to_json_line(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False)
+
+    def to_prometheus(self):
+        """Prometheus 文本格式"""
+        prefix = f"qr_{self.role}"
+        snap = self.snapshot()
+        lines = [f"# TYPE {prefix}_uptime_seconds gauge", f"{prefix}_uptime_seconds {snap['uptime_s']}"]
+        for name, value in sorted(snap['counters'].items()):
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {value}"]
+        for name, value in sorted(snap['gauges'].items()):
+            lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+        if snap['stages']:
+            metric = f"{prefix}_stage_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for name, stage in sorted(snap['stages'].items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), stage['buckets']):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {stage["sum_s"]}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {stage["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+class _NullMetrics:
+    """未启用统计时的空实现"""
+
+    def inc(self, name, value=1):
+        pass
+
+    def set(self, name, value):
+        pass
+
+    def observe(self, stage, seconds):
+        pass
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        yield
+
+
+NULL_METRICS = _NullMetrics()
+
+
+class MetricsExporter:
+    """按固定间隔把快照写入文件"""
+
+    def __init__(self, metrics, path, fmt='jsonl', interval=5.0):
+        """
+        :param fmt: 'jsonl'（追加一行）/ 'prom'（原子替换整个文件）
+        :param interval: 导出间隔（秒）
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"未知的统计导出格式: {fmt}")
+        self.metrics = metrics
+        self.path = path
+        self.fmt = fmt
+        self.interval = interval
+        self._last = time.time()
+
+    def maybe_export(self):
+        """距上次导出超过间隔时导出一次"""
+        if time.time() - self._last >= self.interval:
+            self.export()
+
+    def export(self):
+        self._last = time.time()
+        if self.fmt == 'jsonl':
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(self.metrics.to_json_line() + '\n')
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.metrics.to_prometheus())
+        os.replace(tmp, self.path)
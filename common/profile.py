@@ -0,0 +1,40 @@
+# profile.py - 加载标定工具生成的传输参数配置
+"""
+tool/calibrate.py 输出的配置文件为 JSON，其中 settings 段以各入口脚本的配置常量名为键，
+例如 {"settings": {"QR_VERSION": 12, "QR_ERROR_CORRECTION": "M", "INTERVAL": 0.2}}。
+发送端与接收端各自只取自己定义过的常量，其余键由入口脚本列出提示（可能属于另一端，也可能拼写有误）。
+
+配置必须在构建主参数解析器之前加载（见 preload_profile）：argparse 的默认值在添加参数时就已取值，
+之后再修改常量，经由默认值传入程序的参数（如 GRID、COLOR）不会生效。
+"""
+import argparse
+import json
+
+
+def load_profile(path, namespace):
+    """
+    读取配置文件并覆盖 namespace（通常为入口脚本的 globals()）中已有的同名常量
+    :return: (实际生效的 {常量名: 值}, namespace 中没有的键列表)
+    :raises OSError: 文件无法读取
+    :raises ValueError: 文件不是合法的 JSON
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        profile = json.load(f)
+    settings = profile.get('settings', {})
+    # 只覆盖大写的配置常量，不会误改同名的模块或函数
+    applied = {key: value for key, value in settings.items() if key.isupper() and key in namespace}
+    namespace.update(applied)
+    return applied, sorted(key for key in settings if key not in applied)
+
+
+def preload_profile(namespace, argv=None):
+    """
+    只解析命令行中的 --profile 并加载配置，在构建主参数解析器之前调用
+    :return: (配置文件路径, 实际生效的 {常量名: 值}, 未使用的键列表)；未指定 --profile 时路径为 None
+    """
+    pre = argparse.ArgumentParser(add_help=False)
+    pre.add_argument('--profile')
+    args, _ = pre.parse_known_args(argv)
+    if not args.profile:
+        return None, {}, []
+    return (args.profile,) + load_profile(args.profile, namespace)
@@ -0,0 +1,194 @@
+# protocol.py - 二维码帧协议（发送端与接收端共用）
+"""
+帧格式：
+- 路径帧：PATH:<文件名>|N:<总块数>[|DELTA:<基准哈希>][|CDC][|ARC:<压缩方式>][|V:<版本>]|CRC:<校验>
+- 数据帧：FILE:<文件名>|SEQ:<块序号>|N:<总块数>[|B64][|DELTA:<基准哈希>][|CDC][|REF][|ARC:<压缩方式>][|V:<版本>]|CRC:<校验>\n<内容>
+- 喷泉帧：LT:<文件名>|K:<块数>|L:<文件字节数>|S:<种子>|CRC:<校验>\n<base64 符号负载>
+- 摘要帧：SUM:<文件名>|L:<文件字节数>|H:<SHA-256>|CRC:<校验>（每个文件的数据帧之后发送）
+
+头部为 | 分隔的字段，第一个字段为 PATH:/FILE:/LT: 加文件名；
+其余字段为 KEY:VALUE 或单独的标记（如 B64 表示内容经 base64 编码，用于非 UTF-8 文件）。
+CDC 表示发送端启用了内容分块去重（见 common/dedup.py），接收端收齐该文件后登记其中的块；
+REF 表示该帧内容为逗号分隔的块哈希列表，由接收端从块仓库中取出对应的块拼接。
+ARC 表示该“文件”是固实归档（见 common/archive.py），接收端不保存归档本身，而是边收边解压出其中的文件。
+DELTA 表示内容是相对接收端已有旧文件（SHA-256 前 16 位为基准哈希）的增量流，见 common/delta.py。
+V 为完整文件内容 SHA-256 的前 8 位，同名文件版本不同时接收端重新开始重组，
+即使旧版本已经保存（接收端常驻运行），修改后重发的文件也会被接收并覆盖。
+CRC 为去掉 |CRC:<校验> 字段后的整帧文本（头部、换行与内容，按 UTF-8 编码）的 CRC32 十六进制，
+文件名、序号、总块数等头部字段被误读同样能发现，接收端据此丢弃误读或截断的帧；
+SUM 为还原后完整文件的 SHA-256，接收端写盘后比对，一致即标记为已校验。
+旧版发送端的 PATH:<文件名> 与 LINE:<起始行号> 字段（无总块数、无 CRC）仍可被解析。
+文件名会被接收端拼到接收目录下，解析时拒绝绝对路径与含 .. 的路径，这样的帧不会触及接收目录以外的文件。
+"""
+import base64
+import hashlib
+import zlib
+from collections import namedtuple
+
+PATH_PREFIX = "PATH:"
+FILE_PREFIX = "FILE:"
+LT_PREFIX = "LT:"
+SUM_PREFIX = "SUM:"
+FLAG_BASE64 = "B64"
+FLAG_CDC = "CDC"
+FLAG_REF = "REF"
+ARCHIVE_FIELD = "ARC"
+VERSION_FIELD = "V"
+
+CRC_PLACEHOLDER = '0' * 8  # 切分时按定长 CRC 字段估算帧头长度
+
+# kind: 'PATH' / 'CODE' / 'LT' / 'SUM' / 'TEXT'；fields 为头部字段字典；body 为原始内容字符串
+Frame = namedtuple('Frame', ['kind', 'name', 'fields', 'body'])
+
+
+def _format_fields(extra):
+    # 附加字段按 |KEY:VALUE 追加；值为 True 的字段只写标记
+    if not extra:
+        return ''
+    return ''.join(f"|{key}" if value is True else f"|{key}:{value}" for key, value in extra.items())
+
+
+def check_name(name):
+    """
+    帧与归档中的文件名只能是相对路径，且不能跳出接收目录
+    :raises ValueError: 空路径、绝对路径、含 .. 或盘符的路径
+    """
+    parts = name.replace('\\', '/').split('/')
+    if not name or parts[0] == '' or '..' in parts or ':' in parts[0]:
+        raise ValueError(f"文件路径不安全: {name}")
+
+
+def content_version(data):
+    """文件内容版本（V 字段）：完整内容 SHA-256 的前 8 位"""
+    return hashlib.sha256(data).hexdigest()[:8]
+
+
+def _crc_field(crc):
+    # crc 为 None 表示不带 CRC 字段（由 seal 计算后追加）
+    return '' if crc is None else f"|CRC:{crc}"
+
+
+def frame_crc(text):
+    """去掉 CRC 字段后的整帧文本的 CRC32，8 位十六进制"""
+    return f"{zlib.crc32(text.encode('utf-8')):08x}"
+
+
+def seal(header, body=None):
+    """
+    为不含 CRC 字段的头部追加按整帧计算的 CRC 字段，并拼上内容
+    :param body: 帧内容；None 表示只有头部的帧（路径帧、摘要帧）
+    """
+    text = header if body is None else f"{header}\n{body}"
+    crc = frame_crc(text)
+    return f"{header}|CRC:{crc}" if body is None else f"{header}|CRC:{crc}\n{body}"
+
+
+def build_path_frame(name, total, extra=None):
+    """
+    构造路径帧
+    :param extra: 附加字段字典（如 {'DELTA': 基准哈希}）
+    """
+    return seal(f"{PATH_PREFIX}{name}|N:{total}" + _format_fields(extra))
+
+
+def build_chunk_header(name, seq, total, binary=False, extra=None, crc=CRC_PLACEHOLDER):
+    """
+    构造数据帧头部（不含换行）
+    :param crc: 估算帧头长度时使用默认的占位值；None 表示不带 CRC 字段，由 seal() 按整帧计算后追加
+    """
+    header = f"{FILE_PREFIX}{name}|SEQ:{seq}|N:{total}"
+    if binary:
+        header += f"|{FLAG_BASE64}"
+    return header + _format_fields(extra) + _crc_field(crc)
+
+
+def build_lt_header(name, k, length, seed, crc=CRC_PLACEHOLDER):
+    """构造喷泉帧头部（不含换行），crc 的含义同 build_chunk_header"""
+    return f"{LT_PREFIX}{name}|K:{k}|L:{length}|S:{seed}" + _crc_field(crc)
+
+
+def build_digest_frame(name, length, digest):
+    """
+    构造摘要帧
+    :param length: 完整文件的字节数（用于区分同名文件的不同版本）
+    :param digest: 完整文件的 SHA-256 十六进制
+    """
+    return seal(f"{SUM_PREFIX}{name}|L:{length}|H:{digest}")
+
+
+def check_crc(data):
+    """
+    整帧文本与其中的 CRC 字段一致时返回 True；旧版发送端的帧没有 CRC 字段，视为通过
+    :param data: 二维码文本（未解析的原始帧）
+    """
+    header, newline, body = data.partition('\n')
+    items = header.split('|')
+    crcs = [item for item in items if item.startswith('CRC:')]
+    if not crcs:
+        return True
+    text = '|'.join(item for item in items if not item.startswith('CRC:')) + newline + body
+    return len(crcs) == 1 and crcs[0][4:] == frame_crc(text)
+
+
+def encode_body(content, binary=False):
+    """
+    将一块原始字节编码为可放入二维码的字符串
+    :param content: bytes，文件中的一段内容
+    :param binary: 是否按 base64 编码（非 UTF-8 文件）
+    """
+    if binary:
+        return base64.b64encode(content).decode('ascii')
+    return content.decode('utf-8')
+
+
+def decode_body(frame):
+    """将数据帧内容还原为原始字节"""
+    if frame.kind == 'LT' or FLAG_BASE64 in frame.fields:
+        return base64.b64decode(frame.body)
+    return frame.body.encode('utf-8')
+
+
+def build_ref_body(hashes):
+    """引用帧内容：逗号分隔的块哈希"""
+    return ','.join(hashes)
+
+
+def parse_ref_body(frame):
+    """引用帧内容还原为块哈希元组"""
+    return tuple(frame.body.split(','))
+
+
+def parse_header(header):
+    """
+    解析 | 分隔的头部
+    :return: (文件名, 字段字典)；无值的标记字段映射为 True
+    """
+    first, *rest = header.split('|')
+    _, name = first.split(':', 1)
+    fields = {}
+    for item in rest:
+        key, sep, value = item.partition(':')
+        fields[key.strip()] = value.strip() if sep else True
+    return name.strip(), fields
+
+
+def parse_frame(data):
+    """
+    解析二维码文本为 Frame
+    :raises ValueError: 头部格式无法识别，或文件名不安全（见 check_name）
+    """
+    if data.startswith(PATH_PREFIX):
+        name, fields = parse_header(data)
+        check_name(name)
+        return Frame('PATH', name, fields, '')
+    if data.startswith(SUM_PREFIX):
+        name, fields = parse_header(data)
+        check_name(name)
+        return Frame('SUM', name, fields, '')
+    if data.startswith(FILE_PREFIX) or data.startswith(LT_PREFIX):
+        header, _, body = data.partition('\n')
+        name, fields = parse_header(header)
+        check_name(name)
+        kind = 'CODE' if data.startswith(FILE_PREFIX) else 'LT'
+        return Frame(kind, name, fields, body)
+    return Frame('TEXT', None, {}, data)
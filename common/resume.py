@@ -0,0 +1,119 @@
+# resume.py - 断点续传清单（接收端导出，发送端读取）
+"""
+传输中断或部分失败后，接收端导出一份续传清单，发送端据此只发送缺少的部分。
+清单要能手工抄写或拍照带回发送端，因此只用短的十六进制标记，不写完整路径：
+
+    QRR1
+    3f9a1c2e 7b00d1aa 91ee0f3c        已完整收到的文件：sha256(路径 + \\0 + 内容) 前 8 位
+    5e1f2a3b:c41d09e7:120:17,40-45    未收齐的文件：sha256(路径) 前 8 位 : 内容版本 : 总块数 : 缺失块序号区间
+
+已完整收到的标记包含文件内容，发送端的文件改动过就不会匹配，会重新完整发送。
+未收齐文件的内容版本（帧协议的 V 字段，见 common/protocol.py）与发送端当前文件不同时，
+说明文件在中断后被修改过，接收端会为新版本重新开始重组，只补发缺失块无法收齐，因此完整发送；
+总块数与发送端当前切分结果不一致时同样完整发送。
+旧版清单中不带内容版本的未收齐条目无法确认内容未变，也完整发送。清单中未出现的文件一律完整发送。
+"""
+import hashlib
+
+from common.protocol import content_version
+
+MAGIC = 'QRR1'
+TOKEN_LEN = 8
+TOKENS_PER_LINE = 8
+
+
+def _normalize(name):
+    # 发送端与接收端可能是不同的操作系统，路径分隔符统一为 /
+    return name.replace('\\', '/').encode('utf-8')
+
+
+def file_token(name, data):
+    """已完整收到的文件标记（路径与内容都相同才匹配）"""
+    return hashlib.sha256(_normalize(name) + b'\0' + data).hexdigest()[:TOKEN_LEN]
+
+
+def name_token(name):
+    """未收齐文件的标记（只由路径决定）"""
+    return hashlib.sha256(_normalize(name)).hexdigest()[:TOKEN_LEN]
+
+
+def format_ranges(indexes):
+    """将有序下标列表压缩为区间字符串，如 [1, 2, 3, 7] -> '1-3,7'"""
+    ranges = []
+    for index in indexes:
+        if ranges and ranges[-1][1] == index - 1:
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+    return ','.join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+def parse_ranges(text):
+    """format_ranges 的逆操作，'1-3,7' -> [1, 2, 3, 7]"""
+    indexes = []
+    for item in text.split(','):
+        if not item:
+            continue
+        start, _, end = item.partition('-')
+        indexes.extend(range(int(start), int(end or start) + 1))
+    return indexes
+
+
+def format_resume(completed, partial):
+    """
+    :param completed: [file_token, ...]
+    :param partial: [(name_token, 内容版本, 总块数, [缺失序号, ...]), ...]
+    :return: 清单文本
+    """
+    lines = [MAGIC]
+    completed = sorted(completed)
+    for i in range(0, len(completed), TOKENS_PER_LINE):
+        lines.append(' '.join(completed[i:i + TOKENS_PER_LINE]))
+    for token, version, total, missing in sorted(partial):
+        lines.append(f"{token}:{version}:{total}:{format_ranges(missing)}")
+    return '\n'.join(lines) + '\n'
+
+
+class ResumePlan:
+    """发送端读取的续传清单"""
+
+    def __init__(self, text):
+        """
+        :raises ValueError: 清单中有无法识别的条目
+        """
+        self.completed = set()
+        self.partial = {}    # name_token -> (内容版本, 总块数, [缺失序号, ...])；旧版清单的内容版本为 None
+        for line in text.splitlines():
+            line = line.strip().lower()
+            if not line or line.startswith('#') or line == MAGIC.lower():
+                continue
+            for item in line.split():
+                if ':' in item:
+                    fields = item.split(':')
+                    if len(fields) == 4:
+                        token, version, total, ranges = fields
+                    elif len(fields) == 3:
+                        (token, total, ranges), version = fields, None
+                    else:
+                        raise ValueError(f"无法识别的续传条目: {item}")
+                    self.partial[token] = (version, int(total), parse_ranges(ranges))
+                elif len(item) == TOKEN_LEN:
+                    self.completed.add(item)
+                else:
+                    raise ValueError(f"无法识别的续传条目: {item}")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(f.read())
+
+    def plan(self, name, data):
+        """
+        :return: ('skip', None) / ('partial', (总块数, [缺失序号, ...])) / ('full', None)
+        """
+        if file_token(name, data) in self.completed:
+            return 'skip', None
+        entry = self.partial.get(name_token(name))
+        if entry is not None and entry[0] == content_version(data):
+            return 'partial', entry[1:]
+        return 'full', None
@@ -0,0 +1,300 @@
+# file_index.py - 发送端的文件索引：排除规则、扩展名与大小过滤、发送顺序
+"""
+用 os.scandir 递归列出待发送的文件，取代 os.walk 全量遍历：
+- 排除规则与 .gitignore 语法相同（*、?、[...]、**、! 取反、/ 结尾只匹配目录、含 / 时相对所在目录锚定），
+  目录中的 .gitignore 只作用于该目录及其子目录；被排除的目录不再进入；
+- 默认排除 .git、__pycache__、接收端的 .qr_partial 日志目录与 .pyc；
+- 可按扩展名、文件大小过滤，并按文件名、大小（小文件优先，尽早得到可用文件）或修改时间排序。
+
+各目录的列表（文件名与子目录名）按目录的修改时间缓存在 ~/.qr_scan/ 下：
+目录中新增、删除、改名都会更新目录的修改时间，未变化的目录再次发送时无需重新读取。
+修改时间距扫描时刻过近的目录不写入缓存，避免同一时间粒度内的后续改动被漏掉。
+文件大小与修改时间只在大小过滤或排序需要时才读取，且每次都重新读取。
+同一个索引反复扫描时（监视模式）目录列表缓存保留在内存中，只在有变化时写回磁盘。
+"""
+import hashlib
+import json
+import os
+import re
+import time
+
+STATE_DIR = os.path.join(os.path.expanduser('~'), '.qr_scan')
+IGNORE_FILE = '.gitignore'
+DEFAULT_EXCLUDES = ('.git/', '__pycache__/', '.qr_partial/', '*.pyc')
+ORDERS = ('name', 'size', 'mtime')  # 文件名 / 大小升序 / 修改时间从新到旧
+RACY_WINDOW_NS = 2 * 10 ** 9  # 修改时间在扫描前该时长以内的目录不缓存
+
+_SIZE_UNITS = {'': 1, 'B': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+
+def parse_size(text):
+    """'512'、'64K'、'1.5M' -> 字节数（用作 argparse 的 type）"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([BKMG]?)(?:I?B)?\s*', text.upper())
+    if not match:
+        raise ValueError(f"无法识别的大小: {text}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+
+def format_size(size):
+    for unit, factor in (('GiB', 1 << 30), ('MiB', 1 << 20), ('KiB', 1 << 10)):
+        if size >= factor:
+            return f"{size / factor:.1f} {unit}"
+    return f"{size} B"
+
+
+def _translate(pattern):
+    """gitignore 通配符 -> 正则表达式（* 与 ? 不跨越 /，** 可跨越多级目录）"""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            out.append('.*')
+            i += 2
+            continue
+        if c == '*':
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[0] == '!':
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return re.compile(''.join(out) + r'\Z')
+
+
+class IgnoreRules:
+    """
+    一组 gitignore 风格的规则，后出现的规则优先
+    """
+
+    def __init__(self, rules=()):
+        # [(取反, 只匹配目录, 锚定, 作用目录前缀, 正则), ...]
+        self.rules = list(rules)
+
+    def add(self, line, base=''):
+        """
+        :param line: 一条规则（.gitignore 中的一行）
+        :param base: 规则所在目录相对于发送根目录的前缀（以 / 结尾），根目录为 ''
+        """
+        line = line.rstrip('\r\n')
+        if not line.endswith('\\ '):
+            line = line.rstrip(' ')
+        if not line or line.startswith('#'):
+            return
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            return
+        # 开头或中间含 / 的规则相对于所在目录锚定，否则匹配任意层级的名字
+        anchored = '/' in line
+        self.rules.append((negate, dir_only, anchored, base, _translate(line.lstrip('/'))))
+
+    def extended(self, lines, base=''):
+        """:return: 追加了 lines 的新规则集（子目录的 .gitignore 不影响父目录的规则集）"""
+        rules = IgnoreRules(self.rules)
+        for line in lines:
+            rules.add(line, base)
+        return rules
+
+    def excluded(self, path, is_dir):
+        """
+        :param path: 相对于发送根目录的路径，以 / 分隔
+        """
+        result = False
+        for negate, dir_only, anchored, base, regex in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not path.startswith(base):
+                    continue
+                rel = path[len(base):]
+            else:
+                rel = path
+            if regex.match(rel if anchored else rel.rpartition('/')[2]):
+                result = not negate
+        return result
+
+
+class FileIndex:
+    """
+    待发送文件的索引
+    """
+
+    def __init__(self, root, excludes=(), extensions=None, min_size=0, max_size=None, order='name',
+                 gitignore=True, cache=True, state_dir=STATE_DIR):
+        """
+        :param root: 发送目录
+        :param excludes: 额外的排除规则（gitignore 语法），在默认规则与根目录 .gitignore 之后生效
+        :param extensions: 只保留这些扩展名（如 ('.py', '.txt')，不区分大小写）；None 表示不限
+        :param min_size: 最小文件字节数
+        :param max_size: 最大文件字节数；None 表示不限
+        :param order: 'name' / 'size'（小文件优先）/ 'mtime'（最近修改优先）
+        :param gitignore: 是否读取各目录中的 .gitignore
+        :param cache: 是否按目录修改时间缓存目录列表
+        """
+        if order not in ORDERS:
+            raise ValueError(f"未知的发送顺序: {order}")
+        self.root = root
+        self.excludes = tuple(excludes)
+        self.extensions = tuple(ext.lower() if ext.startswith('.') else '.' + ext.lower()
+                                for ext in extensions) if extensions else None
+        self.min_size = min_size
+        self.max_size = max_size
+        self.order = order
+        self.gitignore = gitignore
+        key = hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[:16]
+        self.cache_path = os.path.join(state_dir, f"index-{key}.json") if cache else None
+        self.sizes = {}  # {相对路径: (大小, 修改时间 ns)}，只含读取过属性的文件
+        self.stats = {}
+        self._dirs = None  # 上次扫描后的目录列表缓存
+
+    def describe(self):
+        """当前过滤条件与发送顺序的说明，用于日志"""
+        parts = [f"扩展名 {' '.join(self.extensions)}" if self.extensions else "全部扩展名"]
+        if self.min_size:
+            parts.append(f"≥ {format_size(self.min_size)}")
+        if self.max_size is not None:
+            parts.append(f"≤ {format_size(self.max_size)}")
+        if self.excludes:
+            parts.append(f"排除 {' '.join(self.excludes)}")
+        parts.append({'name': '按文件名', 'size': '小文件优先', 'mtime': '最近修改优先'}[self.order])
+        return '，'.join(parts)
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('dirs', {})
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 文件索引缓存无法读取，将重新扫描: {e}")
+            return {}
+
+    def _save_cache(self, dirs):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp = self.cache_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'dirs': dirs}, f)
+        os.replace(tmp, self.cache_path)
+
+    def _list_dir(self, path, rel, cached, fresh, now):
+        """
+        :return: (文件名列表, 子目录名列表)；目录修改时间与缓存一致时直接使用缓存
+        """
+        mtime = os.stat(path).st_mtime_ns
+        entry = cached.get(rel)
+        if entry is not None and entry['mtime'] == mtime:
+            self.stats['cached_dirs'] += 1
+        else:
+            files, dirs = [], []
+            with os.scandir(path) as entries:
+                for item in entries:
+                    # 指向目录的符号链接不进入，避免循环
+                    if item.is_dir(follow_symlinks=False):
+                        dirs.append(item.name)
+                    elif item.is_file():
+                        files.append(item.name)
+            entry = {'mtime': mtime, 'files': files, 'dirs': dirs}
+        if now - mtime >= RACY_WINDOW_NS:
+            fresh[rel] = entry
+        self.stats['dirs'] += 1
+        return entry['files'], entry['dirs']
+
+    def _stat(self, rel):
+        st = os.stat(os.path.join(self.root, rel))
+        self.sizes[rel] = (st.st_size, st.st_mtime_ns)
+        return self.sizes[rel]
+
+    def scan(self, stat=False):
+        """
+        :param stat: 是否读取全部文件的大小与修改时间（保存在 self.sizes 中）
+        :return: 相对于 root 的文件路径列表（以 / 分隔），已过滤并排序
+        """
+        self.sizes = {}
+        self.stats = {'dirs': 0, 'cached_dirs': 0, 'excluded': 0, 'filtered': 0}
+        cached = self._dirs if self._dirs is not None else self._load_cache()
+        fresh = {}
+        now = time.time_ns()
+
+        rules = IgnoreRules().extended(DEFAULT_EXCLUDES)
+        # 根目录的 .gitignore 在扫描根目录时读取，命令行规则最后追加以保证优先
+        stack = [('', self.root, rules)]
+        files = []
+        while stack:
+            rel_dir, path, rules = stack.pop()
+            try:
+                names, dirs = self._list_dir(path, rel_dir, cached, fresh, now)
+            except OSError:
+                continue  # 列出上级目录后被删除
+            prefix = rel_dir + '/' if rel_dir else ''
+            if self.gitignore and IGNORE_FILE in names:
+                ignore_path = os.path.join(path, IGNORE_FILE)
+                try:
+                    with open(ignore_path, 'r', encoding='utf-8', errors='replace') as f:
+                        rules = rules.extended(f, prefix)
+                except OSError as e:
+                    print(f"⚠️ 无法读取 {ignore_path}: {e}")
+            if not rel_dir:
+                rules = rules.extended(self.excludes)
+            for name in dirs:
+                rel = prefix + name
+                if rules.excluded(rel, True):
+                    self.stats['excluded'] += 1
+                    continue
+                stack.append((rel, os.path.join(path, name), rules))
+            for name in names:
+                rel = prefix + name
+                if rules.excluded(rel, False):
+                    self.stats['excluded'] += 1
+                    continue
+                if self.extensions and not name.lower().endswith(self.extensions):
+                    self.stats['filtered'] += 1
+                    continue
+                files.append(rel)
+
+        if stat or self.min_size or self.max_size is not None or self.order != 'name':
+            kept = []
+            for rel in files:
+                try:
+                    size, _ = self._stat(rel)
+                except OSError:
+                    continue  # 扫描后被删除
+                if size < self.min_size or (self.max_size is not None and size > self.max_size):
+                    self.stats['filtered'] += 1
+                    continue
+                kept.append(rel)
+            files = kept
+
+        files.sort()
+        if self.order == 'size':
+            files.sort(key=lambda rel: self.sizes[rel][0])
+        elif self.order == 'mtime':
+            files.sort(key=lambda rel: self.sizes[rel][1], reverse=True)
+
+        if self.cache_path and fresh != cached:
+            try:
+                self._save_cache(fresh)
+            except OSError as e:
+                print(f"⚠️ 文件索引缓存无法写入: {e}")
+        self._dirs = fresh
+        return files
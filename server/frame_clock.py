@@ -0,0 +1,75 @@
+# frame_clock.py - 发送端帧时钟：按固定节拍计算每帧的截止时间
+"""
+显示循环不再在每帧之后 sleep 固定时长（实际周期 = 间隔 + 渲染 + 贴图 + Tk 刷新，长时间运行会漂移），
+而是以第一帧的显示时刻为原点，第 i 帧的截止时间为 原点 + i × 间隔，
+每帧显示后计算到下一帧截止时间的剩余时长，交给 Tk 事件循环（root.after）定时回调。
+
+某一帧晚于截止时间超过容差即记为错过截止时间；晚了一个间隔以上时把原点整体后移，
+后续帧仍按完整间隔显示，而不是连续补发几帧（接收端来不及截图）。
+"""
+import time
+
+DEADLINE_TOLERANCE = 0.005  # 晚于截止时间多少秒以内不算错过（Tk 定时器精度约 1 毫秒）
+
+
+class FrameClock:
+
+    def __init__(self, interval, tolerance=DEADLINE_TOLERANCE, clock=time.perf_counter):
+        """
+        :param interval: 帧周期（秒）
+        :param tolerance: 错过截止时间的判定容差（秒）
+        :param clock: 单调时钟函数
+        """
+        self.interval = interval
+        self.tolerance = tolerance
+        self.clock = clock
+        self.origin = None   # 第 0 帧的截止时间
+        self.index = 0       # 下一帧的序号
+        self.shown = 0
+        self.missed = 0
+        self.max_late = 0.0
+        self.first_shown = None
+        self.last_shown = None
+
+    def tick(self):
+        """
+        记录一帧已显示
+        :return: 本帧晚于截止时间的秒数；未错过截止时间时为 0
+        """
+        now = self.clock()
+        if self.origin is None:
+            self.origin = now
+            self.first_shown = now
+        late = now - (self.origin + self.index * self.interval)
+        self.shown += 1
+        self.last_shown = now
+        self.index += 1
+        if late <= self.tolerance:
+            return 0.0
+        self.missed += 1
+        self.max_late = max(self.max_late, late)
+        if late >= self.interval:
+            # 重新对齐节拍：下一帧从本帧显示时刻起算一个完整间隔
+            self.origin += (late // self.interval) * self.interval
+        return late
+
+    def remaining(self):
+        """距离下一帧截止时间的秒数（已过截止时间时为 0）"""
+        if self.origin is None:
+            return 0.0
+        return max(0.0, self.origin + self.index * self.interval - self.clock())
+
+    def summary(self):
+        """
+        :return: {'shown': 显示帧数, 'missed': 错过截止时间的帧数,
+                  'max_late_ms': 最大延迟（毫秒）, 'period_ms': 实际平均帧周期（毫秒）}
+        """
+        period = 0.0
+        if self.shown > 1:
+            period = (self.last_shown - self.first_shown) / (self.shown - 1)
+        return {
+            'shown': self.shown,
+            'missed': self.missed,
+            'max_late_ms': round(self.max_late * 1000, 1),
+            'period_ms': round(period * 1000, 1),
+        }
@@ -0,0 +1,200 @@
+# frames.py - 发送端帧序列生成（与显示方式无关）
+"""
+把待发送的文件转换为 (日志描述, 帧数据) 序列，供 Tk 窗口、终端或无界面的基准测试共用。
+"""
+import hashlib
+import itertools
+import math
+import os
+
+from common import protocol
+from common.archive import build_archive
+from common.fountain import round_overhead
+from packing import (build_dedup_frames, build_digest_frame, build_file_frames, build_fountain_frame,
+                     fountain_encoder)
+
+
+class FrameSource:
+    """
+    帧序列生成器
+    """
+
+    def __init__(self, folder_path, version, error_correction, chunk_bytes=None,
+                 fountain_overhead=1.5, fountain_rounds=0, state=None, dedup=False, resume=None):
+        """
+        :param folder_path: 待发送文件所在的根目录
+        :param version: 二维码版本
+        :param error_correction: 纠错等级名称
+        :param chunk_bytes: 单帧负载上限（字节），None 表示只受二维码容量限制
+        :param fountain_overhead: 喷泉模式下每轮为每个文件发送的符号数 = 块数 k × 该系数（k 较小时自动放大，见 round_overhead）
+        :param fountain_rounds: 喷泉模式的发送轮数；0 表示无限循环
+        :param state: TransferState，提供时只发送新增或变化的文件（变化文件尽量只发块增量）
+        :param dedup: 是否按内容分块去重（本次会话已发送过的块只发送块哈希）
+        :param resume: ResumePlan，提供时跳过接收端已有的文件，未收齐的文件只发送缺失块
+        """
+        self.folder_path = folder_path
+        self.version = version
+        self.error_correction = error_correction
+        self.chunk_bytes = chunk_bytes
+        self.fountain_overhead = fountain_overhead
+        self.fountain_rounds = fountain_rounds
+        self.state = state
+        self.sent_chunks = set() if dedup else None  # 去重模式：本次会话已发送的块哈希
+        self.resume = resume
+
+    def iter_file_frames(self, filepath, filename):
+        """
+        生成单个文件的全部帧：
+        1. 先是文件路径信息（以 PATH: 开头）
+        2. 再是按字节预算切分的数据块（每帧尽量装满二维码容量）
+        :param filepath: 文件完整路径（含目录）
+        :param filename: 相对路径（写入帧头）
+        :return: 生成器，产出 (日志描述, 帧数据)
+        """
+        # 以二进制方式读取文件，非 UTF-8 文件会以 base64 编码发送
+        try:
+            with open(filepath, 'rb') as f:
+                data = f.read()
+        except Exception as e:
+            # 如果文件打不开（权限问题等），打印错误并跳过
+            print(f"无法读取文件 {filepath}: {e}")
+            return
+
+        # 路径帧与数据帧都带内容版本，常驻的接收端据此区分同名文件的新旧版本
+        version = {protocol.VERSION_FIELD: protocol.content_version(data)}
+        if self.resume is not None:
+            action, info = self.resume.plan(filename, data)
+            if action == 'skip':
+                print(f"接收端已有，跳过: {filename}")
+                return
+            if action == 'partial':
+                total, missing = info
+                # 接收端只为普通分块文件列出缺失块，且内容版本已确认一致，按同样的方式重新切分即可得到相同的帧
+                frames = build_file_frames(filename, data, self.version, self.error_correction,
+                                           self.chunk_bytes, version)
+                if len(frames) == total:
+                    print(f"续传: {filename} 只发送缺失的 {len(missing)}/{total} 块")
+                    yield (f"发送文件路径: {filename}（续传 {len(missing)} 帧）",
+                           protocol.build_path_frame(filename, total, version))
+                    for seq in missing:
+                        if seq < total:
+                            yield f"发送二维码: {filename} 第 {seq} 块", frames[seq]
+                    yield f"发送文件摘要: {filename}", build_digest_frame(filename, data)
+                    return
+                print(f"续传: {filename} 的切分结果与接收端不一致，完整重发")
+
+        digest_frame = build_digest_frame(filename, data)  # 摘要按完整文件计算（增量发送时同样如此）
+        extra = version
+        if self.state is not None:
+            action, info = self.state.plan(filename, data)
+            if action == 'skip':
+                print(f"未变化，跳过: {filename}")
+                return
+            if action == 'delta':
+                delta, base = info
+                print(f"发送增量: {filename}（全文 {len(data)} 字节，增量 {len(delta)} 字节）")
+                data = delta
+                extra = dict(extra, DELTA=base[:16])
+
+        if self.sent_chunks is not None:
+            frames, reused = build_dedup_frames(filename, data, self.version, self.error_correction,
+                                                self.sent_chunks, self.chunk_bytes, extra)
+            extra = dict(extra, **{protocol.FLAG_CDC: True})
+            if reused:
+                print(f"去重: {filename} 中 {reused}/{len(data)} 字节已发送过，改为引用")
+        else:
+            frames = build_file_frames(filename, data, self.version, self.error_correction,
+                                       self.chunk_bytes, extra)
+
+        # 文件路径元信息
+        yield (f"发送文件路径: {filename}（{len(data)} 字节，{len(frames)} 帧）",
+               protocol.build_path_frame(filename, len(frames), extra))
+
+        # 数据帧，格式：FILE:<文件名>|SEQ:<块序号>|N:<总块数>[|B64]\n<内容>
+        for seq, frame in enumerate(frames):
+            yield f"发送二维码: {filename} 第 {seq} 块", frame
+
+        # 摘要帧，格式：SUM:<文件名>|L:<字节数>|H:<SHA-256>|CRC:<校验>，接收端写盘后比对
+        yield f"发送文件摘要: {filename}", digest_frame
+
+    def iter_files(self, files):
+        """
+        依次生成多个文件的全部帧，汇成一条流
+        :param files: 相对于 folder_path 的路径列表
+        """
+        for filename in files:
+            filepath = os.path.join(self.folder_path, filename)  # 构造完整路径
+            yield from self.iter_file_frames(filepath, filename)
+
+    def iter_archive_frames(self, files, method='xz'):
+        """
+        固实归档模式：全部文件依次写入一条记录流整体压缩，再按字节预算切分为数据帧，
+        跨文件的重复内容也能被压缩；接收端按序号收到连续的数据即边解压边写出文件
+        :param files: 相对路径列表
+        :param method: 压缩方式 'xz' / 'zlib'
+        :return: 生成器，产出 (日志描述, 帧数据)
+        """
+        entries = []
+        raw = 0
+        for filename in files:
+            filepath = os.path.join(self.folder_path, filename)
+            try:
+                with open(filepath, 'rb') as f:
+                    data = f.read()
+            except Exception as e:
+                print(f"无法读取文件 {filepath}: {e}")
+                continue
+            entries.append((filename, data))
+            raw += len(data)
+        if not entries:
+            return
+
+        blob = build_archive(entries, method)
+        # 归档名带内容哈希：内容不同的两次发送不会在接收端混在一起重组
+        folder = os.path.basename(os.path.normpath(self.folder_path)) or 'archive'
+        name = f"{folder}-{hashlib.sha256(blob).hexdigest()[:8]}.qra"
+        extra = {protocol.ARCHIVE_FIELD: method}
+        frames = build_file_frames(name, blob, self.version, self.error_correction, self.chunk_bytes, extra)
+        print(f"固实归档: {len(entries)} 个文件 {raw} 字节，{method} 压缩后 {len(blob)} 字节"
+              f"（{raw / max(1, len(blob)):.1f} 倍），共 {len(frames)} 帧")
+
+        yield (f"发送归档路径: {name}（{len(blob)} 字节，{len(frames)} 帧）",
+               protocol.build_path_frame(name, len(frames), extra))
+        for seq, frame in enumerate(frames):
+            yield f"发送二维码: {name} 第 {seq} 块", frame
+
+    def iter_fountain_frames(self, files):
+        """
+        喷泉模式：为每个文件创建 LT 编码器，逐轮为每个文件发送 k×round_overhead(k) 个新符号，
+        接收端收到略多于 k 个符号（顺序任意）即可还原文件，漏掉的帧无需整体重发
+        :param files: 相对路径列表
+        :return: 生成器，产出 (日志描述, 帧数据)
+        """
+        encoders = []
+        for filename in files:
+            filepath = os.path.join(self.folder_path, filename)
+            try:
+                with open(filepath, 'rb') as f:
+                    data = f.read()
+            except Exception as e:
+                print(f"无法读取文件 {filepath}: {e}")
+                continue
+            if self.resume is not None and self.resume.plan(filename, data)[0] == 'skip':
+                print(f"接收端已有，跳过: {filename}")
+                continue
+            encoder = fountain_encoder(filename, data, self.version, self.error_correction, self.chunk_bytes)
+            print(f"喷泉编码: {filename}（{len(data)} 字节，{encoder.k} 块）")
+            encoders.append((filename, encoder, build_digest_frame(filename, data)))
+        if not encoders:
+            return
+
+        next_seed = dict.fromkeys(files, 1)
+        rounds = range(self.fountain_rounds) if self.fountain_rounds else itertools.count()
+        for round_no in rounds:
+            for filename, encoder, digest_frame in encoders:
+                count = math.ceil(encoder.k * round_overhead(encoder.k, self.fountain_overhead))
+                for seed in range(next_seed[filename], next_seed[filename] + count):
+                    yield (f"发送喷泉符号: {filename} 第 {round_no} 轮 种子 {seed}",
+                           build_fountain_frame(filename, encoder, seed))
+                next_seed[filename] += count
+                yield f"发送文件摘要: {filename}", digest_frame
@@ -1,28 +1,71 @@
 """
 Q1: package install
 在运行前请确保安装所需依赖：
-pip install qrcode[pil] pillow
+pip install qrcode[pil] pillow numpy
 
 说明：
 - qrcode[pil]：用于生成二维码图像（PIL 支持）
 - pillow：提供图像处理支持（如缩放、显示）
+- numpy：按模块矩阵整数倍放大二维码
 """
 
 # sender.py - A电脑运行
-# 功能：遍历指定文件夹中的所有 .py 文件，将其内容分块编码为二维码，并通过 GUI 窗口逐个展示
+# 功能：按文件索引（排除规则、扩展名与大小过滤、发送顺序）选出文件夹中的文件，将其内容分块编码为二维码，并通过 GUI 窗口逐个展示
 # 使用场景：可用于向 B 设备（如手机）传输 Python 源码，通过扫码方式接收
 
+import math                # 定时回调的毫秒数向上取整
 import os                  # 用于操作文件系统（路径、读取目录等）
-import qrcode              # 生成二维码的核心库
-import time                # 控制时间间隔（sleep）
-from PIL import Image, ImageTk  # PIL 用于图像处理；ImageTk 将 PIL 图像嵌入 Tkinter
+from PIL import ImageTk    # ImageTk 将 PIL 图像嵌入 Tkinter
 import tkinter as tk       # 创建图形用户界面（GUI），用于显示二维码
 import sys                 # 处理命令行参数
+import argparse            # 解析命令行选项
+
+# 允许导入仓库根目录下的 common 包（发送端与接收端共用的协议代码）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.archive import METHODS as ARCHIVE_METHODS
+from common.metrics import FORMATS as METRICS_FORMATS, NULL_METRICS, Metrics, MetricsExporter
+from common.profile import preload_profile
+from common.resume import ResumePlan
+from file_index import ORDERS, FileIndex, parse_size
+from frame_clock import FrameClock
+from frames import FrameSource
+from packing import qr_capacity
+from render import FramePipeline, render_qr
+from transfer_state import TransferState
+from watcher import ChangeWatcher
 
 
 # 配置常量
-INTERVAL = 0.3       # 每个二维码显示的时间（秒），之后切换下一个
-LINES_PER_QR = 10   # 每个二维码最多包含 10 行源代码，避免数据过大无法识别
+INTERVAL = 0.3       # 帧周期（秒）：按固定节拍切换下一个二维码，不随渲染耗时漂移
+QR_VERSION = 12      # 二维码版本（1-40），版本越高单帧容量越大，但模块越小越难识别
+QR_ERROR_CORRECTION = 'M'  # 纠错等级 L/M/Q/H
+CHUNK_BYTES = None   # 单帧负载字节上限；None 表示按版本与纠错等级的容量自动装满
+QR_SIZE = 300        # 二维码图像边长（像素），取模块数（含静区）的整数倍时没有留白
+RENDER_WORKERS = None  # 后台渲染进程数；None 表示使用 CPU 核数
+RENDER_BUFFER = 16   # 预渲染环形缓冲区容量（帧）
+GRID = 1             # 每帧平铺 GRID×GRID 个独立二维码（1/2/3），成倍提高每个显示间隔的吞吐
+COLOR = False        # 彩色模式：R/G/B 三个通道各放一组二维码，每帧负载变为三倍（接收端需使用 --color）
+FOUNTAIN_OVERHEAD = 1.5  # 喷泉模式下每轮为每个文件发送的符号数 = 块数 k × 该系数；k 较小时按 1 + 3/sqrt(k) 放大
+FOUNTAIN_ROUNDS = 0  # 喷泉模式的发送轮数；0 表示持续循环直到关闭窗口
+DEDUP = False        # 按内容分块去重：本次发送中重复出现的内容只发送块哈希（仅分块模式）
+METRICS_FILE = None  # 分阶段耗时与计数器的导出文件；None 表示不导出
+METRICS_FORMAT = 'jsonl'  # 导出格式：jsonl 每次追加一行 JSON，prom 为 Prometheus 文本格式（整个文件替换）
+METRICS_INTERVAL = 5 # 导出间隔（秒）
+OVERLAY = False      # 在二维码下方显示实时统计
+QUIET = False        # 生产模式：不打印逐帧日志，只保留警告与汇总
+# 叠加显示的计数器与阶段
+OVERLAY_STATS = ('frames_shown', 'qr_codes_shown', 'payload_bytes', 'deadline_missed', 'period', 'display',
+                 'render_wait')
+EXTENSIONS = None    # 只发送这些扩展名的文件，如 ('.py',)；None 表示不限
+EXCLUDES = ()        # 额外的排除规则（.gitignore 语法），默认已排除 .git、__pycache__ 等
+MIN_SIZE = 0         # 文件大小下限（字节）
+MAX_SIZE = None      # 文件大小上限（字节）；None 表示不限
+SEND_ORDER = 'name'  # 发送顺序 name/size/mtime：size 小文件优先，尽早得到可用的文件
+INDEX_CACHE = True   # 按目录修改时间缓存目录列表（~/.qr_scan/），再次发送时未变化的目录不重新读取
+WATCH = False        # 监视模式：首轮发送后不关闭窗口，持续发送新增或修改的文件（修改的文件只发块增量）
+WATCH_INTERVAL = 1.0 # 监视模式下检查文件变化的间隔（秒）
+ARCHIVE = None       # 固实归档模式的压缩方式 'xz'/'zlib'：整个目录压缩成一条数据流发送；None 表示逐个文件发送
 
 
 class QRDisplay:
@@ -31,42 +74,85 @@ class QRDisplay:
     负责创建窗口、生成二维码、控制显示流程
     """
 
-    def __init__(self, folder_path):
+    def __init__(self, folder_path, grid=GRID, fountain=False, incremental=False, dedup=False, resume=None,
+                 color=COLOR, archive=ARCHIVE, index=None, watch=WATCH, metrics=NULL_METRICS, exporter=None,
+                 overlay=OVERLAY, quiet=QUIET):
         """
         初始化对象
-        :param folder_path: 待发送的 Python 文件所在的文件夹路径
+        :param folder_path: 待发送的文件所在的文件夹路径
+        :param grid: 每帧平铺的二维码行（列）数
+        :param fountain: 是否使用喷泉码模式（持续发送 LT 编码符号，接收端可乱序、丢帧恢复）
+        :param incremental: 是否增量发送（只发上次成功发送后新增或变化的文件/块，仅分块模式）
+        :param dedup: 是否按内容分块去重（已发送过的内容改为引用帧，仅分块模式）
+        :param resume: ResumePlan，接收端导出的续传清单；只发送接收端缺少的文件与块
+        :param color: 是否把三个独立的二维码分别编码到图像的 R、G、B 通道
+        :param archive: 固实归档的压缩方式（'xz'/'zlib'），全部文件压缩为一条数据流发送；None 表示逐个文件发送
+        :param index: FileIndex，决定发送哪些文件及发送顺序；None 表示按默认排除规则发送全部文件
+        :param watch: 是否在首轮发送后持续监视目录，把新增或修改的文件排队发送（仅分块模式）
+        :param metrics: 记录帧周期、贴图与渲染等待耗时及显示帧数、负载字节数等计数
+        :param exporter: MetricsExporter，发送期间定期导出统计
+        :param overlay: 是否在二维码下方显示实时统计
+        :param quiet: 不打印逐帧日志
         """
         self.folder_path = folder_path  # 存储传入的目标文件夹路径
+        self.grid = grid
+        self.channels = 3 if color else 1
+        # 增量发送状态缓存（喷泉模式持续循环、没有“发送完成”的时刻，不使用增量）
+        # 监视模式总是记录状态，修改过的文件据此只发送块增量；未指定增量发送时首轮仍完整发送
+        self.state = TransferState(folder_path) if (incremental or watch) and not fountain else None
+        if watch and not incremental and self.state is not None:
+            self.state.forget()
+        # 帧序列生成器：负责读文件、按字节预算切块或喷泉编码
+        self.source = FrameSource(folder_path, QR_VERSION, QR_ERROR_CORRECTION, CHUNK_BYTES,
+                                  FOUNTAIN_OVERHEAD, FOUNTAIN_ROUNDS, self.state, dedup and not fountain,
+                                  resume)
+        self.fountain = fountain
+        self.archive = archive
+        self.index = index or FileIndex(folder_path)
+        self.watcher = ChangeWatcher(self.index) if watch else None
+        self.metrics = metrics
+        self.exporter = exporter
+        self.quiet = quiet
+        self.closed = False             # 用户关闭窗口后停止发送
         self.root = tk.Tk()             # 创建主窗口
         self.root.title("二维码发送器")  # 设置窗口标题
 
-        # 设置窗口大小为 400x400 像素，并定位到屏幕左上角 (0, 0)
+        # 单码模式窗口为 400x400 像素，网格模式按平铺后的图像尺寸放大，并定位到屏幕左上角 (0, 0)
         # 这样不会遮挡其他重要区域（比如任务栏或通知中心）
-        self.root.geometry("400x400+0+0")
+        window_size = QR_SIZE * grid + 100
+        self.root.geometry(f"{window_size}x{window_size}+0+0")
 
         # 窗口始终置顶，保证二维码不被其他窗口覆盖
         self.root.attributes('-topmost', True)
 
+        # 关闭窗口时只做标记，由发送循环负责退出（喷泉模式会一直循环发送）
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # 创建一个 Label 组件，用于承载并显示生成的二维码图像
         self.label = tk.Label(self.root)
         self.label.pack(expand=True)  # 自动扩展填充整个窗口空间
 
+        # 实时统计显示在二维码下方，不遮挡二维码
+        self.stats_label = None
+        if overlay:
+            self.stats_label = tk.Label(self.root, font=('Courier', 9), justify='left',
+                                        wraplength=window_size - 20)
+            self.stats_label.pack(side='bottom')
+
         # 强制更新一次窗口布局，防止首次显示延迟或空白
         self.root.update()
 
     def generate_qr_image(self, data):
         """
-        根据输入的数据生成二维码图像
+        根据输入的数据生成二维码图像（同步渲染，批量发送请使用 send_frames）
         :param data: 字符串数据（如文件路径、代码片段等）
         :return: PIL.Image 对象，已调整尺寸的二维码图像
         """
-        # 使用 qrcode 库生成二维码（自动选择最佳纠错等级）
-        qr = qrcode.make(data)
+        return render_qr(data, QR_VERSION, QR_ERROR_CORRECTION, QR_SIZE)
 
-        # 将二维码图像放大至 300x300 像素，使用高质量重采样算法（LANCZOS）
-        qr = qr.resize((300, 300), Image.Resampling.LANCZOS)
-
-        return qr  # 返回处理后的图像对象
+    def on_close(self):
+        """窗口关闭回调"""
+        self.closed = True
 
     def display_qr(self, image):
         """
@@ -82,95 +168,164 @@ class QRDisplay:
         # 把图像设置给 label 显示出来
         self.label.configure(image=photo)
 
-        # 刷新 GUI 界面，立即生效
-        self.root.update()
+        # 立即重绘（在事件循环的定时回调中调用，不处理其他事件）
+        self.root.update_idletasks()
 
-    def send_file(self, filepath, filename):
+    def send_frames(self, frames):
         """
-        发送单个 Python 文件的全过程：
-        1. 先发送文件路径信息（以 PATH: 开头）
-        2. 再将文件内容按每 10 行一组分块，依次发送每个代码块
-        :param filepath: 文件完整路径（含目录）
-        :param filename: 文件名（不含路径）
+        发送一串帧：后台进程池提前渲染，Tk 事件循环按帧时钟定时贴图
+        :param frames: 可迭代对象，产出 (日志描述, 帧数据)
         """
-        # 第一步：先发送文件路径元信息
-        path_info = f"PATH:{filename}"  # 添加标识前缀 "PATH:"
-        print(f"发送文件路径: {filename}")
-
-        # 生成二维码并显示
-        qr_img = self.generate_qr_image(path_info)
-        self.display_qr(qr_img)
-
-        # 暂停 INTERVAL 秒，等待扫码设备读取
-        time.sleep(INTERVAL)
+        if self.closed:
+            return
+        with FramePipeline(frames, QR_VERSION, QR_ERROR_CORRECTION, QR_SIZE, grid=self.grid,
+                           workers=RENDER_WORKERS, buffer_size=RENDER_BUFFER, channels=self.channels,
+                           metrics=self.metrics) as pipeline:
+            self.clock = FrameClock(INTERVAL)
+            self.pending = next(pipeline, None)
+            self.pipeline = pipeline
+            self.root.after(0, self.show_next)
+            # show_next 发送完最后一帧（或窗口关闭）后调用 root.quit() 结束本次事件循环
+            self.root.mainloop()
+
+        stats = self.clock.summary()
+        if not stats['shown']:
+            return  # 监视模式下文件只改了修改时间，没有帧需要发送
+        print(f"帧时钟：显示 {stats['shown']} 帧，实际平均周期 {stats['period_ms']} ms（设定 {INTERVAL * 1000:.0f} ms），"
+              f"错过截止时间 {stats['missed']} 次，最大延迟 {stats['max_late_ms']} ms")
+
+    def show_next(self):
+        """定时回调：显示已渲染好的下一帧，并按截止时间安排再下一帧"""
+        if self.closed:
+            print("窗口已关闭，停止发送")
+            self.root.quit()
+            return
+        if self.pending is None:
+            # 最后一帧已完整显示一个周期
+            self.root.quit()
+            return
 
-        # 第二步：读取该文件的所有文本行
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                lines = f.readlines()  # 一次性读取所有行，返回列表
-        except Exception as e:
-            # 如果文件打不开（权限问题、编码错误等），打印错误并跳过
-            print(f"无法读取文件 {filepath}: {e}")
-            return  # 直接退出当前文件的发送
-
-        # 第三步：将文件内容分批发送，每批最多 LINES_PER_QR 行
-        for i in range(0, len(lines), LINES_PER_QR):
-            # 取出从第 i 行开始的最多 10 行代码
-            chunk = lines[i:i + LINES_PER_QR]
-
-            # 构造要编码的数据字符串：
-            # 格式：FILE:<文件名>|LINE:<起始行号>\n<实际代码>
-            data = f"FILE:{filename}|LINE:{i}\n" + ''.join(chunk)
-
-            # 打印日志，提示正在发送哪一部分
-            print(f"发送二维码: {filename} 第 {i} 行")
-
-            # 生成二维码并显示
-            qr_img = self.generate_qr_image(data)
+        labels, qr_img = self.pending
+        if not self.quiet:
+            for label in labels:
+                print(label)
+        with self.metrics.time('display'):
             self.display_qr(qr_img)
+        previous = self.clock.last_shown
+        late = self.clock.tick()
+        if previous is not None:
+            self.metrics.observe('period', self.clock.last_shown - previous)
+        self.metrics.inc('frames_shown')
+        self.metrics.inc('qr_codes_shown', len(labels))
+        self.metrics.inc('payload_bytes', self.pipeline.last_payload_bytes)
+        if late:
+            self.metrics.inc('deadline_missed')
+            if not self.quiet:
+                print(f"⚠️ 错过截止时间：本帧晚了 {late * 1000:.1f} ms")
+        if self.stats_label is not None:
+            self.stats_label.configure(text=self.metrics.summary(OVERLAY_STATS))
+        if self.exporter:
+            self.exporter.maybe_export()
+
+        # 在等待期间取出下一帧（正常情况下早已渲染完成），定时器到点后直接贴图
+        self.pending = next(self.pipeline, None)
+        self.root.after(math.ceil(self.clock.remaining() * 1000), self.show_next)
 
-            # 等待一段时间再发下一个，让接收方有足够时间扫描
-            time.sleep(INTERVAL)
+    def send_file(self, filepath, filename):
+        """
+        发送单个文件
+        :param filepath: 文件完整路径（含目录）
+        :param filename: 相对路径（写入帧头）
+        """
+        self.send_frames(self.source.iter_file_frames(filepath, filename))
 
-    @staticmethod
-    def get_all_files(directory):
-        # 获取该目录下所有文件包括嵌套在文件夹内的
-        all_files = []
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                all_files.append(os.path.relpath(os.path.join(root, file), directory))
-        return all_files
+    def send_batch(self, files):
+        """
+        按当前模式发送一批文件
+        :param files: 相对路径列表
+        """
+        # 遍历每一个文件，所有帧汇成一条流交给渲染流水线，文件之间不会出现渲染停顿
+        if self.archive:
+            self.send_frames(self.source.iter_archive_frames(files, self.archive))
+        elif self.fountain:
+            self.send_frames(self.source.iter_fountain_frames(files))
+        else:
+            self.send_frames(self.source.iter_files(files))
+            # 整轮发送正常结束才更新增量状态，中途关闭窗口时下次仍按旧状态计算
+            if self.state is not None and not self.closed:
+                self.state.save()
+
+    def show_idle(self):
+        """监视模式下等待文件变化时清空二维码，接收端不再重复识别上一帧"""
+        self.label.image = None
+        self.label.configure(image='', text="等待文件变化...")
+        self.root.update_idletasks()
+
+    def watch_changes(self):
+        """
+        监视模式：空闲时按 WATCH_INTERVAL 轮询目录，新增或修改的文件排队发送，直到关闭窗口
+        修改过的文件有上次发送的块签名，增量明显更小时只发送变化的块
+        """
+        print(f"监视模式：每 {WATCH_INTERVAL} 秒检查一次文件变化，关闭窗口退出")
+        self.show_idle()
+        while not self.closed:
+            # 等待期间继续处理窗口事件（如关闭窗口）
+            self.root.after(int(WATCH_INTERVAL * 1000), self.root.quit)
+            self.root.mainloop()
+            if self.closed:
+                break
+            changed, removed = self.watcher.poll()
+            for name in removed:
+                print(f"文件已删除（接收端保留已收到的版本）: {name}")
+            if changed:
+                print(f"检测到 {len(changed)} 个文件变化: {changed}")
+                self.send_batch(changed)
+                self.show_idle()
 
     def start(self):
         """
         主启动方法：
         1. 检查目标文件夹是否存在
-        2. 查找所有 .py 结尾的文件
-        3. 逐一调用 send_file 发送每个文件
-        4. 全部完成后关闭窗口
+        2. 由文件索引列出待发送的文件（已过滤、排序）
+        3. 将所有文件的帧交给 send_frames 依次发送
+        4. 监视模式下继续发送之后新增或修改的文件，直到关闭窗口
+        5. 全部完成后关闭窗口
         """
         # 检查文件夹是否存在
         if not os.path.exists(self.folder_path):
             print(f"错误：目录不存在: {self.folder_path}")
             return
 
-        py_files = self.get_all_files(self.folder_path)
-
-        # 输出找到的文件数量及名称（用于调试）
-        print(f"找到 {len(py_files)} 个 .py 文件: {py_files}")
-
-        # 如果没有找到任何 .py 文件，给出警告并退出
-        if not py_files:
-            print("警告：未找到任何 .py 文件")
-            return
-
-        # 遍历每一个 .py 文件，执行发送流程
-        for filename in py_files:
-            filepath = os.path.join(self.folder_path, filename)  # 构造完整路径
-            self.send_file(filepath, filename)  # 调用发送函数
+        # 监视模式同时记下各文件的大小与修改时间，之后与之比较
+        files = self.watcher.snapshot() if self.watcher else self.index.scan()
+        stats = self.index.stats
+
+        # 输出找到的文件数量、过滤条件及名称（用于调试）
+        print(f"找到 {len(files)} 个文件（{self.index.describe()}）")
+        print(f"   扫描 {stats['dirs']} 个目录（{stats['cached_dirs']} 个未变化），"
+              f"排除 {stats['excluded']} 项，过滤掉 {stats['filtered']} 个文件")
+        if not self.quiet:
+            print(f"   {files}")
+        print(f"二维码版本 {QR_VERSION}，纠错等级 {QR_ERROR_CORRECTION}，"
+              f"单帧容量 {qr_capacity(QR_VERSION, QR_ERROR_CORRECTION)} 字节")
+
+        # 如果没有找到任何文件，给出警告并退出（监视模式下继续等待新文件）
+        if files:
+            self.send_batch(files)
+        else:
+            print("警告：未找到任何符合条件的文件")
+            if self.watcher is None:
+                return
+        if self.watcher is not None:
+            self.watch_changes()
 
         # 所有文件发送完毕后，输出完成信息
         print("所有文件发送完毕，关闭窗口...")
+        if self.metrics is not NULL_METRICS:
+            if self.exporter:
+                self.exporter.export()
+                print(f"统计已导出到 {self.exporter.path}")
+            print(f"统计: {self.metrics.summary()}")
 
         # 安全退出 GUI 主循环
         self.root.quit()
@@ -186,18 +341,87 @@ if __name__ == "__main__":
     使用方式：python sender.py <source_folder_path>
     示例：python sender.py ./my_python_code/
     """
-    # 检查是否提供了命令行参数（即文件夹路径）
-
-    # sys.argv.append("./source_code/")  # 测试时可默认指定路径，正式使用时请删除此行
-    if len(sys.argv) < 2:
-        print("用法: python sender.py <source_folder_path>")
-        sys.exit(1)  # 参数不足则报错退出
-
-    # 获取第一个命令行参数作为源代码文件夹路径
-    folder_path = sys.argv[1]
+    # 参数配置先于主解析器加载，配置中的常量同样作用于各参数的默认值
+    try:
+        profile, applied, unused = preload_profile(globals())
+    except (OSError, ValueError) as e:
+        print(f"错误：无法读取参数配置: {e}")
+        sys.exit(1)
+    if profile:
+        print(f"已加载参数配置: {applied}")
+        if unused:
+            print(f"参数配置中以下键不属于发送端，已忽略（可能属于接收端或拼写有误）: {', '.join(unused)}")
+
+    parser = argparse.ArgumentParser(description="二维码发送器：将文件夹中的文件编码为二维码逐帧展示")
+    parser.add_argument('folder_path', help="待发送的源代码文件夹路径")
+    parser.add_argument('--grid', type=int, choices=(1, 2, 3), default=GRID,
+                        help="每帧平铺 N×N 个二维码，接收端一次截图全部识别")
+    parser.add_argument('--color', action='store_true',
+                        help="彩色模式：R/G/B 通道各放一组独立二维码，每帧负载变为三倍（接收端需使用 --color）")
+    parser.add_argument('--fountain', action='store_true',
+                        help="喷泉码模式：持续发送 LT 编码符号，接收端乱序、丢帧均可恢复")
+    parser.add_argument('--incremental', action='store_true',
+                        help="增量发送：只发送上次成功发送后新增或变化的文件，变化文件只发块增量")
+    parser.add_argument('--dedup', action='store_true',
+                        help="去重：按内容分块，本次发送中已发过的内容只发送块哈希")
+    parser.add_argument('--archive', choices=ARCHIVE_METHODS, default=ARCHIVE,
+                        help="固实归档：整个目录压缩为一条数据流发送，接收端边收边解压（不能与喷泉、增量、去重、续传同时使用）")
+    parser.add_argument('--watch', action='store_true',
+                        help="监视模式：发送完成后持续监视目录，修改或新增的文件（或其变化的块）随即发送，关闭窗口退出")
+    parser.add_argument('--resume', metavar='FILE',
+                        help="续传：读取接收端导出的续传清单，只发送缺少的文件与块")
+    parser.add_argument('--ext', metavar='EXT[,EXT...]',
+                        help="只发送这些扩展名的文件，逗号分隔，如 .py,.txt")
+    parser.add_argument('--exclude', metavar='PATTERN', action='append', default=[],
+                        help="排除规则（.gitignore 语法，可多次指定），如 --exclude '*.log' --exclude build/")
+    parser.add_argument('--min-size', type=parse_size, default=MIN_SIZE, metavar='SIZE',
+                        help="跳过小于该大小的文件，可带 K/M/G 后缀")
+    parser.add_argument('--max-size', type=parse_size, default=MAX_SIZE, metavar='SIZE',
+                        help="跳过大于该大小的文件，可带 K/M/G 后缀，如 1M")
+    parser.add_argument('--order', choices=ORDERS, default=SEND_ORDER,
+                        help="发送顺序：name 按文件名，size 小文件优先，mtime 最近修改优先（默认 %(default)s）")
+    parser.add_argument('--no-gitignore', action='store_true', help="不读取发送目录中的 .gitignore")
+    parser.add_argument('--metrics', metavar='FILE', help="定期导出分阶段耗时直方图与计数器")
+    parser.add_argument('--metrics-format', choices=METRICS_FORMATS, default=METRICS_FORMAT,
+                        help="统计导出格式：jsonl 追加 JSON 行，prom 为 Prometheus 文本格式（默认 %(default)s）")
+    parser.add_argument('--overlay', action='store_true', help="在二维码下方显示实时统计")
+    parser.add_argument('--quiet', action='store_true', help="不打印逐帧日志，只保留警告与汇总")
+    parser.add_argument('--profile', help="加载 tool/calibrate.py 生成的参数配置文件")
+    args = parser.parse_args()
+    if args.archive and (args.fountain or args.incremental or args.dedup or args.resume):
+        parser.error("--archive 不能与 --fountain/--incremental/--dedup/--resume 同时使用")
+    if args.watch and (args.fountain or args.archive):
+        parser.error("--watch 不能与 --fountain/--archive 同时使用")
+
+    resume = None
+    if args.resume:
+        try:
+            resume = ResumePlan.load(args.resume)
+        except (OSError, ValueError) as e:
+            print(f"错误：无法读取续传清单 {args.resume}: {e}")
+            sys.exit(1)
+        print(f"续传清单: 接收端已有 {len(resume.completed)} 个文件，{len(resume.partial)} 个文件未收齐")
+
+    # 文件索引：配置常量中的排除规则与命令行指定的规则合并
+    extensions = args.ext.split(',') if args.ext else EXTENSIONS
+    index = FileIndex(args.folder_path, excludes=tuple(EXCLUDES) + tuple(args.exclude), extensions=extensions,
+                      min_size=args.min_size, max_size=args.max_size, order=args.order,
+                      gitignore=not args.no_gitignore, cache=INDEX_CACHE)
+
+    # 需要导出或叠加显示时才记录统计
+    metrics, exporter = NULL_METRICS, None
+    metrics_file = args.metrics or METRICS_FILE
+    overlay = args.overlay or OVERLAY
+    if metrics_file or overlay:
+        metrics = Metrics('sender')
+        if metrics_file:
+            exporter = MetricsExporter(metrics, metrics_file, args.metrics_format, METRICS_INTERVAL)
 
     # 创建 QRDisplay 实例，传入文件夹路径
-    app = QRDisplay(folder_path=folder_path)
+    app = QRDisplay(folder_path=args.folder_path, grid=args.grid, fountain=args.fountain,
+                    incremental=args.incremental, dedup=args.dedup or DEDUP, resume=resume,
+                    color=args.color or COLOR, archive=args.archive, index=index, watch=args.watch or WATCH,
+                    metrics=metrics, exporter=exporter, overlay=overlay, quiet=args.quiet or QUIET)
 
     # 启动发送流程
-    app.start()
\ No newline at end of file
+    app.start()
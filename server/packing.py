@@ -0,0 +1,228 @@
+# packing.py - 按字节预算把文件内容打包成二维码数据帧
+"""
+每帧的可用字节数由二维码版本与纠错等级决定（字节模式容量减去帧头长度），
+发送端按该预算尽量装满每一帧，而不是固定按行数切分。
+非 UTF-8 文件按 base64 编码发送，不再被跳过。
+
+喷泉模式下同样按容量确定 LT 数据块大小，符号负载统一以 base64 编码。
+
+去重模式下文件先按内容分块（common/dedup.py），本次会话已发送过的块改为引用帧，
+一帧可容纳十几个块哈希，重复内容只占很少的帧。
+"""
+import hashlib
+import math
+
+from qrcode import constants, util
+
+from common import protocol
+from common.dedup import HASH_LEN, cdc_chunks, chunk_hash
+from common.fountain import LTEncoder
+
+MAX_SEED = 0xFFFFFFFF  # 喷泉符号种子上限，用于按最长帧头估算容量
+
+# 纠错等级名称 -> qrcode 常量
+ERROR_CORRECTION_LEVELS = {
+    'L': constants.ERROR_CORRECT_L,
+    'M': constants.ERROR_CORRECT_M,
+    'Q': constants.ERROR_CORRECT_Q,
+    'H': constants.ERROR_CORRECT_H,
+}
+
+
+def qr_capacity(version, error_correction):
+    """
+    指定版本与纠错等级下，二维码字节模式可容纳的最大字节数
+    :param version: 二维码版本 1-40
+    :param error_correction: 纠错等级名称 'L'/'M'/'Q'/'H'
+    """
+    level = ERROR_CORRECTION_LEVELS[error_correction]
+    bits = util.BIT_LIMIT_TABLE[level][version]
+    # 减去 4 位模式指示符与字符计数字段
+    bits -= 4 + util.length_in_bits(util.MODE_8BIT_BYTE, version)
+    return bits // 8
+
+
+def _utf8_boundary(data, end):
+    """将切分位置回退到 UTF-8 字符边界，避免把一个多字节字符拆到两帧"""
+    while end > 0 and end < len(data) and (data[end] & 0xC0) == 0x80:
+        end -= 1
+    return end
+
+
+def _is_binary(data):
+    try:
+        data.decode('utf-8')
+        return False
+    except UnicodeDecodeError:
+        return True
+
+
+def _split_chunks(filename, data, binary, capacity, chunk_bytes, total_digits, extra, first_seq=0):
+    """
+    按字节预算切分文件内容
+    :param total_digits: 帧头中总块数字段的位数（用于计算帧头长度）
+    :param first_seq: 第一块的序号（去重模式下一段原文可能从文件中间开始）
+    :return: [bytes, ...]
+    """
+    placeholder = int('9' * total_digits)
+    chunks = []
+    pos = 0
+    while pos < len(data):
+        header = protocol.build_chunk_header(filename, first_seq + len(chunks), placeholder, binary, extra)
+        # 帧头与换行符也占用二维码容量
+        budget = capacity - len(header.encode('utf-8')) - 1
+        if chunk_bytes:
+            budget = min(budget, chunk_bytes)
+        if binary:
+            # base64 每 4 个字符对应 3 个原始字节
+            budget = budget // 4 * 3
+        if budget <= 0:
+            raise ValueError(f"二维码容量不足以容纳帧头: {header}")
+
+        end = min(pos + budget, len(data))
+        if not binary:
+            end = _utf8_boundary(data, end)
+            if end <= pos:
+                raise ValueError(f"单帧预算过小，无法容纳一个完整字符: {filename}")
+        chunks.append(data[pos:end])
+        pos = end
+    return chunks
+
+
+def _chunk_frame(filename, seq, total, body, binary=False, extra=None):
+    # 帧头带整帧的 CRC，长度与切分时估算用的占位值相同
+    header = protocol.build_chunk_header(filename, seq, total, binary, extra, crc=None)
+    return protocol.seal(header, body)
+
+
+def build_file_frames(filename, data, version, error_correction, chunk_bytes=None, extra=None):
+    """
+    将文件内容切分为数据帧字符串列表
+    :param filename: 相对路径（写入帧头）
+    :param data: bytes，文件完整内容
+    :param version: 二维码版本
+    :param error_correction: 纠错等级名称
+    :param chunk_bytes: 单帧负载上限（字节），None 表示只受二维码容量限制
+    :param extra: 写入每个帧头的附加字段字典
+    :return: [帧字符串, ...]，长度即 PATH 帧中的总块数
+    """
+    binary = _is_binary(data)
+    capacity = qr_capacity(version, error_correction)
+    # 帧头中包含总块数，而总块数又取决于帧头长度：从 1 位开始估计，位数不够时加一位重切
+    total_digits = 1
+    while True:
+        chunks = _split_chunks(filename, data, binary, capacity, chunk_bytes, total_digits, extra)
+        if len(str(len(chunks))) <= total_digits:
+            break
+        total_digits += 1
+
+    return [_chunk_frame(filename, seq, len(chunks), protocol.encode_body(chunk, binary), binary, extra)
+            for seq, chunk in enumerate(chunks)]
+
+
+def build_digest_frame(filename, data):
+    """文件摘要帧：接收端写盘后比对 SHA-256"""
+    return protocol.build_digest_frame(filename, len(data), hashlib.sha256(data).hexdigest())
+
+
+def _split_refs(filename, hashes, capacity, chunk_bytes, total_digits, extra, first_seq):
+    """
+    把连续的块哈希按帧容量分组
+    :return: [[哈希, ...], ...]
+    """
+    placeholder = int('9' * total_digits)
+    groups = []
+    pos = 0
+    while pos < len(hashes):
+        header = protocol.build_chunk_header(filename, first_seq + len(groups), placeholder, extra=extra)
+        budget = capacity - len(header.encode('utf-8')) - 1
+        if chunk_bytes:
+            budget = min(budget, chunk_bytes)
+        count = (budget + 1) // (HASH_LEN + 1)  # 哈希之间以逗号分隔
+        if count <= 0:
+            raise ValueError(f"二维码容量不足以容纳帧头: {header}")
+        groups.append(hashes[pos:pos + count])
+        pos += count
+    return groups
+
+
+def build_dedup_frames(filename, data, version, error_correction, known, chunk_bytes=None, extra=None):
+    """
+    按内容分块去重后切分为数据帧：本次会话已发送过的块只发送块哈希（引用帧），其余内容照常装满每帧
+    :param known: 本次会话已发送的块哈希集合；本文件的新块会在生成帧后加入
+    :return: ([帧字符串, ...], 以引用方式发送的字节数)
+    """
+    binary = _is_binary(data)
+    extra = dict(extra or {}, **{protocol.FLAG_CDC: True})
+    ref_extra = dict(extra, **{protocol.FLAG_REF: True})
+
+    # 相邻的新块合并成一段原文，相邻的已发送块合并成一段引用
+    # 同一文件内的重复块仍按原文发送：接收端要等整个文件收齐后才登记其中的块
+    runs = []
+    new_hashes = []
+    reused = 0
+    for chunk in cdc_chunks(data):
+        digest = chunk_hash(chunk)
+        is_ref = digest in known
+        if is_ref:
+            reused += len(chunk)
+        else:
+            new_hashes.append(digest)
+        item = digest if is_ref else chunk
+        if runs and runs[-1][0] == is_ref:
+            runs[-1][1].append(item)
+        else:
+            runs.append((is_ref, [item]))
+
+    capacity = qr_capacity(version, error_correction)
+    total_digits = 1
+    while True:
+        pieces = []  # (是否引用帧, 哈希列表或原文字节)
+        for is_ref, items in runs:
+            if is_ref:
+                groups = _split_refs(filename, items, capacity, chunk_bytes, total_digits,
+                                     ref_extra, len(pieces))
+                pieces.extend((True, group) for group in groups)
+            else:
+                chunks = _split_chunks(filename, b''.join(items), binary, capacity, chunk_bytes,
+                                       total_digits, extra, len(pieces))
+                pieces.extend((False, chunk) for chunk in chunks)
+        if len(str(len(pieces))) <= total_digits:
+            break
+        total_digits += 1
+
+    frames = []
+    for seq, (is_ref, content) in enumerate(pieces):
+        if is_ref:
+            frames.append(_chunk_frame(filename, seq, len(pieces), protocol.build_ref_body(content),
+                                       extra=ref_extra))
+        else:
+            frames.append(_chunk_frame(filename, seq, len(pieces), protocol.encode_body(content, binary),
+                                       binary, extra))
+    known.update(new_hashes)
+    return frames, reused
+
+
+def fountain_encoder(filename, data, version, error_correction, chunk_bytes=None):
+    """
+    为文件创建 LT 编码器，数据块大小取单帧可容纳的最大符号负载
+    :return: LTEncoder
+    """
+    # 按最长的 K/S 字段估算帧头（块数不会超过文件字节数），保证任意种子的帧都不超出容量
+    header = protocol.build_lt_header(filename, max(1, len(data)), len(data), MAX_SEED)
+    budget = qr_capacity(version, error_correction) - len(header.encode('utf-8')) - 1
+    if chunk_bytes:
+        budget = min(budget, chunk_bytes)
+    block_size = budget // 4 * 3
+    if block_size <= 0:
+        raise ValueError(f"二维码容量不足以容纳帧头: {header}")
+    # 块数较少时把块尺寸均摊，避免末块大量填充
+    k = max(1, math.ceil(len(data) / block_size))
+    return LTEncoder(data, max(1, math.ceil(len(data) / k)))
+
+
+def build_fountain_frame(filename, encoder, seed):
+    """构造种子为 seed 的喷泉帧字符串"""
+    body = protocol.encode_body(encoder.symbol(seed), binary=True)
+    header = protocol.build_lt_header(filename, encoder.k, encoder.length, seed, crc=None)
+    return protocol.seal(header, body)
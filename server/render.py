@@ -0,0 +1,146 @@
+# render.py - 二维码帧渲染与后台预渲染流水线
+"""
+生成二维码与缩放是发送端最耗时的步骤。FramePipeline 在进程池中提前渲染后续帧，
+结果按发送顺序放入有界环形缓冲区，显示循环只需取出成品图像贴到窗口上，
+帧周期因此只取决于配置的显示间隔。
+
+网格模式下每个显示帧平铺 N×N 个相互独立的二维码，接收端一次截图即可全部识别。
+彩色模式下再把三组网格分别放入图像的 R、G、B 通道，接收端按通道拆分后分别识别，
+每个显示帧的负载为单色的三倍（要求截图能如实还原颜色）。
+
+二维码按模块矩阵整数倍最近邻放大（每个模块恰好 N×N 像素），不足目标边长的部分用白色静区补齐。
+相比对 box_size 图像做 LANCZOS 缩放，速度更快，模块边缘也没有灰色过渡，更容易识别。
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import qrcode
+from PIL import Image
+
+from common.metrics import NULL_METRICS
+from packing import ERROR_CORRECTION_LEVELS
+
+
+def render_qr(data, version, error_correction, size):
+    """
+    根据输入的数据生成二维码图像（可在子进程中执行）
+    :param data: 字符串数据（如文件路径、代码片段等）
+    :param version: 二维码版本，数据超出容量时自动升级
+    :param error_correction: 纠错等级名称 'L'/'M'/'Q'/'H'
+    :param size: 输出图像边长（像素）
+    :return: PIL.Image 对象
+    """
+    qr = qrcode.QRCode(
+        version=version,
+        error_correction=ERROR_CORRECTION_LEVELS[error_correction],
+    )
+    qr.add_data(data, optimize=0)  # 不分段优化，保证与 qr_capacity 计算的字节模式容量一致
+    qr.make(fit=True)
+    # 模块矩阵（含 4 个模块的静区），True 为深色
+    modules = np.array(qr.get_matrix(), dtype=bool)
+    pixels = np.where(modules, 0, 255).astype(np.uint8)
+    scale = size // len(modules)
+    if scale == 0:
+        # 数据超出容量自动升级版本后模块数可能超过像素数，只能缩小
+        return Image.fromarray(pixels).resize((size, size), Image.Resampling.NEAREST)
+    pixels = pixels.repeat(scale, axis=0).repeat(scale, axis=1)
+    # 整数倍放大后剩余的边长平均分到四周
+    margin = size - len(pixels)
+    before = margin // 2
+    pixels = np.pad(pixels, (before, margin - before), constant_values=255)
+    return Image.fromarray(pixels)
+
+
+def render_grid(payloads, version, error_correction, size, grid):
+    """
+    将多个帧数据渲染为 grid×grid 平铺的一张图像（按行优先顺序排列，末尾不足时留白）
+    :param payloads: 帧数据字符串列表，长度不超过 grid*grid
+    :param size: 单个二维码的边长（像素），整张图像边长为 size*grid
+    """
+    if grid == 1:
+        return render_qr(payloads[0], version, error_correction, size)
+    canvas = Image.new('L', (size * grid, size * grid), 255)
+    for index, data in enumerate(payloads):
+        row, col = divmod(index, grid)
+        canvas.paste(render_qr(data, version, error_correction, size), (col * size, row * size))
+    return canvas
+
+
+def render_frame(payloads, version, error_correction, size, grid, channels=1):
+    """
+    渲染一个显示帧
+    :param payloads: 帧数据字符串列表，长度不超过 grid*grid*channels
+    :param channels: 1 为灰度图；3 为彩色图，依次填入 R、G、B 通道（每个通道一组网格，末尾不足时留白）
+    """
+    if channels == 1:
+        return render_grid(payloads, version, error_correction, size, grid)
+    per_channel = grid ** 2
+    blank = Image.new('L', (size * grid, size * grid), 255)
+    bands = [render_grid(payloads[i:i + per_channel], version, error_correction, size, grid)
+             if payloads[i:i + per_channel] else blank
+             for i in range(0, per_channel * 3, per_channel)]
+    return Image.merge('RGB', bands)
+
+
+class FramePipeline:
+    """
+    帧预渲染流水线
+    按顺序消费 (描述, 帧数据) 序列，每 grid×grid×channels 个帧数据合成一个显示帧在进程池中渲染，
+    迭代时按原顺序产出 ([描述, ...], 图像)
+    """
+
+    def __init__(self, frames, version, error_correction, size, grid=1, workers=None, buffer_size=16,
+                 channels=1, metrics=NULL_METRICS):
+        """
+        :param frames: 可迭代对象，产出 (描述, 帧数据字符串)
+        :param grid: 每个显示帧平铺的二维码行（列）数
+        :param channels: 1 为灰度二维码；3 为 RGB 三通道各放一组二维码
+        :param metrics: 记录取帧打包（pack）与等待渲染结果（render_wait）的耗时
+        :param workers: 渲染进程数，None 表示使用 CPU 核数
+        :param buffer_size: 环形缓冲区容量（已提交但未显示的显示帧数上限）
+        """
+        self._frames = iter(frames)
+        self._batch = grid ** 2 * channels
+        self._render_args = (version, error_correction, size, grid, channels)
+        self._buffer_size = buffer_size
+        self._buffer = deque()
+        self._metrics = metrics
+        self.last_payload_bytes = 0  # 最近一次取出的显示帧中全部帧数据的字节数
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._fill()
+
+    def _fill(self):
+        # 补满缓冲区：每取走一帧就提交一帧新的渲染任务
+        while len(self._buffer) < self._buffer_size:
+            batch = [item for _, item in zip(range(self._batch), self._frames)]
+            if not batch:
+                return
+            labels, payloads = zip(*batch)
+            future = self._executor.submit(render_frame, list(payloads), *self._render_args)
+            size = sum(len(payload.encode('utf-8')) for payload in payloads)
+            self._buffer.append((list(labels), size, future))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._buffer:
+            raise StopIteration
+        labels, self.last_payload_bytes, future = self._buffer.popleft()
+        with self._metrics.time('render_wait'):
+            image = future.result()  # 正常情况下早已渲染完成，不会阻塞
+        with self._metrics.time('pack'):
+            self._fill()
+        return labels, image
+
+    def close(self):
+        """停止进程池，丢弃尚未显示的帧"""
+        self._buffer.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
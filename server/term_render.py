@@ -0,0 +1,184 @@
+# term_render.py - 终端二维码渲染（半块字符 / sixel / kitty 图形协议）
+"""
+半块字符模式下每个字符单元显示上下两个模块（▀ ▄ █ 空格），前景色为深色模块、背景色为浅色模块，
+一行只需设置一次颜色。相比每个模块两个空格加一段 24 位颜色转义，输出量小一个数量级，
+二维码在终端中的宽度和高度也都减半，SSH 会话中可以使用更高的二维码版本。
+
+支持图形协议的终端可改用 sixel 或 kitty 输出位图，每个模块放大为若干像素。
+
+每帧拼成一个完整字符串，以光标归位开头、清除到屏幕末尾结尾，一次写出并刷新：
+不再每帧调用 clear 创建子进程，也不会出现清屏后逐行重绘的闪烁。
+"""
+import base64
+import io
+import os
+import sys
+
+from PIL import Image
+
+CURSOR_HOME = '\033[H'
+CLEAR_BELOW = '\033[J'
+CLEAR_SCREEN = '\033[2J'
+HIDE_CURSOR = '\033[?25l'
+SHOW_CURSOR = '\033[?25h'
+RESET = '\033[0m'
+
+MODES = ('auto', 'blocks', 'sixel', 'kitty')
+KITTY_CHUNK = 4096  # kitty 图形协议每段负载上限（base64 字符）
+
+# (上方模块为深色, 下方模块为深色) -> 字符
+_GLYPHS = {
+    (False, False): ' ',
+    (True, False): '▀',
+    (False, True): '▄',
+    (True, True): '█',
+}
+
+
+def detect_mode():
+    """
+    auto 模式下选择输出方式：kitty 终端（及兼容其图形协议的 WezTerm）用 kitty，其余用半块字符。
+    sixel 支持无法仅凭环境变量可靠判断，需要显式指定
+    """
+    if os.environ.get('KITTY_WINDOW_ID') or os.environ.get('TERM') == 'xterm-kitty':
+        return 'kitty'
+    if os.environ.get('TERM_PROGRAM') == 'WezTerm':
+        return 'kitty'
+    return 'blocks'
+
+
+def render_blocks(matrix, dark, light, indent=2):
+    """
+    :param matrix: 二维码模块矩阵，True 为深色
+    :param dark: 深色模块 RGB
+    :param light: 浅色模块 RGB
+    :return: 多行字符串
+    """
+    # 所有字符单元颜色相同，由字形决定上下半格的深浅，每行只在行首设置一次颜色
+    color = '\033[38;2;{};{};{}m\033[48;2;{};{};{}m'.format(*dark, *light)
+    pad = ' ' * indent
+    lines = []
+    for top in range(0, len(matrix), 2):
+        upper = matrix[top]
+        lower = matrix[top + 1] if top + 1 < len(matrix) else [False] * len(upper)
+        lines.append(pad + color + ''.join(_GLYPHS[u, l] for u, l in zip(upper, lower)) + RESET)
+    return '\n'.join(lines)
+
+
+def _scaled_image(matrix, dark, light, scale):
+    """模块矩阵 -> 调色板图像（0 为浅色，1 为深色），每个模块放大为 scale×scale 像素"""
+    size = len(matrix)
+    image = Image.frombytes('P', (size, size), bytes(1 if cell else 0 for row in matrix for cell in row))
+    image.putpalette(list(light) + list(dark))
+    return image.resize((size * scale, size * scale), Image.Resampling.NEAREST)
+
+
+def _sixel_run(code, count):
+    char = chr(63 + code)
+    return f"!{count}{char}" if count > 3 else char * count
+
+
+def render_sixel(matrix, dark, light, scale=4):
+    """
+    :return: sixel 转义序列字符串
+    """
+    height = len(matrix) * scale
+    width = len(matrix[0]) * scale if matrix else 0
+    # 每个模块按 scale 放大后的像素行
+    rows = [[cell for cell in row for _ in range(scale)] for row in matrix for _ in range(scale)]
+
+    # 颜色寄存器分量为 0-100 的百分比
+    def percent(rgb):
+        return ';'.join(str(round(c * 100 / 255)) for c in rgb)
+
+    out = ['\033Pq', f'"1;1;{width};{height}', f'#0;2;{percent(light)}', f'#1;2;{percent(dark)}']
+    for band in range(0, height, 6):
+        band_rows = rows[band:band + 6]
+        full = (1 << len(band_rows)) - 1
+        masks = [sum(1 << i for i, row in enumerate(band_rows) if row[x]) for x in range(width)]
+        for register, invert in ((0, True), (1, False)):
+            out.append(f'#{register}')
+            # 相同的 sixel 字符按游程合并为 !<次数><字符>
+            run_code, run_len = None, 0
+            for mask in masks:
+                code = full & ~mask if invert else mask
+                if code == run_code:
+                    run_len += 1
+                    continue
+                if run_len:
+                    out.append(_sixel_run(run_code, run_len))
+                run_code, run_len = code, 1
+            if run_len:
+                out.append(_sixel_run(run_code, run_len))
+            out.append('$')  # 回到本带行首，叠加绘制下一种颜色
+        out[-1] = '-'        # 换到下一带（6 个像素行）
+    out.append('\033\\')
+    return ''.join(out)
+
+
+def render_kitty(matrix, dark, light, scale=4):
+    """
+    :return: kitty 图形协议转义序列字符串（PNG 负载，分段发送）
+    """
+    buffer = io.BytesIO()
+    _scaled_image(matrix, dark, light, scale).save(buffer, format='PNG')
+    payload = base64.standard_b64encode(buffer.getvalue()).decode('ascii')
+    chunks = [payload[i:i + KITTY_CHUNK] for i in range(0, len(payload), KITTY_CHUNK)]
+
+    # 先删除上一帧的图像，q=2 关闭终端应答，避免应答被当作键盘输入
+    out = ['\033_Ga=d,d=A,q=2\033\\']
+    for i, chunk in enumerate(chunks):
+        more = 1 if i < len(chunks) - 1 else 0
+        control = f'a=T,f=100,q=2,m={more}' if i == 0 else f'm={more}'
+        out.append(f'\033_G{control};{chunk}\033\\')
+    return ''.join(out)
+
+
+class TerminalRenderer:
+    """在同一屏幕位置反复绘制二维码帧"""
+
+    def __init__(self, mode='auto', dark=(0, 100, 0), light=(255, 255, 255), scale=4, stream=None):
+        """
+        :param mode: 'auto' / 'blocks' / 'sixel' / 'kitty'
+        :param dark: 深色模块 RGB
+        :param light: 浅色模块 RGB
+        :param scale: 图形模式下每个模块的像素边长
+        """
+        if mode not in MODES:
+            raise ValueError(f"未知的渲染模式: {mode}")
+        self.mode = detect_mode() if mode == 'auto' else mode
+        self.dark = dark
+        self.light = light
+        self.scale = scale
+        self.stream = stream or sys.stdout
+
+    def render(self, matrix):
+        if self.mode == 'sixel':
+            return render_sixel(matrix, self.dark, self.light, self.scale)
+        if self.mode == 'kitty':
+            return render_kitty(matrix, self.dark, self.light, self.scale)
+        return render_blocks(matrix, self.dark, self.light)
+
+    def _write(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def start(self):
+        """开始显示前清屏一次并隐藏光标"""
+        self._write(CLEAR_SCREEN + CURSOR_HOME + HIDE_CURSOR)
+
+    def draw(self, matrix, header='', footer=''):
+        """
+        光标归位后整帧覆盖绘制
+        :param header: 二维码上方的文字
+        :param footer: 二维码下方的文字
+        """
+        # 文字行末尾清除到行尾，避免上一帧较长的文字残留
+        def lines(text):
+            return ''.join(line + '\033[K\n' for line in text.split('\n')) if text else ''
+
+        self._write(CURSOR_HOME + lines(header) + self.render(matrix) + '\n' + lines(footer) + CLEAR_BELOW)
+
+    def stop(self):
+        """恢复光标"""
+        self._write(RESET + SHOW_CURSOR + '\n')
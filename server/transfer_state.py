@@ -0,0 +1,78 @@
+# transfer_state.py - 发送端的增量传输状态缓存
+"""
+记录上次成功发送时每个文件的内容哈希与块签名，保存在 ~/.qr_scan/ 下（按发送目录区分），
+不写入被发送的目录本身。再次发送时：
+- 哈希未变的文件直接跳过；
+- 有旧签名的文件计算 rsync 风格的块增量，增量明显小于全文时只发送增量；
+- 其余文件完整发送。
+只有整轮发送正常结束后才调用 save()，中途关闭窗口不会更新缓存。
+"""
+import hashlib
+import json
+import math
+import os
+
+from common.delta import compute_delta, signature
+
+STATE_DIR = os.path.join(os.path.expanduser('~'), '.qr_scan')
+DELTA_RATIO = 0.8  # 增量流小于全文的该比例时才按增量发送
+
+
+def block_size_for(length):
+    """按文件大小选择块大小（约为长度的平方根，限制在 64B-8KB）"""
+    return max(64, min(8192, int(math.sqrt(length)) // 8 * 8))
+
+
+class TransferState:
+    """
+    增量传输状态：{相对路径: {'sha256', 'size', 'block_size', 'blocks'}}
+    """
+
+    def __init__(self, folder_path, state_dir=STATE_DIR):
+        key = hashlib.sha1(os.path.abspath(folder_path).encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(state_dir, f"state-{key}.json")
+        self.files = {}
+        self._pending = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.files = json.load(f).get('files', {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 增量状态缓存无法读取，将完整发送: {e}")
+
+    def forget(self):
+        """忽略已缓存的状态：本次全部完整发送，发送完成后再记录"""
+        self.files = {}
+
+    def plan(self, name, data):
+        """
+        决定文件的发送方式，并记录本次发送后的新状态（save() 时生效）
+        :return: ('skip', None) / ('delta', (增量流, 基准文件 SHA-256)) / ('full', None)
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        previous = self.files.get(name)
+        block_size = block_size_for(len(data))
+        self._pending[name] = {
+            'sha256': digest,
+            'size': len(data),
+            'block_size': block_size,
+            'blocks': signature(data, block_size),
+        }
+        if previous is None:
+            return 'full', None
+        if previous['sha256'] == digest:
+            return 'skip', None
+        delta = compute_delta(data, previous['blocks'], previous['block_size'])
+        if len(delta) < len(data) * DELTA_RATIO:
+            return 'delta', (delta, previous['sha256'])
+        return 'full', None
+
+    def save(self):
+        """整轮发送完成后写入缓存"""
+        self.files.update(self._pending)
+        self._pending = {}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'files': self.files}, f)
+        os.replace(tmp, self.path)
@@ -1,17 +1,37 @@
 # sender.py - A电脑运行（终端文本版）
-# 功能：遍历指定文件夹中的所有 .py 文件，将其内容分块编码为【文本二维码】并在终端逐个展示
+# 功能：按文件索引选出指定文件夹中的 .py 文件（扩展名、排除规则与发送顺序可配置），将其内容分块编码为【文本二维码】并在终端逐个展示
 # 使用场景：通过扫码设备扫描终端显示的二维码，接收 Python 源码
 # 无需 GUI，适合服务器/SSH 环境
 
+import argparse
 import os
 import qrcode
 import time
 import sys
 
+# 允许导入仓库根目录下的 common 包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import protocol
+from common.metrics import FORMATS as METRICS_FORMATS, NULL_METRICS, Metrics, MetricsExporter
+from file_index import ORDERS, FileIndex, parse_size
+from packing import ERROR_CORRECTION_LEVELS, build_digest_frame, build_file_frames
+from term_render import MODES, TerminalRenderer
+
 
 # 配置常量
 INTERVAL = 1.5            # 每个二维码显示时间（秒），确保手机能扫完
-LINES_PER_QR = 10         # 每个二维码最多包含 10 行代码
+QR_VERSION = 6            # 二维码版本，半块字符模式下每个模块占一个字符宽、半个字符高
+QR_ERROR_CORRECTION = 'M'  # 纠错等级 L/M/Q/H
+CHUNK_BYTES = None        # 单帧负载字节上限；None 表示按容量自动装满
+RENDER_MODE = 'auto'      # 终端渲染方式 auto/blocks/sixel/kitty，auto 在 kitty 终端中使用图形协议
+PIXEL_SCALE = 4           # sixel/kitty 模式下每个模块的像素边长
+DARK_COLOR = (0, 100, 0)        # 深色模块颜色（深绿）
+LIGHT_COLOR = (255, 255, 255)   # 浅色模块颜色（白）
+EXTENSIONS = ('.py',)     # 只发送这些扩展名的文件；None 表示不限
+SEND_ORDER = 'name'       # 发送顺序 name/size/mtime：size 小文件优先，尽早得到可用的文件
+METRICS_FORMAT = 'jsonl'  # 统计导出格式 jsonl/prom
+METRICS_INTERVAL = 5      # 统计导出间隔（秒）
 
 
 class QRDisplay:
@@ -20,99 +40,89 @@ class QRDisplay:
     负责生成并打印文本二维码，控制发送流程
     """
 
-    def __init__(self, folder_path):
+    def __init__(self, folder_path, render_mode=RENDER_MODE, scale=PIXEL_SCALE, index=None, metrics=NULL_METRICS,
+                 exporter=None, overlay=False):
+        """
+        :param index: FileIndex，决定发送哪些文件及发送顺序；None 表示按 EXTENSIONS 与默认排除规则
+        :param metrics: 记录生成（encode）与绘制（draw）耗时、帧周期及显示帧数、负载字节数
+        :param exporter: MetricsExporter，发送期间定期导出统计
+        :param overlay: 是否在二维码下方显示实时统计
+        """
         self.folder_path = folder_path
-
-    def generate_and_print_qr(self, data):
+        self.renderer = TerminalRenderer(render_mode, DARK_COLOR, LIGHT_COLOR, scale)
+        self.index = index or FileIndex(folder_path, extensions=EXTENSIONS, order=SEND_ORDER)
+        self.metrics = metrics
+        self.exporter = exporter
+        self.overlay = overlay
+        self.last_shown = None
+
+    def generate_and_print_qr(self, data, status=''):
         """
-        生成彩色文本二维码并打印到终端，支持自定义模块颜色
+        生成二维码并在终端同一位置覆盖绘制（整帧一次写出）
         :param data: 字符串数据
+        :param status: 显示在二维码上方的发送进度
         """
-        # ===== 清屏 =====
-        os.system('clear' if os.name != 'nt' else 'cls')
-
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=1,  # 必须为1才能逐模块控制
-            border=2,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-
-        # 获取二维码矩阵：True 表示深色模块（黑），False 表示浅色模块（白）
-        matrix = qr.get_matrix()
-
-        # ANSI 颜色定义（可自定义）
-        BLACK = '\033[48;2;0;0;0m  \033[0m'  # 背景黑
-        WHITE = '\033[48;2;255;255;255m  \033[0m'  # 背景白
-        # 或使用简写：
-        # BLACK = '\033[40m  \033[0m'
-        # WHITE = '\033[47m  \033[0m'
-
-        # ✅ 自定义你喜欢的颜色（RGB）
-        DARK_GREEN = '\033[48;2;0;100;0m  \033[0m'  # 深绿模块
-        LIGHT_YELLOW = '\033[48;2;255;255;200m  \033[0m'  # 浅黄背景
-
-        # 选择你想要的样式：
-        module_dark = DARK_GREEN  # 二维码“黑块”颜色
-        module_light = WHITE  # 二维码“白块”颜色
-
-        print("\n" + "=" * 50)
-        print("🔍 请扫描二维码（终端已清屏）...")
-        print("=" * 50)
-
-        # 打印带颜色的二维码
-        for row in matrix:
-            line = ""
-            for cell in row:
-                line += module_dark if cell else module_light
-            print("  " + line)  # 左侧加空格模拟边框位置感
-
-        print("\n" + "-" * 50)
-        print(f"📌 数据预览: {repr(data[:60] + '...' if len(data) > 60 else data)}")
-        print("-" * 50)
+        with self.metrics.time('encode'):
+            qr = qrcode.QRCode(
+                version=QR_VERSION,
+                error_correction=ERROR_CORRECTION_LEVELS[QR_ERROR_CORRECTION],
+                box_size=1,  # 必须为1才能逐模块控制
+                border=2,
+            )
+            qr.add_data(data, optimize=0)
+            qr.make(fit=True)
+
+            # 获取二维码矩阵：True 表示深色模块，False 表示浅色模块
+            matrix = qr.get_matrix()
+
+        header = "=" * 50 + "\n🔍 请扫描二维码...\n" + status + "\n" + "=" * 50
+        footer = ("-" * 50 + f"\n📌 数据预览: {repr(data[:60] + '...' if len(data) > 60 else data)}\n"
+                  + "-" * 50)
+        if self.overlay:
+            footer += "\n📈 " + self.metrics.summary()
+        with self.metrics.time('draw'):
+            self.renderer.draw(matrix, header, footer)
+
+        now = time.perf_counter()
+        if self.last_shown is not None:
+            self.metrics.observe('period', now - self.last_shown)
+        self.last_shown = now
+        self.metrics.inc('frames_shown')
+        self.metrics.inc('payload_bytes', len(data.encode('utf-8')))
+        if self.exporter:
+            self.exporter.maybe_export()
 
     def send_file(self, filepath, filename):
         """
         发送单个文件：
         1. 先发路径元信息 (PATH:)
-        2. 再分块发送代码 (FILE:|LINE:)
+        2. 再按字节预算分块发送内容 (FILE:|SEQ:|N:|CRC:)
+        3. 最后发送文件摘要 (SUM:)
         """
-        # 1. 发送文件路径
-        path_info = f"PATH:{filename}"
-        print(f"\n📤 开始发送文件: {filename}")
-        self.generate_and_print_qr(path_info)
-        time.sleep(INTERVAL)
-
-        # 2. 读取文件内容
+        # 1. 读取文件内容（二进制，非 UTF-8 文件以 base64 发送）
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+            with open(filepath, 'rb') as f:
+                data = f.read()
         except Exception as e:
             print(f"❌ 无法读取文件 {filepath}: {e}")
             return
 
-        # 3. 分块发送
-        for i in range(0, len(lines), LINES_PER_QR):
-            chunk = lines[i:i + LINES_PER_QR]
-            start_line = i
-            data = f"FILE:{filename}|LINE:{start_line}\n" + ''.join(chunk)
+        version = {protocol.VERSION_FIELD: protocol.content_version(data)}
+        frames = build_file_frames(filename, data, QR_VERSION, QR_ERROR_CORRECTION, CHUNK_BYTES, version)
+
+        # 2. 发送文件路径
+        path_info = protocol.build_path_frame(filename, len(frames), version)
+        self.generate_and_print_qr(path_info, f"📤 开始发送文件: {filename}（{len(data)} 字节，{len(frames)} 帧）")
+        time.sleep(INTERVAL)
 
-            print(f"📨 发送块: {filename} 第 {start_line}-{start_line + len(chunk)-1} 行")
-            self.generate_and_print_qr(data)
+        # 3. 分块发送
+        for seq, frame in enumerate(frames):
+            self.generate_and_print_qr(frame, f"📨 发送块: {filename} 第 {seq + 1}/{len(frames)} 块")
             time.sleep(INTERVAL)  # 等待扫码
 
-    @staticmethod
-    def get_all_files(directory):
-        """递归获取目录下所有文件的相对路径"""
-        all_files = []
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                full_path = os.path.join(root, file)
-                rel_path = os.path.relpath(full_path, directory)
-                all_files.append(rel_path)
-        return all_files
+        # 4. 发送文件摘要
+        self.generate_and_print_qr(build_digest_frame(filename, data), f"🔏 发送文件摘要: {filename}")
+        time.sleep(INTERVAL)
 
     def start(self):
         """主流程启动"""
@@ -120,33 +130,67 @@ class QRDisplay:
             print(f"❌ 错误：目录不存在: {self.folder_path}")
             return
 
-        py_files = [
-            f for f in self.get_all_files(self.folder_path)
-            if f.endswith('.py')
-        ]
+        files = self.index.scan()
 
-        print(f"📁 找到 {len(py_files)} 个 .py 文件: {py_files}")
+        print(f"📁 找到 {len(files)} 个文件（{self.index.describe()}）: {files}")
 
-        if not py_files:
-            print("⚠️  警告：未找到任何 .py 文件")
+        if not files:
+            print("⚠️  警告：未找到任何符合条件的文件")
             return
 
-        print("\n🚀 开始发送文件...每个二维码显示 {INTERVAL} 秒，请用扫码设备扫描终端。")
+        print(f"\n🚀 开始发送文件...每个二维码显示 {INTERVAL} 秒，请用扫码设备扫描终端。")
+        time.sleep(INTERVAL)
 
-        for filename in py_files:
-            filepath = os.path.join(self.folder_path, filename)
-            self.send_file(filepath, filename)
+        self.renderer.start()
+        try:
+            for filename in files:
+                filepath = os.path.join(self.folder_path, filename)
+                self.send_file(filepath, filename)
+        finally:
+            self.renderer.stop()
 
         print("\n✅ 所有文件发送完毕！")
+        if self.metrics is not NULL_METRICS:
+            if self.exporter:
+                self.exporter.export()
+                print(f"📈 统计已导出到 {self.exporter.path}")
+            print(f"📈 {self.metrics.summary()}")
 
 
 # ==================== 程序入口 ====================
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("用法: python sender.py <source_folder_path>")
-        print("示例: python sender.py ./my_python_code/")
-        sys.exit(1)
-
-    folder_path = sys.argv[1]
-    app = QRDisplay(folder_path=folder_path)
-    app.start()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="在终端中以二维码发送文件夹中的文件（默认只发送 .py 文件）")
+    parser.add_argument('folder_path', help="要发送的文件夹，如 ./my_python_code/")
+    parser.add_argument('--render', choices=MODES, default=RENDER_MODE,
+                        help="终端渲染方式：blocks 为半块字符，sixel/kitty 为终端图形协议（默认 %(default)s）")
+    parser.add_argument('--scale', type=int, default=PIXEL_SCALE,
+                        help="sixel/kitty 模式下每个模块的像素边长（默认 %(default)s）")
+    parser.add_argument('--ext', metavar='EXT[,EXT...]',
+                        help="只发送这些扩展名的文件，逗号分隔（默认 .py）；'*' 表示不限")
+    parser.add_argument('--exclude', metavar='PATTERN', action='append', default=[],
+                        help="排除规则（.gitignore 语法，可多次指定）")
+    parser.add_argument('--max-size', type=parse_size, metavar='SIZE',
+                        help="跳过大于该大小的文件，可带 K/M/G 后缀，如 64K")
+    parser.add_argument('--order', choices=ORDERS, default=SEND_ORDER,
+                        help="发送顺序：name 按文件名，size 小文件优先，mtime 最近修改优先（默认 %(default)s）")
+    parser.add_argument('--metrics', metavar='FILE', help="定期导出分阶段耗时直方图与计数器")
+    parser.add_argument('--metrics-format', choices=METRICS_FORMATS, default=METRICS_FORMAT,
+                        help="统计导出格式：jsonl 追加 JSON 行，prom 为 Prometheus 文本格式（默认 %(default)s）")
+    parser.add_argument('--overlay', action='store_true', help="在二维码下方显示实时统计")
+    args = parser.parse_args()
+
+    metrics, exporter = NULL_METRICS, None
+    if args.metrics or args.overlay:
+        metrics = Metrics('sender')
+        if args.metrics:
+            exporter = MetricsExporter(metrics, args.metrics, args.metrics_format, METRICS_INTERVAL)
+
+    extensions = EXTENSIONS
+    if args.ext:
+        extensions = None if args.ext == '*' else args.ext.split(',')
+    index = FileIndex(args.folder_path, excludes=args.exclude, extensions=extensions, max_size=args.max_size,
+                      order=args.order)
+
+    app = QRDisplay(folder_path=args.folder_path, render_mode=args.render, scale=args.scale, index=index,
+                    metrics=metrics, exporter=exporter, overlay=args.overlay)
+    app.start()
@@ -0,0 +1,54 @@
+# watcher.py - 监视模式：轮询文件索引，找出新增或修改过的文件
+"""
+每次轮询用 FileIndex 重新扫描发送目录（未变化的目录直接使用内存中的目录列表），
+比较各文件的 (大小, 修改时间)，与上次发送时不同的文件即为候选。
+编辑器保存文件可能分几次写入，候选文件在连续两次轮询中属性不变才视为写完，交给发送端排队。
+只用标准库轮询，不依赖 inotify 等平台相关的通知机制；轮询间隔通常远小于二维码的发送时长。
+"""
+
+
+class ChangeWatcher:
+
+    def __init__(self, index):
+        """
+        :param index: FileIndex，决定监视哪些文件（排除规则与过滤条件与首轮发送相同）
+        """
+        self.index = index
+        self.known = {}    # 已发送（或首轮已排队）的文件：相对路径 -> (大小, 修改时间 ns)
+        self.pending = {}  # 已发现变化、尚未写完的文件：相对路径 -> (大小, 修改时间 ns)
+
+    def snapshot(self):
+        """
+        扫描一次并把当前状态记为已发送（首轮完整发送前调用）
+        :return: 按索引排序的文件列表
+        """
+        files = self.index.scan(stat=True)
+        self.known = dict(self.index.sizes)
+        self.pending = {}
+        return files
+
+    def poll(self):
+        """
+        :return: (已写完、需要发送的文件列表（按索引顺序）, 本次发现被删除的文件列表)
+        """
+        files = self.index.scan(stat=True)
+        current = self.index.sizes
+        ready = []
+        for name in files:
+            signature = current[name]
+            if self.known.get(name) == signature:
+                self.pending.pop(name, None)
+                continue
+            if self.pending.get(name) == signature:
+                # 与上次轮询相同：文件已写完
+                del self.pending[name]
+                self.known[name] = signature
+                ready.append(name)
+            else:
+                self.pending[name] = signature
+        removed = [name for name in self.known if name not in current]
+        for name in removed:
+            del self.known[name]
+        for name in [name for name in self.pending if name not in current]:
+            del self.pending[name]
+        return ready, removed
@@ -1,14 +1,15 @@
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from file_index import FileIndex
 
 target_path = "./source_code"
 
-# 获取该目录下所有文件包括嵌套在文件夹内的
+# 获取该目录下所有文件包括嵌套在文件夹内的（与发送端相同的排除规则，跳过 .git、__pycache__ 等）
 def get_all_files(directory):
-    all_files = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            all_files.append(os.path.relpath(os.path.join(root, file), directory))
-    return all_files
+    return FileIndex(directory, cache=False).scan()
 
 # 根据目标目录创建文件夹，如果中间级不存在则创建
 def ensure_directory_exists(file_path):
@@ -0,0 +1,39 @@
+# test_delta.py - 块级增量编码往返测试（python -m pytest -q）
+import os
+
+import pytest
+
+from common.delta import apply_delta, compute_delta, signature
+
+BLOCK = 64
+
+
+def round_trip(old, new):
+    delta = compute_delta(new, signature(old, BLOCK), BLOCK)
+    assert apply_delta(old, delta) == new
+    return delta
+
+
+def test_unchanged_file_is_all_copies():
+    old = os.urandom(BLOCK * 50)
+    assert len(round_trip(old, old)) < 100
+
+
+def test_insert_delete_and_append():
+    old = os.urandom(BLOCK * 50 + 13)
+    edited = old[:1000] + b'inserted' + old[1000:2000] + old[2500:] + b'tail'
+    delta = round_trip(old, edited)
+    assert len(delta) < len(edited) // 2
+
+
+def test_empty_and_unrelated():
+    round_trip(b'', os.urandom(300))
+    round_trip(os.urandom(300), b'')
+    round_trip(os.urandom(300), os.urandom(300))
+
+
+def test_wrong_base_is_rejected():
+    old = os.urandom(BLOCK * 10)
+    delta = compute_delta(old + b'x', signature(old, BLOCK), BLOCK)
+    with pytest.raises(ValueError):
+        apply_delta(os.urandom(len(old)), delta)
@@ -0,0 +1,83 @@
+# test_journal.py - 接收端日志在崩溃后重放的测试（python -m pytest -q）
+import hashlib
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(ROOT, 'server'), os.path.join(ROOT, 'client')]
+
+from common import protocol
+from packing import build_digest_frame, build_file_frames
+from reassembly import Receiver
+
+DATA_A = ''.join(f"line {i}: {'a' * 40}\n" for i in range(60)).encode()
+DATA_B = b'print("b")\n' * 20
+
+
+def frames(name, data):
+    """(路径帧, 数据帧列表, 摘要帧)，块数足够多以便只收一部分"""
+    version = {protocol.VERSION_FIELD: protocol.content_version(data)}
+    chunks = build_file_frames(name, data, 12, 'M', 200, version)
+    return protocol.build_path_frame(name, len(chunks), version), chunks, build_digest_frame(name, data)
+
+
+def crash(receiver):
+    # 模拟进程被杀：日志已落盘，但不调用 close，.qr_partial 保留
+    receiver.journal.sync()
+
+
+def read(folder, name):
+    with open(os.path.join(folder, name), 'rb') as f:
+        return f.read()
+
+
+def test_partial_file_and_digest_survive_restart(tmp_path):
+    dst = str(tmp_path)
+    path_a, chunks_a, sum_a = frames('pkg/a.py', DATA_A)
+    path_b, chunks_b, sum_b = frames('b.py', DATA_B)
+    assert len(chunks_a) >= 4
+
+    receiver = Receiver(dst, verbose=False)
+    for frame in [path_b] + chunks_b + [sum_b]:
+        receiver.handle(frame)
+    # a 的摘要先于数据到达（上一轮发送的），数据只收到前一半
+    receiver.handle(sum_a)
+    receiver.handle(path_a)
+    half = len(chunks_a) // 2
+    for frame in chunks_a[:half]:
+        receiver.handle(frame)
+    assert 'b.py' in receiver.verified
+    crash(receiver)
+
+    receiver = Receiver(dst, verbose=False)
+    assert 'b.py' in receiver.verified
+    assert receiver.digests['pkg/a.py'] == (len(DATA_A), hashlib.sha256(DATA_A).hexdigest())
+    assert [a.missing() for a in receiver.files.values()] == [list(range(half, len(chunks_a)))]
+    # 只补发剩余的块，不重发摘要帧，写盘后即可校验
+    for frame in chunks_a[half:]:
+        receiver.handle(frame)
+    receiver.flush()
+    assert read(dst, 'pkg/a.py') == DATA_A
+    assert receiver.verified == {'pkg/a.py', 'b.py'}
+    receiver.close()
+    assert not os.path.exists(os.path.join(dst, '.qr_partial'))
+
+
+def test_stale_digest_after_restart(tmp_path):
+    # 重启前收到的旧版摘要与重启后写盘的新版本不符时，文件标记为需要重发
+    dst = str(tmp_path)
+    old = DATA_B
+    new = DATA_B.replace(b'b', b'c')
+    receiver = Receiver(dst, verbose=False)
+    receiver.handle(build_digest_frame('b.py', old))
+    crash(receiver)
+
+    receiver = Receiver(dst, verbose=False)
+    assert 'b.py' in receiver.digests
+    path, chunks, _ = frames('b.py', new)
+    for frame in [path] + chunks:
+        receiver.handle(frame)
+    assert 'b.py' not in receiver.verified
+    receiver.handle(build_digest_frame('b.py', new))
+    assert 'b.py' in receiver.verified
+    assert read(dst, 'b.py') == new
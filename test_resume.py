@@ -0,0 +1,42 @@
+# test_resume.py - 续传清单往返测试（python -m pytest -q）
+from common.protocol import content_version
+from common.resume import (ResumePlan, file_token, format_ranges, format_resume, name_token,
+                           parse_ranges)
+
+
+def test_ranges_round_trip():
+    for indexes in ([], [0], [1, 2, 3, 7], [0, 2, 4, 5, 6, 100]):
+        assert parse_ranges(format_ranges(indexes)) == indexes
+    assert format_ranges([1, 2, 3, 7]) == '1-3,7'
+
+
+def test_plan_round_trip():
+    done, part, other = b'complete file', b'partial file v1', b'not in manifest'
+    text = format_resume([file_token('a/done.py', done)],
+                         [(name_token('a/part.py'), content_version(part), 12, [3, 4, 5, 9])])
+    plan = ResumePlan(text)
+    assert plan.plan('a/done.py', done) == ('skip', None)
+    assert plan.plan('a/part.py', part) == ('partial', (12, [3, 4, 5, 9]))
+    assert plan.plan('a/other.py', other) == ('full', None)
+    # 已收到的文件被修改过，标记不再匹配
+    assert plan.plan('a/done.py', done + b'!') == ('full', None)
+
+
+def test_edited_partial_with_same_block_count_is_sent_in_full():
+    # 长度不变的修改切出的块数相同，只有内容版本能区分
+    old, new = b'x = 1\n' * 50, b'x = 2\n' * 50
+    plan = ResumePlan(format_resume([], [(name_token('m.py'), content_version(old), 4, [2])]))
+    assert plan.plan('m.py', old) == ('partial', (4, [2]))
+    assert plan.plan('m.py', new) == ('full', None)
+
+
+def test_legacy_partial_entry_is_sent_in_full():
+    data = b'data'
+    plan = ResumePlan(f"QRR1\n{name_token('m.py')}:4:1-2\n")
+    assert plan.plan('m.py', data) == ('full', None)
+
+
+def test_windows_separators_and_case():
+    data = b'content'
+    plan = ResumePlan(format_resume([file_token('dir\\f.py', data)], []).upper())
+    assert plan.plan('dir/f.py', data) == ('skip', None)
@@ -0,0 +1,205 @@
+# benchmark.py - 无界面端到端回环基准测试
+"""
+把发送端的帧生成与渲染路径（server/frames.py、server/render.py）产出的图像，
+直接以内存图像交给接收端的识别与重组路径（client/scanner.py、client/reassembly.py），
+不需要 Tk 窗口、截屏或 OpenCV 预览窗口。
+统计吞吐量（字节/秒、帧/秒）、各阶段耗时以及丢失率与损坏率，
+结果以一行 JSON 输出（并可追加写入文件），便于在 CI 中发现性能回退。
+
+用法: python tool/benchmark.py [语料目录] [--grid 2] [--color] [--fountain] [--dedup] [--archive xz] [--decoder auto] [--loss 0.1] [-o bench.jsonl]
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'server'), os.path.join(ROOT, 'client')]
+
+import numpy as np
+
+from decoders import CHOICES as DECODER_CHOICES, create_decoder
+from file_index import FileIndex
+from frames import FrameSource
+from reassembly import Receiver
+from render import render_frame
+from scanner import decode_frame, reading_order
+
+
+class StageTimer:
+    """累计各阶段耗时"""
+
+    def __init__(self):
+        self.total = {}
+        self.count = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.total[name] = self.total.get(name, 0.0) + time.perf_counter() - start
+            self.count[name] = self.count.get(name, 0) + 1
+
+    def mean_ms(self):
+        return {name: round(self.total[name] / self.count[name] * 1000, 3) for name in self.total}
+
+
+def list_files(folder):
+    # 与发送端相同的默认排除规则，不写索引缓存（语料目录常为临时目录）
+    return FileIndex(folder, cache=False).scan()
+
+
+def batched(frames, size):
+    batch = []
+    for item in frames:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run(args):
+    files = list_files(args.corpus)
+    sources = {}
+    for name in files:
+        with open(os.path.join(args.corpus, name), 'rb') as f:
+            sources[name] = f.read()
+    total_bytes = sum(len(data) for data in sources.values())
+
+    source = FrameSource(args.corpus, args.version, args.ecc, fountain_rounds=args.max_rounds,
+                         dedup=args.dedup and not args.fountain)
+    if args.archive:
+        frames = source.iter_archive_frames(files, args.archive)
+    elif args.fountain:
+        frames = source.iter_fountain_frames(files)
+    else:
+        frames = source.iter_files(files)
+    decoder = create_decoder(args.decoder)
+    rng = random.Random(args.seed)
+    timer = StageTimer()
+    displayed = codes = lost = 0
+
+    with tempfile.TemporaryDirectory() as dst, open(os.devnull, 'w') as devnull:
+        receiver = Receiver(dst)
+        start = time.perf_counter()
+        # 接收端与发送端的日志对吞吐量无意义，基准测试期间全部丢弃
+        with contextlib.redirect_stdout(devnull):
+            channels = 3 if args.color else 1
+            iterator = iter(batched(frames, args.grid ** 2 * channels))
+            while True:
+                with timer.stage('pack'):
+                    batch = next(iterator, None)
+                if batch is None:
+                    break
+                displayed += 1
+                codes += len(batch)
+                with timer.stage('render'):
+                    image = np.array(render_frame([data for _, data in batch], args.version, args.ecc,
+                                                  args.size, args.grid, channels))
+                    if args.color:
+                        image = image[:, :, ::-1]  # RGB -> 截图的 BGR 通道顺序
+                if rng.random() < args.loss:
+                    lost += 1  # 模拟整帧漏截
+                    continue
+                with timer.stage('decode'):
+                    barcodes = decode_frame(image, color=args.color, decoder=decoder)
+                with timer.stage('reassemble'):
+                    for barcode in reading_order(barcodes):
+                        receiver.handle(barcode.data.decode('utf-8'))
+                # 还原后还要等到本轮的 SUM 帧才能校验，否则最后一个文件总是未校验
+                if args.fountain and len(receiver.verified) == len(files):
+                    break
+            receiver.flush()
+            receiver.close()
+            verified = len(receiver.verified)
+        elapsed = time.perf_counter() - start
+
+        ok = missing = corrupt = 0
+        for name, data in sources.items():
+            path = os.path.join(dst, name)
+            if not os.path.exists(path):
+                missing += 1
+            else:
+                with open(path, 'rb') as f:
+                    if f.read() == data:
+                        ok += 1
+                    else:
+                        corrupt += 1
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'corpus': args.corpus,
+        'mode': 'archive' if args.archive else 'fountain' if args.fountain else 'chunked',
+        'version': args.version,
+        'error_correction': args.ecc,
+        'grid': args.grid,
+        # auto 模式下为测试后实际使用的后端（样本未凑满时仍为 auto）
+        'decoder': (getattr(decoder, 'current', None) or decoder).name,
+        'color': args.color,
+        'dedup': args.dedup,
+        'loss': args.loss,
+        'files': len(files),
+        'bytes': total_bytes,
+        'frames': displayed,
+        'qr_codes': codes,
+        'elapsed_s': round(elapsed, 3),
+        'frames_per_second': round(displayed / elapsed, 2),
+        'bytes_per_second': round(total_bytes / elapsed, 1),
+        # 以 --interval 显示时的理论传输时间（不计识别耗时）
+        'display_seconds': round(displayed * args.interval, 2),
+        'stage_ms': timer.mean_ms(),
+        'files_ok': ok,
+        'files_missing': missing,
+        'files_corrupt': corrupt,
+        'files_verified': verified,
+        'crc_rejected': receiver.bad_frames,
+        'loss_rate': round(missing / len(files), 4) if files else 0.0,
+        'corruption_rate': round(corrupt / len(files), 4) if files else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无界面端到端回环基准测试")
+    parser.add_argument('corpus', nargs='?', default=os.path.join(ROOT, 'source_code'), help="语料目录")
+    parser.add_argument('--version', type=int, default=12, help="二维码版本")
+    parser.add_argument('--ecc', default='M', choices=('L', 'M', 'Q', 'H'), help="纠错等级")
+    parser.add_argument('--size', type=int, default=300, help="单个二维码边长（像素）")
+    parser.add_argument('--grid', type=int, default=1, choices=(1, 2, 3), help="每帧平铺 N×N 个二维码")
+    parser.add_argument('--color', action='store_true', help="彩色模式：R/G/B 通道各放一组二维码")
+    parser.add_argument('--fountain', action='store_true', help="喷泉码模式")
+    parser.add_argument('--dedup', action='store_true', help="按内容分块去重（分块模式）")
+    parser.add_argument('--archive', choices=('xz', 'zlib'), help="固实归档模式的压缩方式")
+    parser.add_argument('--decoder', choices=DECODER_CHOICES, default='auto',
+                        help="识别后端，auto 用最先识别到的几帧测试后选择；opencv 不支持 --grid（默认 %(default)s）")
+    parser.add_argument('--max-rounds', type=int, default=5, help="喷泉模式最多发送轮数")
+    parser.add_argument('--loss', type=float, default=0.0, help="模拟漏截整帧的概率")
+    parser.add_argument('--interval', type=float, default=0.3, help="用于估算显示时间的帧间隔（秒）")
+    parser.add_argument('--seed', type=int, default=0, help="丢帧模拟的随机种子")
+    parser.add_argument('-o', '--output', help="追加写入 JSON Lines 结果的文件")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.corpus):
+        print(f"❌ 语料目录不存在: {args.corpus}")
+        sys.exit(1)
+
+    result = run(args)
+    line = json.dumps(result, ensure_ascii=False)
+    print(line)
+    if args.output:
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+    # 无丢帧模拟时出现缺失或损坏即视为回归
+    if result['files_corrupt'] or (args.loss == 0 and result['files_missing']):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# calibrate.py - 自动标定二维码版本、纠错等级、模块尺寸与显示间隔
+"""
+用发送端真实的渲染路径（server/render.py）生成测试帧，再用接收端真实的识别路径
+（client/scanner.py）识别，扫描 版本 × 纠错等级 × 模块像素 × 识别缩放 的组合，
+在识别成功率达到目标的组合中选出吞吐量最高的一组，写出配置文件。
+发送端与接收端均可通过 --profile 加载该文件。
+
+用法: python tool/calibrate.py [-o qr_profile.json] [--target 0.99]
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'server'), os.path.join(ROOT, 'client')]
+
+import cv2
+import numpy as np
+
+from packing import build_file_frames, qr_capacity
+from render import render_qr
+from scanner import decode_frame
+
+VERSIONS = (5, 8, 10, 12, 15, 20, 25)
+ERROR_CORRECTIONS = ('L', 'M', 'Q', 'H')
+MODULE_PIXELS = (2, 3, 4, 5)
+DECODE_SCALES = (1.0, 0.5)
+
+
+def sample_frames(version, error_correction, count):
+    """生成装满容量的测试帧（随机可打印文本，与源代码传输时的帧结构一致）"""
+    alphabet = string.ascii_letters + string.digits + string.punctuation + ' \n'
+    text = ''.join(random.choice(alphabet) for _ in range(qr_capacity(version, error_correction) * count))
+    return build_file_frames('calibrate/sample.py', text.encode('utf-8'), version, error_correction)[:count]
+
+
+def simulate_capture(image, capture_scale, blur):
+    """模拟屏幕显示与截图造成的缩放和模糊"""
+    frame = np.array(image)
+    if capture_scale != 1.0:
+        frame = cv2.resize(frame, None, fx=capture_scale, fy=capture_scale, interpolation=cv2.INTER_LINEAR)
+    if blur:
+        frame = cv2.GaussianBlur(frame, (0, 0), blur)
+    return frame
+
+
+def measure(version, error_correction, module_px, decode_scale, args):
+    """
+    测量一组参数
+    :return: 结果字典；图像超过尺寸上限或容量放不下帧头时返回 None
+    """
+    size = (17 + 4 * version + 8) * module_px  # 模块数 + 两侧各 4 个模块的静区
+    if size > args.max_size:
+        return None
+    try:
+        frames = sample_frames(version, error_correction, args.frames)
+    except ValueError:
+        # 低版本高纠错等级的容量小于数据帧头（文件名、序号、CRC 等），无法承载数据
+        return None
+    decoded = 0
+    elapsed = 0.0
+    for data in frames:
+        capture = simulate_capture(render_qr(data, version, error_correction, size), args.capture_scale, args.blur)
+        start = time.perf_counter()
+        results = decode_frame(capture, decode_scale)
+        elapsed += time.perf_counter() - start
+        decoded += any(r.data.decode('utf-8', 'replace') == data for r in results)
+
+    decode_time = elapsed / len(frames)
+    # 每个显示帧至少截到两次，且接收端识别线程能跟上变化帧
+    interval = max(args.min_interval, 2 * decode_time / args.workers * 1.5)
+    payload = sum(len(data.encode('utf-8')) for data in frames) / len(frames)
+    return {
+        'version': version,
+        'error_correction': error_correction,
+        'module_px': module_px,
+        'qr_size': size,
+        'decode_scale': decode_scale,
+        'success_rate': decoded / len(frames),
+        'decode_ms': decode_time * 1000,
+        'interval': round(interval, 3),
+        'bytes_per_second': payload / interval,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="标定二维码传输参数")
+    parser.add_argument('-o', '--output', default='qr_profile.json', help="配置文件输出路径")
+    parser.add_argument('--target', type=float, default=0.99, help="要求达到的识别成功率")
+    parser.add_argument('--frames', type=int, default=10, help="每组参数的测试帧数")
+    parser.add_argument('--workers', type=int, default=2, help="接收端识别线程数（用于估算显示间隔）")
+    parser.add_argument('--min-interval', type=float, default=0.05, help="显示间隔下限（秒）")
+    parser.add_argument('--max-size', type=int, default=800, help="二维码图像边长上限（像素）")
+    parser.add_argument('--capture-scale', type=float, default=1.0, help="模拟显示缩放（如 HiDPI 为 1.25）")
+    parser.add_argument('--blur', type=float, default=0.0, help="模拟截图模糊的高斯 sigma")
+    args = parser.parse_args()
+
+    results = []
+    for version in VERSIONS:
+        for error_correction in ERROR_CORRECTIONS:
+            for module_px in MODULE_PIXELS:
+                for decode_scale in DECODE_SCALES:
+                    result = measure(version, error_correction, module_px, decode_scale, args)
+                    if result is None:
+                        continue
+                    results.append(result)
+                    mark = "✅" if result['success_rate'] >= args.target else "❌"
+                    print(f"{mark} 版本 {version:2d} 纠错 {error_correction} 模块 {module_px}px "
+                          f"缩放 {decode_scale}: 成功率 {result['success_rate']:.0%} "
+                          f"识别 {result['decode_ms']:.1f} ms 吞吐 {result['bytes_per_second']:.0f} B/s")
+
+    passing = [r for r in results if r['success_rate'] >= args.target]
+    if not passing:
+        print(f"❌ 没有任何参数组合达到 {args.target:.0%} 的识别成功率")
+        sys.exit(1)
+    best = max(passing, key=lambda r: r['bytes_per_second'])
+
+    profile = {
+        'measured': best,
+        'settings': {
+            'QR_VERSION': best['version'],
+            'QR_ERROR_CORRECTION': best['error_correction'],
+            'QR_SIZE': best['qr_size'],
+            'INTERVAL': best['interval'],
+            'DECODE_SCALE': best['decode_scale'],
+            'SCAN_INTERVAL': round(best['interval'] / 2, 3),
+        },
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    print("-" * 60)
+    print(f"🏆 最佳参数: {profile['settings']}")
+    print(f"📝 已写入: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
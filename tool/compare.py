@@ -1,7 +1,35 @@
+"""
+目录比较工具
+
+1. 比较两个本地目录：python tool/compare.py <路径1> <路径2>
+2. 两端不在同一台机器上时使用清单模式：
+   发送端生成清单：python tool/compare.py <目录> --write-manifest tree.sha256
+   接收端与清单比较：python tool/compare.py <目录> --manifest tree.sha256
+   清单与 sha256sum 的输出格式相同（每行 "<SHA-256>  <相对路径>"），也可以用 sha256sum -c 校验。
+
+清单模式下的文件列表由发送端同一个文件索引（server/file_index.py）给出，
+默认排除 .git、__pycache__、接收端的 .qr_partial 日志目录与 .pyc，并遵循 .gitignore；
+发送时用了 --exclude / --no-gitignore 的，比较时传入相同的参数。
+文件按线程池并行计算哈希，大文件用 mmap 读取；
+哈希按 (大小, 修改时间) 缓存在 ~/.qr_scan/ 下，未改动的文件再次比较时无需重新读取。
+"""
+import argparse
+import hashlib
+import json
+import mmap
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'server'))
+
+from file_index import FileIndex
+
+MMAP_THRESHOLD = 1 << 20   # 不小于该字节数的文件用 mmap 计算哈希
+CACHE_DIR = Path.home() / '.qr_scan'
+
 def compare_files(file1: Path, file2: Path) -> bool:
     """
     比较两个文件内容是否完全相同（二进制模式）
@@ -34,6 +62,152 @@ def get_relative_structure(root: Path) -> set:
         structure.add(rel_path)
     return structure
 
+def hash_file(path: Path) -> str:
+    """计算文件的 SHA-256（hashlib 计算时释放 GIL，可在线程池中并行）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def scan_files(root: Path, excludes=(), gitignore=True) -> dict:
+    """
+    用发送端的文件索引列出目录下的文件（排除规则与发送时相同）
+    返回: {'dir1/file.txt': (大小, 修改时间), ...}
+    """
+    index = FileIndex(str(root), excludes=excludes, gitignore=gitignore)
+    index.scan(stat=True)
+    return index.sizes
+
+
+def _cache_path(root: Path) -> Path:
+    key = hashlib.sha1(str(root).encode('utf-8')).hexdigest()[:16]
+    return CACHE_DIR / f"hash-cache-{key}.json"
+
+
+def hash_tree(root: Path, workers: int = None, excludes=(), gitignore=True) -> dict:
+    """
+    计算目录下全部文件的 SHA-256，大小与修改时间未变的文件直接使用缓存
+    返回: {'dir1/file.txt': '<SHA-256>', ...}
+    """
+    files = scan_files(root, excludes, gitignore)
+    cache_path = _cache_path(root)
+    try:
+        cache = json.loads(cache_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        cache = {}
+
+    digests = {}
+    pending = []
+    for rel_path, (size, mtime) in files.items():
+        cached = cache.get(rel_path)
+        if cached and cached[0] == size and cached[1] == mtime:
+            digests[rel_path] = cached[2]
+        else:
+            pending.append(rel_path)
+
+    if pending:
+        print(f"🔢 计算哈希: {len(pending)} 个文件（{len(files) - len(pending)} 个使用缓存）")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for rel_path, digest in zip(pending, pool.map(lambda p: hash_file(root / p), pending)):
+                digests[rel_path] = digest
+
+    # 缓存只保留当前仍存在的文件，原子写入
+    cache = {p: [files[p][0], files[p][1], digests[p]] for p in digests}
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(cache), encoding='utf-8')
+        os.replace(tmp, cache_path)
+    except OSError as e:
+        print(f"⚠️  无法写入哈希缓存: {e}")
+    return digests
+
+
+def write_manifest(path: str, output: str, workers: int = None, excludes=(), gitignore=True) -> bool:
+    """生成目录清单（sha256sum 格式，按路径排序）"""
+    root = Path(path).resolve()
+    if not root.is_dir():
+        print(f"❌ 不是目录: {path}")
+        return False
+    digests = hash_tree(root, workers, excludes, gitignore)
+    with open(output, 'w', encoding='utf-8', newline='\n') as f:
+        for rel_path in sorted(digests):
+            f.write(f"{digests[rel_path]}  {rel_path}\n")
+    print(f"📝 已写入清单: {output}（{len(digests)} 个文件）")
+    return True
+
+
+def read_manifest(manifest: str) -> dict:
+    """
+    读取 sha256sum 格式的清单
+    返回: {'dir1/file.txt': '<SHA-256>', ...}
+    """
+    digests = {}
+    with open(manifest, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            digest, rel_path = line.split(None, 1)
+            # sha256sum 以二进制模式输出时路径前有 *
+            digests[rel_path.lstrip(' *').replace('\\', '/')] = digest.lower()
+    return digests
+
+
+def compare_manifest(manifest: str, path: str, workers: int = None, excludes=(), gitignore=True) -> bool:
+    """
+    将本地目录与另一端生成的清单比较：
+    - 清单中有、本地缺少的文件
+    - 本地多出的文件
+    - 内容不一致的文件
+    """
+    root = Path(path).resolve()
+    if not root.is_dir():
+        print(f"❌ 不是目录: {path}")
+        return False
+    try:
+        expected = read_manifest(manifest)
+    except (OSError, ValueError) as e:
+        print(f"❌ 无法读取清单: {manifest} -> {e}")
+        return False
+
+    print(f"🔍 正在比较:")
+    print(f"   [清单] {manifest}（{len(expected)} 个文件）")
+    print(f"   [目录] {root}")
+    print("-" * 60)
+
+    actual = hash_tree(root, workers, excludes, gitignore)
+    missing = expected.keys() - actual.keys()
+    extra = actual.keys() - expected.keys()
+    changed = [p for p in expected.keys() & actual.keys() if expected[p] != actual[p]]
+
+    if missing:
+        print("📂 仅在清单中存在（本地缺少）:")
+        for x in sorted(missing):
+            print(f"  + {x}")
+    if extra:
+        print("📂 仅在本地目录中存在:")
+        for x in sorted(extra):
+            print(f"  - {x}")
+    if changed:
+        print("📄 文件内容不一致:")
+        for x in sorted(changed):
+            print(f"  💥 {x}")
+
+    if missing or extra or changed:
+        print("-" * 60)
+        print("❌ 目录与清单不一致")
+        return False
+    print(f"✅ 目录与清单完全一致！（{len(actual)} 个文件）")
+    return True
+
+
 def compare_directories(path1: str, path2: str) -> bool:
     """
     比较两个目录是否完全一致：
@@ -116,15 +290,31 @@ def compare_directories(path1: str, path2: str) -> bool:
         return True
 
 def main():
-    if len(sys.argv) != 3:
-        print("📌 用法: python compare_dirs.py <路径1> <路径2>")
-        print("   示例: python compare_dirs.py ./folder_a ./folder_b")
-        sys.exit(1)
-
-    path1 = sys.argv[1]
-    path2 = sys.argv[2]
+    parser = argparse.ArgumentParser(description="比较两个目录，或将目录与清单比较")
+    parser.add_argument('paths', nargs='+', metavar='路径', help="两个待比较的目录；清单模式下为一个目录")
+    parser.add_argument('--write-manifest', metavar='FILE', help="为目录生成清单")
+    parser.add_argument('--manifest', metavar='FILE', help="将目录与清单比较")
+    parser.add_argument('--workers', type=int, default=None, help="并行计算哈希的线程数")
+    parser.add_argument('--exclude', metavar='PATTERN', action='append', default=[],
+                        help="清单模式下额外的排除规则（.gitignore 语法，可多次指定），与发送时一致")
+    parser.add_argument('--no-gitignore', action='store_true', help="清单模式下不读取目录中的 .gitignore")
+    args = parser.parse_args()
 
-    result = compare_directories(path1, path2)
+    if args.write_manifest or args.manifest:
+        if len(args.paths) != 1:
+            parser.error("清单模式只接受一个目录")
+        if args.write_manifest:
+            result = write_manifest(args.paths[0], args.write_manifest, args.workers,
+                                    args.exclude, not args.no_gitignore)
+        else:
+            result = compare_manifest(args.manifest, args.paths[0], args.workers,
+                                      args.exclude, not args.no_gitignore)
+    else:
+        if len(args.paths) != 2:
+            print("📌 用法: python compare_dirs.py <路径1> <路径2>")
+            print("   示例: python compare_dirs.py ./folder_a ./folder_b")
+            sys.exit(1)
+        result = compare_directories(args.paths[0], args.paths[1])
     sys.exit(0 if result else 1)
 
 if __name__ == '__main__':